@@ -0,0 +1,199 @@
+import asyncio
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from langchain.agents import AgentExecutor, Tool
+from langchain.callbacks.base import BaseCallbackHandler
+
+from app.tokens import count_tokens
+
+REPEATED_CALL_NOTICE = "[반복 호출] 같은 입력으로 이미 조회한 결과입니다. 다른 도구/입력을 사용하거나 지금까지의 결과로 최종 답변을 작성하세요."
+
+
+class RequestBudget(BaseCallbackHandler):
+    """
+    [요청별 실행 예산]
+    - 역할: 채팅 요청 하나의 ReAct 실행이 사용하는 단계(도구 호출) 수와 LLM 토큰 수를 추적하고,
+            예산을 넘거나 같은 도구 호출을 반복하면 BudgetedAgentExecutor가 루프를 멈추도록 함.
+    - 같은 (도구, 입력) 호출은 다시 실행하지 않고 이전 결과를 돌려줍니다. (memoize_tools 참고)
+    - 콜백으로 등록해 토큰을 세며(프롬프트 + 생성 텍스트, tiktoken 근사치), budget_scope()로 현재 요청에 연결합니다.
+    """
+
+    run_inline = True  # 단순 카운터이므로 이벤트 루프에서 바로 실행
+
+    def __init__(self, max_steps: int = 8, max_tokens: int = 60000, max_repeated_calls: int = 2):
+        self.max_steps = max_steps
+        self.max_tokens = max_tokens
+        self.max_repeated_calls = max_repeated_calls
+        self.steps = 0
+        self.llm_calls = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.repeated_calls = 0
+        self._tool_results: Dict[Tuple[str, str], str] = {}
+        self._lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.prompt_tokens + self.completion_tokens
+
+    def exhausted_reason(self) -> Optional[str]:
+        if self.steps >= self.max_steps:
+            return "steps"
+        if self.total_tokens >= self.max_tokens:
+            return "tokens"
+        if self.repeated_calls >= self.max_repeated_calls:
+            return "repeated_calls"
+        return None
+
+    # --- 토큰 집계 (콜백) ---
+    def on_chat_model_start(self, serialized: Dict[str, Any], messages: List[List[Any]], **kwargs: Any) -> None:
+        tokens = sum(count_tokens(str(m.content)) for batch in messages for m in batch)
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += tokens
+
+    def on_llm_start(self, serialized: Dict[str, Any], prompts: List[str], **kwargs: Any) -> None:
+        tokens = sum(count_tokens(p) for p in prompts)
+        with self._lock:
+            self.llm_calls += 1
+            self.prompt_tokens += tokens
+
+    def on_llm_end(self, response: Any, **kwargs: Any) -> None:
+        tokens = sum(count_tokens(g.text) for gens in response.generations for g in gens)
+        with self._lock:
+            self.completion_tokens += tokens
+
+    # --- 도구 호출 기록 ---
+    @staticmethod
+    def _key(tool_name: str, tool_input: str) -> Tuple[str, str]:
+        return tool_name, " ".join(str(tool_input).split()).lower()
+
+    def cached_result(self, tool_name: str, tool_input: str) -> Optional[str]:
+        with self._lock:
+            result = self._tool_results.get(self._key(tool_name, tool_input))
+            if result is not None:
+                self.repeated_calls += 1
+            return result
+
+    def record_result(self, tool_name: str, tool_input: str, result: str) -> None:
+        with self._lock:
+            self.steps += 1
+            self._tool_results[self._key(tool_name, tool_input)] = result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "steps": self.steps,
+            "llm_calls": self.llm_calls,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "repeated_calls": self.repeated_calls,
+            "exhausted": self.exhausted_reason(),
+        }
+
+
+_current_budget: ContextVar[Optional[RequestBudget]] = ContextVar("agent_request_budget", default=None)
+
+
+def current_budget() -> Optional[RequestBudget]:
+    return _current_budget.get()
+
+
+@contextmanager
+def budget_scope(budget: RequestBudget) -> Iterator[RequestBudget]:
+    """with 블록 안에서 실행되는 에이전트/도구 호출이 이 예산을 사용하도록 연결합니다."""
+    token = _current_budget.set(budget)
+    try:
+        yield budget
+    finally:
+        _current_budget.reset(token)
+
+
+def create_request_budget() -> RequestBudget:
+    """환경변수 AGENT_MAX_STEPS(기본 8), AGENT_MAX_TOKENS(기본 60000), AGENT_MAX_REPEATED_CALLS(기본 2)로 요청 예산을 만듭니다."""
+    return RequestBudget(
+        max_steps=int(os.environ.get("AGENT_MAX_STEPS", 8)),
+        max_tokens=int(os.environ.get("AGENT_MAX_TOKENS", 60000)),
+        max_repeated_calls=int(os.environ.get("AGENT_MAX_REPEATED_CALLS", 2)),
+    )
+
+
+class BudgetedAgentExecutor(AgentExecutor):
+    """현재 요청의 RequestBudget이 소진되면 다음 단계로 넘어가지 않는 AgentExecutor (중단 시 early_stopping_method 응답 반환)"""
+
+    def _should_continue(self, iterations: int, time_elapsed: float) -> bool:
+        budget = current_budget()
+        if budget is not None and budget.exhausted_reason():
+            return False
+        return super()._should_continue(iterations, time_elapsed)
+
+
+def memoize_tools(tools: List[Tool]) -> List[Tool]:
+    """
+    같은 요청 안에서 동일한 (도구, 입력) 호출은 다시 실행하지 않고 이전 결과에 안내 문구를 붙여 반환하도록 감쌉니다.
+    (예산이 연결되지 않은 호출은 그대로 실행)
+    """
+    def memoized(tool: Tool) -> Tool:
+        func, coroutine = tool.func, tool.coroutine
+
+        def run(tool_input: str) -> str:
+            budget = current_budget()
+            cached = budget.cached_result(tool.name, tool_input) if budget else None
+            if cached is not None:
+                return f"{REPEATED_CALL_NOTICE}\n{cached}"
+            result = func(tool_input)
+            if budget:
+                budget.record_result(tool.name, tool_input, result)
+            return result
+
+        async def arun(tool_input: str) -> str:
+            budget = current_budget()
+            cached = budget.cached_result(tool.name, tool_input) if budget else None
+            if cached is not None:
+                return f"{REPEATED_CALL_NOTICE}\n{cached}"
+            if coroutine:
+                result = await coroutine(tool_input)
+            else:
+                # 비동기 버전이 없는 도구는 이벤트 루프를 막지 않도록 스레드에서 실행
+                result = await asyncio.get_running_loop().run_in_executor(None, func, tool_input)
+            if budget:
+                budget.record_result(tool.name, tool_input, result)
+            return result
+
+        return Tool(name=tool.name, description=tool.description, func=run, coroutine=arun)
+
+    return [memoized(tool) for tool in tools]
+
+
+class PathMetrics:
+    """채팅 요청이 어떤 경로(답변 캐시 / 빠른 경로 / 에이전트 / 예산 중단)로 처리됐는지와 경로별 평균 단계·토큰 수·소요 시간 집계"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._paths: Dict[str, Dict[str, int]] = {}
+
+    def record(self, path: str, budget: Optional[RequestBudget] = None, seconds: float = 0.0) -> None:
+        with self._lock:
+            entry = self._paths.setdefault(path, {"count": 0, "steps": 0, "tokens": 0, "prompt_tokens": 0, "seconds": 0.0})
+            entry["count"] += 1
+            entry["seconds"] += seconds
+            if budget is not None:
+                entry["steps"] += budget.steps
+                entry["tokens"] += budget.total_tokens
+                entry["prompt_tokens"] += budget.prompt_tokens
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                path: {
+                    "count": entry["count"],
+                    "avg_steps": round(entry["steps"] / entry["count"], 2),
+                    "avg_tokens": round(entry["tokens"] / entry["count"]),
+                    "avg_prompt_tokens": round(entry["prompt_tokens"] / entry["count"]),
+                    "avg_seconds": round(entry["seconds"] / entry["count"], 2),
+                }
+                for path, entry in self._paths.items()
+            }
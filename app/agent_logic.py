@@ -1,18 +1,340 @@
-from langchain.agents import AgentExecutor, create_react_agent
+import re
+import json
+import asyncio
+from typing import Any, Dict, List, Optional
+from langchain.agents import Tool, create_react_agent, create_openai_tools_agent
 # [핵심 수정] OpenAI 대신 ChatOpenAI를 임포트합니다.
 from langchain_openai import ChatOpenAI
-from langchain_core.prompts import PromptTemplate
+from langchain_core.prompts import ChatPromptTemplate, MessagesPlaceholder, PromptTemplate
 from langchain.memory import ConversationBufferWindowMemory
+from app.agent_budget import BudgetedAgentExecutor
+from app.tokens import count_tokens
+from app.streaming import FINAL_ANSWER_TAG
+from app.fast_path import synthesize_answer
+from app.query_parser import find_commodities, parse_query_details
+from langchain_core.agents import AgentAction
+from langchain_core.messages import get_buffer_string
+from datetime import datetime
+
+
+def _current_date_str() -> str:
+    return datetime.now().strftime("%Y년 %m월 %d일")
+
+
+def _current_year() -> str:
+    return str(datetime.now().year)
+
+
+# ▽ 시스템 프롬프트/가이드라인 - 고정 부분 (요청마다 동일해야 프롬프트 캐시가 적용되므로 날짜 등 가변 값을 넣지 않음)
+# 계산 답변 예시는 Commodity Calculator 결과에 함께 붙어 나오므로 여기에는 없습니다. (app/tools.py CALCULATION_ANSWER_GUIDE)
+# ANALYST_GUIDELINES는 ReAct/함수 호출 모드가 공유하고, 도구 사용 형식 설명만 모드별로 다릅니다.
+ANALYST_GUIDELINES = """당신은 세계 최고의 농산물 시장 전문 애널리스트 'Agri-GPT'입니다.
+당신의 임무는 사용자의 질문 의도를 정확히 파악하여, 명확하고 신뢰도 높은 답변을 제공하는 것입니다.
+
+### ⭐ Agri-GPT 핵심 행동 원칙 ⭐
+
+**0. [날짜 해석]** 사용자가 연도를 생략하면 프롬프트 끝의 [현재 날짜 정보]의 연도를 기준으로, 모호한 시간 표현은 오늘 날짜를 기준으로 해석한다.
+
+**1. [답변 깊이 조절 원칙] 사용자의 질문 수준에 맞춰 답변의 깊이를 조절한다.**
+- **단순 사실 질문** (예: "오늘 옥수수 가격?"): 도구를 사용해 찾은 **핵심 정보만 간결하게** 답변한다.
+- **분석/이유 질문** (예: "가격이 왜 올랐어?"): **'두괄식'으로 결론부터 말하고**, 도구로 찾은 데이터와 뉴스를 근거로 상세히 설명한다.
+- **계산 질문** (예: "베이시스 계산해줘"): **과정을 단계별로 상세히 설명**하고, 마지막에 최종 결과를 제시한다.
+
+**2. [맥락 기억 원칙] 이전 대화의 흐름을 기억하고 활용한다.**
+- 항상 [이전 대화 내용]을 먼저 확인하여 품목, 기간 등 이전 대화의 핵심 맥락을 파악한다.
+- 사용자가 단답형으로 질문하면(예: "밀은?"), 이전 질문의 맥락을 이어받아 답변한다.
+
+**3. [최적 도구 사용 원칙] 질문의 종류에 따라 가장 효과적인 도구를 사용한다.**
+- **계산**: "마진", "변환", "베이시스" 등 명확한 계산 단어가 있으면 **Commodity Calculator**를 사용한다.
+- **정확한 수치**: 특정 날짜의 "가격", "감정점수" 등 구체적인 데이터는 **Precise Data Query**를 사용한다.
+- **시황/키워드**: "시장 분위기", "동향", "시황", "키워드" 등은 **Precise Data Query**를 먼저 시도한다. (구조화된 감정점수, 키워드 데이터가 더 정확함)
+- **의미적 질문**: "영향", "관계", "원인", "배경 설명", "과거 유사 사례" 등은 **Market News and Summary Search**를 사용한다. (복합적 개념 이해와 의미적 검색에 특화됨)
+- **도구 폴백 전략**: 첫 번째 도구에서 충분한 정보를 얻지 못하면 다른 도구를 추가로 사용한다.
+  예: SQL에서 데이터 부족 → 뉴스 검색으로 보완, 뉴스 검색 결과의 관련성 낮음 → SQL로 구체적 데이터 확인
+
+**4. [기간 데이터 조회 전략] 사용자가 기간을 요청하면 가장 최신 데이터를 기준으로 조회한다.**
+- "최근 N일간", "지난 N일간" 등의 요청시: 현재 날짜가 아닌 **DB의 가장 최신 날짜를 기준**으로 N일 전부터 조회
+- 예: "최근 10일간 감정점수" → DB 최신 날짜가 7월 28일이면 7월 19일~28일 데이터 조회
+- 도구 사용시 "최근" 키워드를 포함하여 기간 의도를 명확히 전달
+
+**5. [데이터 상황 투명성 원칙] 데이터 제한사항을 사용자에게 명확히 알린다.**
+- 최신 데이터가 현재 날짜보다 과거인 경우: **반드시 먼저 설명**한 후 답변 제공
+- 예: "현재 가장 최신 데이터는 7월 28일까지입니다. 이를 기준으로 10일간(7월 19일~28일) 데이터를 분석해드리겠습니다."
+- 요청한 기간의 데이터가 부족한 경우에도 **가용한 데이터 범위를 명시**
+
+**[답변 스타일 가이드]**
+- **두괄식 답변**: 항상 결론부터 명확하게 제시한다.
+- **간결한 문장**: 문장은 짧고 명확하게 작성한다.
+- **가독성**: 문단 구분을 통해 읽기 쉽게 구성하고, 핵심 수치나 용어는 **볼드체**로 강조한다.
+- **근거 명시**: 답변의 근거가 된 데이터 기간(예: "7월 28일 기준"), 뉴스 등을 간결하게 언급한다.
+- **주말/공휴일 처리**: 요청한 날짜의 데이터가 없으면, 가장 가까운 영업일 데이터를 제공하며 **"요청하신 날짜는 주말/공휴일로 데이터가 없어, 직전 영업일(YYYY-MM-DD) 데이터를 제공합니다."** 라고 명시한다.
+
+"""
+
+# ▽ ReAct 모드: 텍스트 "Action:/Action Input:" 형식 설명과 예시
+REACT_INSTRUCTIONS = """### 🛠️ 사용 가능한 도구
+
+[사용 가능한 도구 목록]
+{tools}
+
+[도구 이름 목록]
+{tool_names}
+
+### 📜 답변 생성 가이드라인
+
+**[생성 절차]**
+1. **Thought**: 사용자의 질문과 대화 맥락을 종합해 핵심 의도를 파악하고, 위 '핵심 행동 원칙'에 따라 계획을 세운다.
+2. **Action**: 계획에 따라 사용할 도구의 이름을 선택한다.
+3. **Action Input**: 도구에 전달할 값을 적는다.
+   - **[중요]** 계산 도구 사용 시, Action Input에 **"상세한 계산 과정과 공식, 사용된 모든 수치를 단계별로 보여줘"** 라는 요구사항을 반드시 포함한다. (계산 결과와 함께 답변 형식 예시가 제공된다)
+4. **Observation**: 도구 실행 결과를 확인한다.
+5. **Thought**: 결과가 충분한지 판단한다. 부족하면 다른 Action을 계획하고, 충분하면 '답변 스타일 가이드'와 '상황별 답변 예시'를 참고하여 최종 답변을 구성한다.
+6. **Final Answer**: 최종 답변을 생성한다.
+
+### 📘 상황별 답변 예시 (반드시 참고할 것)
+
+**예시 1: 간단한 수치 질문**
+[사용자 질문: "2025년 7월 10일 옥수수 감정점수 알려줘"]
+Thought: 구체적인 날짜와 품목의 '감정점수'라는 정확한 수치 질문이다. 원칙 3번에 따라 Precise Data Query를 사용한다.
+Action: Precise Data Query
+Action Input: 2025년 7월 10일 옥수수 감정점수
+Observation: 2025-07-10, 옥수수, 감정점수: 75, 시장 동향: 긍정적, 주요 키워드: 브라질 가뭄, 공급 우려
+Final Answer: 2025년 7월 10일 옥수수의 감정점수는 **75점**으로, 시장 동향은 '긍정적'입니다. 당시 **브라질 가뭄**으로 인한 공급 우려가 주요 키워드로 분석되었습니다.
+
+**예시 2: 복합적인 질문 (수치 + 배경)**
+[사용자 질문: "최근 밀 가격이 왜 이렇게 변동이 심해?"]
+Thought: '가격 변동'이라는 수치와 '왜'라는 이유를 함께 묻는 복합 질문이다. 먼저 Precise Data Query로 최근 가격을 확인하고, Market News and Summary Search로 원인을 찾는다.
+Action: Precise Data Query
+Action Input: 최근 밀 가격
+Observation: [최근 7일간의 밀 가격 데이터가 나열됨. 하락세를 보임]
+Thought: 가격이 하락한 것을 확인했다. 이제 하락 이유를 뉴스에서 찾는다.
+Action: Market News and Summary Search
+Action Input: 최근 밀 가격 하락 원인 국제 뉴스
+Observation: [우크라이나 수출 재개, 러시아 풍작 예상 등 공급 증가 요인에 대한 뉴스가 검색됨]
+Final Answer: 최근 밀 가격은 하락세를 보이고 있습니다. **2025년 7월 22일~28일 기준** 지난 7일간 밀 가격은 **O% 하락**했습니다. 주된 원인은 **우크라이나의 곡물 수출 재개**와 **러시아의 풍작 예상**에 따른 전 세계 공급량 증가 기대감으로 분석됩니다.
+
+**예시 3: 도구 선택**
+- "옥수수 지난 한주간 시황 주요 키워드 알려줘" → 시황/키워드 질문이므로 **Precise Data Query**를 먼저 사용 (Action Input: 옥수수 지난 한주간 시황 주요 키워드 감정점수 시장 동향)
+- "브라질 가뭄이 옥수수 시장에 미치는 영향을 과거 사례와 함께 설명해줘" → 영향/과거 사례 질문이므로 **Market News and Summary Search** 사용 (Action Input: 브라질 가뭄 옥수수 시장 영향 과거 사례 생산량 가격 상관관계)
+
+"""
+
+ANALYST_PROMPT_PREFIX = ANALYST_GUIDELINES + REACT_INSTRUCTIONS
+
+# ▽ 함수 호출(tools) 모드: 도구 목록/인자 형식은 API의 tools 파라미터로 전달되므로 사용 규칙만 설명
+TOOLS_AGENT_INSTRUCTIONS = """### 🛠️ 도구 사용 규칙
+- 도구는 함수 호출로 사용한다. 도구 이름은 공백 대신 밑줄을 쓴 소문자 형태다. (예: Precise Data Query → precise_data_query)
+- 서로 독립적인 조회(예: 옥수수와 밀의 감정점수, 뉴스 검색과 가격 조회)는 **한 번에 여러 도구를 동시에 호출**한다.
+- 계산 도구를 사용할 때는 입력에 **"상세한 계산 과정과 공식, 사용된 모든 수치를 단계별로 보여줘"** 라는 요구사항을 반드시 포함한다.
+- 도구 결과가 충분하면 추가 호출 없이 바로 최종 답변을 작성한다. 최종 답변에는 "Final Answer:" 같은 접두어를 붙이지 않는다.
+"""
+
+# ▽ 요청마다 바뀌는 부분 (프롬프트 끝에 위치)
+ANALYST_PROMPT_SUFFIX = """---
+[현재 날짜 정보]
+- 오늘 날짜: {current_date} ({current_year}년)
+
+[이전 대화 내용]
+{chat_history}
+
+[사용자 질문]
+{input}
+
+[당신의 생각과 행동 로그]
+{agent_scratchpad}
+"""
+
+
+AGENT_MODES = ("react", "tools", "plan")
+
+
+def _function_tool(tool: Tool) -> Tool:
+    """함수 호출 API는 이름에 공백을 허용하지 않으므로 'Precise Data Query' -> 'precise_data_query' 형태로 바꾼 도구"""
+    name = re.sub(r"[^a-zA-Z0-9_-]+", "_", tool.name).strip("_").lower()
+    return Tool(name=name, description=tool.description, func=tool.func, coroutine=tool.coroutine)
+
+
+def _create_tools_agent(tools: list, llm: ChatOpenAI):
+    """
+    [함수 호출(tools) 에이전트]
+    - 텍스트 "Action:/Action Input:" 파싱 대신 OpenAI 네이티브 tool calling을 사용하므로 파싱 오류 재시도가 없고,
+      한 번의 응답에서 여러 도구를 동시에 호출할 수 있습니다. (AgentExecutor가 비동기 실행 시 병렬로 처리)
+    - 이 모드의 최종 답변은 도구 호출이 없는 LLM 응답 전체이므로 final_answer 태그로 스트리밍합니다.
+    """
+    function_tools = [_function_tool(tool) for tool in tools]
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", ANALYST_GUIDELINES + TOOLS_AGENT_INSTRUCTIONS),
+        MessagesPlaceholder("chat_history", optional=True),
+        ("system", "[현재 날짜 정보]\n- 오늘 날짜: {current_date} ({current_year}년)"),
+        ("human", "{input}"),
+        MessagesPlaceholder("agent_scratchpad"),
+    ]).partial(current_date=_current_date_str, current_year=_current_year)
+    agent = create_openai_tools_agent(llm.with_config({"tags": [FINAL_ANSWER_TAG]}), function_tools, prompt)
+    return agent, function_tools, count_tokens(ANALYST_GUIDELINES + TOOLS_AGENT_INSTRUCTIONS)
+
+
+PLANNER_PROMPT = """당신은 농산물 시장 애널리스트 'Agri-GPT'의 작업 계획 담당입니다.
+사용자 질문에 답하기 위해 필요한 도구 호출 목록을 JSON으로만 출력하세요.
+
+[사용 가능한 도구]
+{tools}
+
+[규칙]
+- 서로의 결과가 필요 없는 **독립적인 호출**만 나열합니다. (예: "옥수수와 밀 감정점수 비교하고 크러시 마진 계산" → 옥수수 조회, 밀 조회, 계산 3개)
+- 한 호출에는 한 품목/한 가지 조회만 담고, 최대 {max_calls}개까지 나열합니다.
+- 입력은 도구가 이해할 수 있는 자연어 한 문장으로, 날짜/기간/품목을 구체적으로 적습니다. 계산 도구 입력에는 "상세한 계산 과정과 공식, 사용된 모든 수치를 단계별로 보여줘"를 포함합니다.
+- 앞선 도구 결과를 보고 다음 호출을 정해야 하는 질문이면 "parallel": false 로 표시합니다.
+- 도구가 필요 없는 질문(인사, 이전 답변에 대한 단순 후속 질문 등)이면 "calls"를 빈 목록으로 둡니다.
+
+[출력 형식]
+{{"parallel": true, "calls": [{{"tool": "도구 이름", "input": "도구 입력"}}]}}
+
+[현재 날짜 정보]
+- 오늘 날짜: {current_date}
+
+[이전 대화 내용]
+{chat_history}
+
+[사용자 질문]
+{input}"""
+
+
+# 질문에 언급된 데이터 종류 (두 종류 이상이면 도구 호출을 나눠 동시에 실행할 여지가 있음)
+PLAN_SOURCE_KEYWORDS = {
+    "score": ("감정점수", "감성점수", "심리점수", "점수", "sentiment", "score"),
+    "news": ("뉴스", "기사", "news", "article"),
+    "price": ("가격", "종가", "시세", "price"),
+    "calculation": ("계산", "변환", "마진", "베이시스", "calculate", "margin", "basis"),
+}
+
+
+def needs_plan(question: str) -> bool:
+    """
+    플래너 LLM을 호출할 만한 여러 부분으로 된 질문인지 판별합니다. (LLM 호출 없는 휴리스틱)
+    - 품목이 둘 이상, 날짜가 둘 이상, 또는 데이터 종류(점수/뉴스/가격/계산)가 둘 이상 언급된 경우
+    - 그 밖의 질문(인사, 단일 조회 등)은 대부분 도구가 없거나 하나뿐이므로 바로 ReAct 에이전트로 보냅니다.
+    """
+    if len(find_commodities(question)) > 1 or len(parse_query_details(question)["dates"]) > 1:
+        return True
+    q_lower = question.lower()
+    sources = sum(any(keyword in q_lower for keyword in keywords) for keywords in PLAN_SOURCE_KEYWORDS.values())
+    return sources > 1
+
+
+class PlanExecuteAgent:
+    """
+    [계획/실행(plan) 에이전트]
+    - 역할: 여러 부분으로 된 질문(예: "옥수수와 밀 이번 주 감정점수 비교하고 크러시 마진 계산해줘")에서
+            ReAct처럼 도구를 하나씩 순서대로 호출하지 않고,
+            1) 플래너 LLM 호출 한 번으로 독립적인 도구 호출 목록을 만들고
+            2) 모든 호출을 동시에 실행한 뒤 (도구는 ToolExecutor 스레드 풀에서 병렬 실행)
+            3) 결과를 모아 답변 생성 LLM 호출 한 번으로 최종 답변을 만듭니다.
+    - 여러 부분으로 된 질문(needs_plan)만 플래너를 호출하고, 나머지 질문은 플래너 호출 없이 바로 fallback(ReAct 에이전트)으로 보냅니다.
+    - 순차적인 추론이 필요한 질문("parallel": false), 도구가 필요 없는 질문, 계획 실패 시에도 fallback으로 넘깁니다.
+    - AgentExecutor와 같은 입력/출력({"input", "chat_history"} -> {"output", "intermediate_steps"})을 사용합니다.
+    """
+
+    def __init__(self, tools: list, llm: ChatOpenAI, fallback, memory=None, max_calls: int = 6):
+        self.tools = {tool.name: tool for tool in tools}
+        self.llm = llm
+        self.planner = llm.bind(response_format={"type": "json_object"})
+        self.fallback = fallback
+        self.memory = memory
+        self.max_calls = max_calls
+        self._tools_text = "\n".join(f"- {tool.name}: {tool.description}" for tool in tools)
+
+    async def _plan(self, inputs: Dict[str, Any], callbacks: list) -> Optional[List[Dict[str, str]]]:
+        """독립적인 도구 호출 목록을 반환합니다. 병렬로 나눌 수 없거나 계획이 잘못되면 None."""
+        chat_history = inputs.get("chat_history")
+        if isinstance(chat_history, list):
+            # 메시지 객체 목록은 repr 대신 "Human: ... / AI: ..." 형식의 대화 기록 텍스트로 변환
+            chat_history = get_buffer_string(chat_history)
+        prompt = PLANNER_PROMPT.format(
+            tools=self._tools_text, max_calls=self.max_calls, current_date=_current_date_str(),
+            chat_history=chat_history or "없음", input=inputs["input"],
+        )
+        response = await self.planner.ainvoke(prompt, config={"callbacks": callbacks})
+        try:
+            plan = json.loads(response.content)
+        except json.JSONDecodeError:
+            return None
+        if not plan.get("parallel", True):
+            return None
+        calls = [c for c in plan.get("calls", []) if isinstance(c, dict) and c.get("tool") in self.tools and c.get("input")]
+        if len(calls) != len(plan.get("calls", [])):
+            return None  # 존재하지 않는 도구를 계획한 경우
+        return calls[:self.max_calls]
+
+    async def ainvoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        config = config or {}
+        callbacks = config.get("callbacks") or []
+        if self.memory is not None and "chat_history" not in inputs:
+            inputs = {**inputs, **self.memory.load_memory_variables({})}
+
+        calls = await self._plan(inputs, callbacks) if needs_plan(inputs["input"]) else None
+        if not calls:
+            print("--- [plan 에이전트] 병렬 계획 불가 또는 도구 불필요 -> ReAct 에이전트로 처리 ---")
+            result = await self.fallback.ainvoke(inputs, config=config)
+        else:
+            print(f"--- [plan 에이전트] 도구 {len(calls)}개 동시 실행: {[c['tool'] for c in calls]} ---")
+            observations = await asyncio.gather(
+                *(self.tools[c["tool"]].arun(c["input"], callbacks=callbacks) for c in calls),
+                return_exceptions=True,
+            )
+            steps = [
+                (AgentAction(tool=c["tool"], tool_input=c["input"], log=""),
+                 f"도구 실행 중 오류가 발생했습니다: {obs}" if isinstance(obs, Exception) else str(obs))
+                for c, obs in zip(calls, observations)
+            ]
+            output = await synthesize_answer(
+                self.llm, inputs["input"], [(action.tool, obs) for action, obs in steps],
+                inputs.get("chat_history") or None, callbacks=callbacks,
+            )
+            result = {"input": inputs["input"], "output": output, "intermediate_steps": steps}
+
+        if self.memory is not None:
+            self.memory.save_context({"input": inputs["input"]}, {"output": result["output"]})
+        return result
+
+    def invoke(self, inputs: Dict[str, Any], config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        return asyncio.run(self.ainvoke(inputs, config))
+
+
+def _create_react_agent(tools: list, llm: ChatOpenAI):
+    # 프롬프트: 고정 부분(ANALYST_PROMPT_PREFIX)을 앞에 두어 OpenAI 프롬프트 캐시를 재사용하고,
+    # 날짜/대화 기록/질문/로그처럼 요청마다 바뀌는 부분은 끝에 둡니다. 날짜는 호출 시점에 계산됩니다.
+    analyst_prompt = PromptTemplate(
+        input_variables=["input", "agent_scratchpad", "chat_history", "tools", "tool_names"],
+        partial_variables={"current_date": _current_date_str, "current_year": _current_year},
+        template=ANALYST_PROMPT_PREFIX + ANALYST_PROMPT_SUFFIX,
+    )
+    tools_text = "\n".join(f"{tool.name}: {tool.description}" for tool in tools)
+    prefix_tokens = count_tokens(ANALYST_PROMPT_PREFIX.format(tools=tools_text, tool_names=", ".join(tool.name for tool in tools)))
+
+    # LLM, 도구, 커스텀 프롬프트를 결합해 에이전트 생성
+    return create_react_agent(llm, tools, analyst_prompt), tools, prefix_tokens
+
 
 # [핵심 수정] 함수의 타입 힌트도 llm: OpenAI -> llm: ChatOpenAI 로 변경합니다.
-def create_analyst_agent(tools: list, llm: ChatOpenAI, memory_turns: int = 15):
+def create_analyst_agent(tools: list, llm: ChatOpenAI, memory_turns: int = 15, with_memory: bool = True,
+                         max_iterations: int = 8, max_execution_time: float = 60, mode: str = "react"):
     """
     [에이전트 생성]
     - 역할: 대화 기록(Memory)과 명시적 도구 사용법이 포함된,
             고도로 커스터마이즈된 프롬프트를 적용하여 RAG 에이전트를 생성.
     - memory_turns: 이전 몇 번의 대화까지 기억할지 설정 (기본값 15)
+    - with_memory=False: 메모리 없이 생성하며, 호출 시 입력에 chat_history를 직접 넘겨야 합니다.
+      (여러 사용자가 하나의 에이전트를 공유하는 백엔드에서 세션별 기록을 쓰는 경우, app/session_store.py 참고)
+    - max_iterations / max_execution_time: ReAct 루프 상한. 요청별 토큰/단계 예산은 app/agent_budget.py의 RequestBudget으로 추가 제한합니다.
+      한도에 걸리면 "Agent stopped ..." 응답과 함께 intermediate_steps(지금까지의 도구 결과)를 반환합니다.
+    - mode: "react"(기본, 텍스트 ReAct 파싱), "tools"(네이티브 함수 호출, 병렬 도구 호출 허용),
+      "plan"(독립적인 도구 호출 목록을 한 번에 계획해 동시에 실행한 뒤 답변 생성, PlanExecuteAgent 참고).
+      모든 모드가 같은 가이드라인과 도구를 사용하므로 단계 수/지연 시간을 비교할 수 있습니다.
     """
-    print(f"--- [에이전트 생성] 대화 기록({memory_turns}턴)과 커스텀 프롬프트를 적용합니다... ---")
+    if mode not in AGENT_MODES:
+        raise ValueError(f"지원하지 않는 에이전트 모드입니다: {mode} (가능한 값: {', '.join(AGENT_MODES)})")
+    memory_desc = f"대화 기록({memory_turns}턴)" if with_memory else "세션별 대화 기록"
+    print(f"--- [에이전트 생성] {memory_desc}과 커스텀 프롬프트를 적용합니다... ---")
 
     # --- 대화 기록 메모리 객체 ---
     # ConversationBufferWindowMemory는 에이전트가 이전 대화의 맥락을 이해하는 데 사용됩니다.
@@ -20,189 +342,34 @@ def create_analyst_agent(tools: list, llm: ChatOpenAI, memory_turns: int = 15):
     memory = ConversationBufferWindowMemory(
         k=memory_turns, 
         memory_key="chat_history", 
-        return_messages=True
-    )
+        return_messages=True,
+        output_key="output" # intermediate_steps도 함께 반환하므로 기억할 출력 키를 지정
+    ) if with_memory else None
 
-    # 현재 날짜 정보 가져오기
-    from datetime import datetime
-    current_date = datetime.now()
-    current_date_str = current_date.strftime("%Y년 %m월 %d일")
-    
-    # 도구 정보 준비
-    tool_names = [tool.name for tool in tools] if tools else []
-    tool_names_str = ", ".join(tool_names)
-    
-    tools_description = ""
-    if tools:
-        for tool in tools:
-            tools_description += f"- {tool.name}: {tool.description}\n"
-    
-    # ▽ 시스템 프롬프트/가이드라인 (사용자님의 훌륭한 프롬프트를 그대로 사용합니다)
-    # tools와 tool_names 정보를 직접 템플릿에 포함
-    analyst_prompt = PromptTemplate(
-        input_variables=["input", "agent_scratchpad", "chat_history", "tools", "tool_names"],
-        template=f"""
-        당신은 세계 최고의 농산물 시장 전문 애널리스트 'Agri-GPT'입니다.
-        당신의 임무는 사용자의 질문 의도를 정확히 파악하여, 명확하고 신뢰도 높은 답변을 제공하는 것입니다.
-
-        [현재 날짜 정보]
-        - 오늘 날짜: {current_date_str} ({current_date.year}년)
-        - 사용자가 연도를 생략하면 항상 현재 연도({current_date.year})를 기준으로, 모호한 시간 표현은 오늘 날짜를 기준으로 해석하세요.
-
-        ---
-        ### ⭐ Agri-GPT 핵심 행동 원칙 ⭐
-
-        **1. [답변 깊이 조절 원칙] 사용자의 질문 수준에 맞춰 답변의 깊이를 조절한다.**
-        - **단순 사실 질문** (예: "오늘 옥수수 가격?"): 도구를 사용해 찾은 **핵심 정보만 간결하게** 답변한다.
-        - **분석/이유 질문** (예: "가격이 왜 올랐어?"): **'두괄식'으로 결론부터 말하고**, 도구로 찾은 데이터와 뉴스를 근거로 상세히 설명한다.
-        - **계산 질문** (예: "베이시스 계산해줘"): **과정을 단계별로 상세히 설명**하고, 마지막에 최종 결과를 제시한다.
-
-        **2. [맥락 기억 원칙] 이전 대화의 흐름을 기억하고 활용한다.**
-        - 항상 `chat_history`를 먼저 확인하여 품목, 기간 등 이전 대화의 핵심 맥락을 파악한다.
-        - 사용자가 단답형으로 질문하면(예: "밀은?"), 이전 질문의 맥락을 이어받아 답변한다.
-
-        **3. [최적 도구 사용 원칙] 질문의 종류에 따라 가장 효과적인 도구를 사용한다.**
-        - **계산**: "마진", "변환", "베이시스" 등 명확한 계산 단어가 있으면 **Commodity Calculator**를 사용한다.
-        - **정확한 수치**: 특정 날짜의 "가격", "감정점수" 등 구체적인 데이터는 **Precise Data Query**를 사용한다.
-        - **시황/키워드**: "시장 분위기", "동향", "시황", "키워드" 등은 **Precise Data Query**를 먼저 시도한다.
-          (구조화된 감정점수, 키워드 데이터가 더 정확함)
-        - **의미적 질문**: "영향", "관계", "원인", "배경 설명", "과거 유사 사례" 등은 **Market News Search**를 사용한다.
-          (RAG는 복합적 개념 이해와 의미적 검색에 특화됨)
-        - **도구 폴백 전략**: 첫 번째 도구에서 충분한 정보를 얻지 못하면 다른 도구를 추가로 사용한다.
-          예: SQL에서 데이터 부족 → RAG로 보완 검색, RAG에서 관련성 낮음 → SQL로 구체적 데이터 확인
-
-        **4. [기간 데이터 조회 전략] 사용자가 기간을 요청하면 가장 최신 데이터를 기준으로 조회한다.**
-        - "최근 N일간", "지난 N일간" 등의 요청시: 현재 날짜가 아닌 **DB의 가장 최신 날짜를 기준**으로 N일 전부터 조회
-        - 예: "최근 10일간 감정점수" → DB 최신 날짜가 7월 28일이면 7월 19일~28일 데이터 조회
-        - 도구 사용시 "최근" 키워드를 포함하여 기간 의도를 명확히 전달
-
-        **5. [데이터 상황 투명성 원칙] 데이터 제한사항을 사용자에게 명확히 알린다.**
-        - 최신 데이터가 현재 날짜보다 과거인 경우: **반드시 먼저 설명**한 후 답변 제공
-        - 예: "현재 가장 최신 데이터는 7월 28일까지입니다. 이를 기준으로 10일간(7월 19일~28일) 데이터를 분석해드리겠습니다."
-        - 요청한 기간의 데이터가 부족한 경우에도 **가용한 데이터 범위를 명시**
-
-        ---
-        ### 🛠️ 사용 가능한 도구 및 대화 기록
-
-        [사용 가능한 도구 목록]
-        {{tools}}
-
-        [도구 이름 목록]
-        {{tool_names}}
-
-        [이전 대화 내용]
-        {{chat_history}}
-        
-        ---
-        ### 📜 답변 생성 가이드라인
-
-        **[생성 절차]**
-        1.  **Thought**: 사용자의 질문과 대화 맥락을 종합해 핵심 의도를 파악하고, 위 '핵심 행동 원칙'에 따라 계획을 세운다.
-        2.  **Action**: 계획에 따라 사용할 도구의 이름을 선택한다.
-        3.  **Action Input**: 도구에 전달할 값을 적는다.
-            - **[중요]** 계산 도구 사용 시, Action Input에 **"상세한 계산 과정과 공식, 사용된 모든 수치를 단계별로 보여줘"** 라는 요구사항을 반드시 포함한다.
-        4.  **Observation**: 도구 실행 결과를 확인한다.
-        5.  **Thought**: 결과가 충분한지 판단한다. 부족하면 다른 Action을 계획하고, 충분하면 '답변 스타일 가이드'와 아래 '상황별 답변 예시'를 참고하여 최종 답변을 구성한다.
-        6.  **Final Answer**: 최종 답변을 생성한다.
-
-        **[답변 스타일 가이드]**
-        - **두괄식 답변**: 항상 결론부터 명확하게 제시한다.
-        - **간결한 문장**: 문장은 짧고 명확하게 작성한다.
-        - **가독성**: 문단 구분을 통해 읽기 쉽게 구성하고, 핵심 수치나 용어는 **볼드체**로 강조하여 가독성을 높인다.
-        - **근거 명시**: 답변의 근거가 된 데이터 기간(예: "7월 28일 기준"), 뉴스 등을 간결하게 언급한다.
-        - **주말/공휴일 처리**: 요청한 날짜의 데이터가 없으면, 가장 가까운 영업일 데이터를 제공하며 **"요청하신 날짜는 주말/공휴일로 데이터가 없어, 직전 영업일(YYYY-MM-DD) 데이터를 제공합니다."** 라고 명시한다.
-        
-        ---
-        ### 📘 상황별 답변 예시 (반드시 참고할 것)
-
-        **예시 1: 간단한 수치 질문**
-        [사용자 질문: "2025년 7월 10일 옥수수 감정점수 알려줘"]
-        Thought: 사용자가 구체적인 날짜와 품목의 '감정점수'라는 정확한 수치를 질문했다. 핵심 원칙 3번에 따라 Precise Data Query를 사용하는 것이 가장 적절하다.
-        Action: Precise Data Query
-        Action Input: 2025년 7월 10일 옥수수 감정점수
-        Observation: 2025-07-10, 옥수수, 감정점수: 75, 시장 동향: 긍정적, 주요 키워드: 브라질 가뭄, 공급 우려
-        Final Answer: 2025년 7월 10일 옥수수의 감정점수는 **75점**으로, 시장 동향은 '긍정적'입니다. 당시 **브라질 가뭄**으로 인한 공급 우려가 주요 키워드로 분석되었습니다.
-
-        **예시 2: 복합적인 질문 (수치 + 배경)**
-        [사용자 질문: "최근 밀 가격이 왜 이렇게 변동이 심해?"]
-        Thought: 사용자가 '가격 변동'이라는 수치와 '왜'라는 이유를 함께 질문했다. 이는 복합 질문이다. 먼저 Precise Data Query로 최근 가격 데이터를 확인하고, 그 다음 Market News and Summary Search로 변동의 원인이 된 뉴스를 검색해야 한다.
-        Action: Precise Data Query
-        Action Input: 최근 밀 가격
-        Observation: [최근 7일간의 밀 가격 데이터가 나열됨. 하락세를 보임]
-        Thought: 가격이 하락한 것을 확인했다. 이제 왜 하락했는지 이유를 찾기 위해 뉴스 검색을 해야겠다.
-        Action: Market News and Summary Search
-        Action Input: 최근 밀 가격 하락 원인 국제 뉴스
-        Observation: [우크라이나 수출 재개, 러시아 풍작 예상 등 공급 증가 요인에 대한 뉴스가 검색됨]
-        Final Answer: 최근 밀 가격은 하락세를 보이고 있습니다. **2025년 7월 22일~28일 기준** 데이터에 따르면 지난 7일간 밀 가격은 **O% 하락**했습니다. 이러한 가격 변동의 주된 원인은 **우크라이나의 곡물 수출 재개**와 **러시아의 풍작 예상**에 따른 전 세계 공급량 증가 기대감 때문으로 분석됩니다.
-
-        **예시 2-1: 시황/키워드 질문에 대한 올바른 도구 선택**
-        [사용자 질문: "옥수수 지난 한주간 시황 주요 키워드 알려줘"]
-        Thought: 사용자가 옥수수의 "지난 한주간 시황"과 "주요 키워드"를 요청했다. 이는 배경/설명이 필요한 질문이므로 개선된 원칙 3번에 따라 Precise Data Query를 먼저 시도해야 한다. (DB의 구조화된 데이터가 더 신뢰성 높음)
-        Action: Precise Data Query
-        Action Input: 옥수수 지난 한주간 시황 주요 키워드 감정점수 시장 동향
-        Observation: [옥수수의 최근 일주일간 감정점수, 시장 동향, 키워드 데이터가 충분히 제공됨]
-        Final Answer: 지난 한주간(7월 30일~8월 5일) 옥수수 시장 현황을 분석해드리겠습니다. **감정점수는 44점에서 34점으로 약세 전환**되었습니다. 주요 키워드는 **'Ample Supply'(풍부한 공급), 'Favorable Weather'(양호한 날씨), 'Bearish Pressure'(약세 압력), 'Export Demand'(수출 수요)** 등이었습니다. 전반적으로 좋은 기상 조건과 풍부한 공급으로 인한 약세 압력이 지배적이었으나, 수출 수요가 일부 지지 요인으로 작용했습니다.
-
-        **예시 2-2: RAG가 더 적합한 의미적 질문 예시**
-        [사용자 질문: "브라질 가뭄이 옥수수 시장에 미치는 영향을 과거 사례와 함께 설명해줘"]
-        Thought: 사용자가 "브라질 가뭄이 옥수수에 미치는 영향"과 "과거 사례"를 요청했다. 이는 복합적 개념 이해와 의미적 검색이 필요한 질문이므로, 개선된 원칙 3번에 따라 Market News and Summary Search를 사용해야 한다. (RAG는 이런 복합적 개념과 과거 유사 사례 검색에 특화됨)
-        Action: Market News and Summary Search
-        Action Input: 브라질 가뭄 옥수수 시장 영향 과거 사례 생산량 가격 상관관계
-        Observation: [브라질 가뭄과 관련된 뉴스, 과거 가뭄 시기의 옥수수 생산량 변화, 가격 영향 등이 검색됨]
-        Final Answer: 브라질 가뭄이 옥수수 시장에 미치는 영향을 과거 사례와 함께 분석해드리겠습니다. **브라질은 세계 3대 옥수수 수출국**으로, 가뭄 시 글로벌 공급 차질이 발생합니다. 과거 2021년 라니냐 현상으로 인한 브라질 가뭄 시에는 **옥수수 생산량이 15% 감소**하며 국제 가격이 30% 상승했습니다. 현재 상황에서도 브라질 남부 지역의 수분 부족이 **2차 작물(사프리나) 옥수수 생산에 부정적 영향**을 미칠 가능성이 높아, 글로벌 공급 우려가 제기되고 있습니다.
-
-        **예시 3: 완벽한 계산 답변 (순차 설명 방식)**
-        [사용자 질문: "7월 27일 밀의 베이시스는 +10입니다. 플랫가격을 톤단위로 바꿔주세요"]
-        Thought: 사용자가 밀의 '플랫가격'과 '톤단위 변환'을 요청했다. 이것은 명확한 계산 질문이므로 Commodity Calculator를 사용해야 한다. 핵심 원칙 1번에 따라 상세한 계산 과정을 모두 보여주기 위해, Action Input에 정해진 문구를 반드시 포함시켜야 한다.
-        Action: Commodity Calculator
-        Action Input: 7월 27일 밀 선물가격에 베이시스 +10을 더해서 플랫가격을 계산하고, 그 결과를 톤 단위로 변환해줘. 상세한 계산 과정과 함께 계산해줘. 사용된 모든 가격/수치, 계산 공식, 단계별 과정을 빠짐없이 보여줘.
-        Observation: [계산 결과 상세 정보]
-        Final Answer:
-        네, 7월 27일 밀의 플랫가격을 계산하고 톤 단위로 변환하는 과정을 상세히 알려드리겠습니다.
-
-        **1. 사용된 데이터**
-        * 밀 선물가격 (2025-07-27 기준): **523.75 USc/bu**
-        * 베이시스: **+10 cents**
-        * 단위 변환 계수 (밀): 1 톤 ≈ 36.7437 부셸
-
-        **2. 계산 공식**
-        * 플랫가격 (부셸 단위) = 선물가격 + 베이시스
-        * 플랫가격 (톤 단위) = (플랫가격 (부셸 단위) / 100) * 톤당 부셸 변환계수
-
-        **3. 단계별 계산 과정**
-        1.  **플랫가격 계산 (부셸 단위)**:
-            523.75 USc/bu + 10 cents = **533.75 USc/bu**
-        2.  **달러 단위로 변환**:
-            533.75 USc/bu ÷ 100 = **$5.3375/bu**
-        3.  **톤 단위로 최종 변환**:
-            $5.3375/bu * 36.7437 부셸/톤 = **$196.12/MT**
-
-        따라서, 최종 플랫가격은 **$196.12/MT** 입니다.
-
-        ---
-        [사용자 질문]
-        {{input}}
-
-        [당신의 생각과 행동 로그]
-        {{agent_scratchpad}}
-        """
-    )
+    if mode == "tools":
+        agent, agent_tools, prefix_tokens = _create_tools_agent(tools, llm)
+    else:
+        agent, agent_tools, prefix_tokens = _create_react_agent(tools, llm)
+    print(f"--- [에이전트 생성] {mode} 모드, 프롬프트 고정 부분: {prefix_tokens} 토큰 (요청별 토큰 수는 RequestBudget.prompt_tokens) ---")
 
-
-    # LLM, 도구, 커스텀 프롬프트를 결합해 에이전트 생성
-    agent = create_react_agent(llm, tools, analyst_prompt)
-
-    # AgentExecutor로 반환 (Memory 연동, 파싱에러 핸들링)
-    agent_executor = AgentExecutor(
+    # AgentExecutor로 반환 (Memory 연동, 파싱에러 핸들링, 요청별 예산 적용)
+    # plan 모드에서는 병렬로 나눌 수 없는 질문만 ReAct 에이전트로 넘기며, 메모리는 플래너가 관리합니다.
+    agent_executor = BudgetedAgentExecutor(
         agent=agent, 
-        tools=tools, 
-        memory=memory, 
+        tools=agent_tools, 
+        memory=memory if mode != "plan" else None, 
         verbose=True, # 에이전트의 생각 과정을 모두 출력하여 디버깅에 용이
         handle_parsing_errors=True, # LLM의 출력이 가끔 형식에 맞지 않을 때 나는 오류를 처리
-        max_iterations=20, # 파싱 오류 대응을 위해 반복 횟수 20회로 세팅
-        max_execution_time=120, # 최대 실행 시간 2분
-        early_stopping_method="generate" # 첫 번째 완전한 답변에서 중단
+        max_iterations=max_iterations, # 혼란에 빠진 실행이 LLM 호출을 계속 소모하지 않도록 제한
+        max_execution_time=max_execution_time,
+        # create_react_agent/create_openai_tools_agent(Runnable 에이전트)는 "generate"를 지원하지 않으므로 "force"로 중단하고,
+        # 호출자가 intermediate_steps로 요약 답변을 만듭니다. (backend_api.answer_in_session 참고)
+        early_stopping_method="force",
+        return_intermediate_steps=True
     )
 
+    if mode == "plan":
+        agent_executor = PlanExecuteAgent(tools, llm, agent_executor, memory=memory, max_calls=max(max_iterations - 1, 1))
+
     print("--- [에이전트 생성 완료] (대화 기록 및 커스텀 프롬프트 적용) ---")
     return agent_executor
\ No newline at end of file
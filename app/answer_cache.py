@@ -0,0 +1,127 @@
+import time
+import threading
+from collections import OrderedDict
+from datetime import date
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+from app.embedding_cache import normalize_query
+from app.query_parser import parse_query_details
+
+Entities = Tuple[Optional[str], Tuple[str, ...], Optional[str], Optional[str]]
+
+
+def query_entities(query: str) -> Entities:
+    """
+    캐시 키에 들어가는 질의 엔티티: (품목, 날짜들, 기간 유형, 기준 날짜)
+    - "오늘/어제/n일 전"은 parse_query_details가 절대 날짜로 바꾸므로 날짜가 바뀌면 키도 바뀝니다.
+    - "최근/최신"처럼 날짜가 없는 상대 기간은 오늘 날짜를 기준 날짜로 함께 저장해 자정이 지나면 재사용하지 않습니다.
+    """
+    parsed = parse_query_details(query)
+    date_range = parsed.get("date_range")
+    as_of = date.today().isoformat() if date_range else None
+    return parsed["commodity_name"], tuple(parsed["dates"]), date_range, as_of
+
+
+class SemanticAnswerCache:
+    """
+    [의미 기반 답변 캐시]
+    - 역할: 같은 데이터 기준일 안에서 의미가 거의 같은 질문("오늘 옥수수 시장 어때?" / "오늘 옥수수 시장은 어때")에
+            에이전트(ReAct 루프)를 다시 돌리지 않고 이전 답변을 바로 반환.
+    - 키: 질의 임베딩 + 질의 엔티티(품목/날짜, query_entities) + 데이터 버전(daily_market_summary의 최신 날짜).
+          엔티티와 데이터 버전이 정확히 같은 항목 중 코사인 유사도가 threshold 이상인 가장 가까운 답변을 사용합니다.
+          (날짜나 품목만 다른 질문은 임베딩이 거의 같아도 다른 답변이 필요하므로 유사도로 비교하지 않음)
+    - 무효화: 새 데이터가 인덱싱되면 invalidate()로 전체 삭제 (IndexRefresher의 on_refresh 콜백),
+              데이터 버전이 바뀌면 이전 버전 항목은 조회되지 않고, ttl_seconds가 지난 항목도 만료됩니다.
+    """
+
+    def __init__(self, embeddings: Embeddings, version_fn: Callable[[], Optional[str]],
+                 threshold: float = 0.95, max_entries: int = 500, ttl_seconds: float = 86400,
+                 version_ttl_seconds: float = 60):
+        self.embeddings = embeddings
+        self.version_fn = version_fn
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.version_ttl_seconds = version_ttl_seconds
+        self._lock = threading.Lock()
+        # 정규화한 질의 -> (단위 벡터, 엔티티, 데이터 버전, 답변, 저장 시각)
+        self._entries: "OrderedDict[str, Tuple[np.ndarray, Entities, Optional[str], str, float]]" = OrderedDict()
+        self._version: Optional[str] = None
+        self._version_checked_at = 0.0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def data_version(self) -> Optional[str]:
+        """최신 요약 날짜를 version_ttl_seconds 동안 재사용합니다. (질문마다 DB를 조회하지 않도록)"""
+        now = time.monotonic()
+        with self._lock:
+            if self._version_checked_at and now - self._version_checked_at < self.version_ttl_seconds:
+                return self._version
+        version = self.version_fn()
+        with self._lock:
+            self._version, self._version_checked_at = version, now
+        return version
+
+    def _embed(self, query: str) -> np.ndarray:
+        vector = np.asarray(self.embeddings.embed_query(normalize_query(query)), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, query: str) -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+        """
+        캐시된 답변을 찾습니다.
+        - 반환: (적중 시 {"answer", "similarity", "matched_query"} / 없으면 None, store()에 넘길 키)
+        """
+        version = self.data_version()
+        key = {"query": normalize_query(query), "vector": self._embed(query),
+               "entities": query_entities(query), "version": version}
+        now = time.monotonic()
+        best: Optional[Dict[str, Any]] = None
+        with self._lock:
+            expired = [q for q, (*_, stored_at) in self._entries.items() if now - stored_at > self.ttl_seconds]
+            for q in expired:
+                del self._entries[q]
+            for cached_query, (vector, entities, cached_version, answer, _) in self._entries.items():
+                if cached_version != version or entities != key["entities"]:
+                    continue
+                similarity = float(np.dot(vector, key["vector"]))
+                if similarity >= self.threshold and (best is None or similarity > best["similarity"]):
+                    best = {"answer": answer, "similarity": similarity, "matched_query": cached_query}
+            if best is not None:
+                self._entries.move_to_end(best["matched_query"])
+                best["similarity"] = round(best["similarity"], 4)
+                self.hits += 1
+            else:
+                self.misses += 1
+        return best, key
+
+    def store(self, key: Dict[str, Any], answer: str) -> None:
+        with self._lock:
+            self._entries[key["query"]] = (key["vector"], key["entities"], key["version"], answer, time.monotonic())
+            self._entries.move_to_end(key["query"])
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *_: Any) -> None:
+        """새 데이터가 반영되었을 때 전체 캐시와 데이터 버전을 비웁니다. (on_refresh 콜백으로 사용)"""
+        with self._lock:
+            self._entries.clear()
+            self._version_checked_at = 0.0
+            self.invalidations += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "data_version": self._version,
+                "threshold": self.threshold,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 3) if total else None,
+                "invalidations": self.invalidations,
+            }
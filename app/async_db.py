@@ -0,0 +1,72 @@
+import os
+import asyncio
+from typing import Any, Dict, List, Optional
+
+import asyncpg
+
+
+class AsyncDatabase:
+    """
+    [비동기 DB 접근 계층]
+    - 역할: FastAPI 대시보드 엔드포인트가 이벤트 루프를 막지 않도록, asyncpg 커넥션 풀로 쿼리를 비동기 실행.
+      (psycopg2/pd.read_sql은 동기 호출이라 느린 쿼리 하나가 동시 요청과 SSE 채팅 스트림을 모두 멈추게 함)
+    - 풀은 첫 쿼리 때 만들어지며, 종료 시 close()로 정리합니다.
+    - 쿼리 파라미터는 asyncpg 형식($1, $2, ...)을 사용합니다.
+    """
+
+    def __init__(self, min_size: int = 1, max_size: int = 10, command_timeout: float = 30, **connect_kwargs: Any):
+        self.min_size = min_size
+        self.max_size = max_size
+        self.command_timeout = command_timeout
+        self.connect_kwargs = connect_kwargs
+        self._pool: Optional[asyncpg.Pool] = None
+        self._lock = asyncio.Lock()
+
+    async def pool(self) -> asyncpg.Pool:
+        if self._pool is None:
+            async with self._lock:
+                if self._pool is None:
+                    self._pool = await asyncpg.create_pool(
+                        min_size=self.min_size,
+                        max_size=self.max_size,
+                        command_timeout=self.command_timeout,
+                        max_inactive_connection_lifetime=float(os.environ.get("DB_POOL_MAX_LIFETIME_SECONDS", 1800)),
+                        **self.connect_kwargs,
+                    )
+        return self._pool
+
+    async def fetch(self, query: str, *args: Any) -> List[Dict[str, Any]]:
+        pool = await self.pool()
+        rows = await pool.fetch(query, *args)
+        return [dict(row) for row in rows]
+
+    async def fetchval(self, query: str, *args: Any) -> Any:
+        pool = await self.pool()
+        return await pool.fetchval(query, *args)
+
+    def stats(self) -> Dict[str, Any]:
+        if self._pool is None:
+            return {"status": "not_initialized"}
+        return {
+            "max_connections": self.max_size,
+            "open_connections": self._pool.get_size(),
+            "idle_connections": self._pool.get_idle_size(),
+        }
+
+    async def close(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+
+def create_async_database() -> AsyncDatabase:
+    """환경변수 DB_* 설정으로 비동기 DB 접근 객체를 만듭니다. (풀 크기는 동기 풀과 같은 DB_POOL_MIN/MAX 사용)"""
+    return AsyncDatabase(
+        min_size=int(os.environ.get("DB_POOL_MIN", 1)),
+        max_size=int(os.environ.get("DB_POOL_MAX", 10)),
+        host=os.environ.get("DB_HOST", "localhost"),
+        database=os.environ.get("DB_NAME", "market_sentiment"),
+        user=os.environ.get("DB_USER", "postgres"),
+        password=os.environ.get("DB_PASSWORD", "password"),
+        port=int(os.environ.get("DB_PORT", "5432")),
+    )
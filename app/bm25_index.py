@@ -0,0 +1,179 @@
+import os
+import re
+import json
+import math
+import sqlite3
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+|[가-힣]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    BM25용 토크나이저.
+    - 영문/숫자는 소문자 단어 단위 ("SMN25" → "smn25", "WASDE" → "wasde")
+    - 한글은 조사가 붙어도 매칭되도록 단어 + 글자 bigram을 함께 사용 ("옥수수의" → "옥수수의", "옥수", "수수", "수의")
+    """
+    tokens = []
+    for word in TOKEN_PATTERN.findall(text.lower()):
+        tokens.append(word)
+        if len(word) > 2 and "가" <= word[0] <= "힣":
+            tokens.extend(word[i:i + 2] for i in range(len(word) - 1))
+    return tokens
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Chroma where 절(이 프로젝트에서 쓰는 $eq/$in/$gte/$lte/$and/$or)을 메타데이터에 적용합니다."""
+    if not where:
+        return True
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, c) for c in cond):
+                return False
+        else:
+            value = metadata.get(key)
+            if not isinstance(cond, dict):
+                cond = {"$eq": cond}
+            for op, target in cond.items():
+                if value is None:
+                    return False
+                if op == "$eq" and value != target:
+                    return False
+                if op == "$ne" and value == target:
+                    return False
+                if op == "$in" and value not in target:
+                    return False
+                if op == "$gte" and not value >= target:
+                    return False
+                if op == "$lte" and not value <= target:
+                    return False
+                if op == "$gt" and not value > target:
+                    return False
+                if op == "$lt" and not value < target:
+                    return False
+    return True
+
+
+class BM25Index:
+    """
+    [BM25 키워드 인덱스]
+    - 역할: 벡터 인덱스와 같은 chunk(같은 chunk ID)를 역색인(inverted index)으로 보관하고 BM25로 점수화.
+      티커/고유명사("SMN25", "WASDE", "B40", "Abiove")처럼 임베딩 유사도로 잘 안 잡히는 질의를 보완하며,
+      질의 임베딩 API 호출이 필요 없습니다.
+    - 저장: 메모리 역색인 + SQLite(<persist_dir>/bm25_index.sqlite3)에 chunk별 단어 빈도/메타데이터를 영구 저장.
+      본문은 저장하지 않고, 검색 결과는 chunk ID로 Chroma에서 가져옵니다.
+    """
+
+    def __init__(self, path: str, k1: float = 1.5, b: float = 0.75):
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        self._lock = threading.RLock()
+        self._postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self._doc_terms: Dict[str, Dict[str, int]] = {}
+        self._doc_len: Dict[str, int] = {}
+        self._metadata: Dict[str, Dict[str, Any]] = {}
+        self._total_len = 0
+        self.loaded = False
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS bm25_docs (chunk_id TEXT PRIMARY KEY, terms TEXT NOT NULL, metadata TEXT NOT NULL)"
+            )
+
+    def __len__(self) -> int:
+        return len(self._doc_len)
+
+    def __contains__(self, chunk_id: str) -> bool:
+        return chunk_id in self._doc_len
+
+    def load(self) -> None:
+        """SQLite에 저장된 역색인을 메모리로 불러옵니다. (백그라운드 스레드에서 호출)"""
+        with self._lock:
+            for chunk_id, terms, metadata in self._conn.execute("SELECT chunk_id, terms, metadata FROM bm25_docs"):
+                self._put(chunk_id, json.loads(terms), json.loads(metadata))
+            self.loaded = True
+
+    def _remove(self, chunk_id: str) -> None:
+        old_terms = self._doc_terms.pop(chunk_id, None)
+        if old_terms is None:
+            return
+        for term in old_terms:
+            self._postings[term].pop(chunk_id, None)
+            if not self._postings[term]:
+                del self._postings[term]
+        self._total_len -= self._doc_len.pop(chunk_id)
+        self._metadata.pop(chunk_id, None)
+
+    def _put(self, chunk_id: str, terms: Dict[str, int], metadata: Dict[str, Any]) -> None:
+        self._remove(chunk_id)
+        self._doc_terms[chunk_id] = terms
+        for term, tf in terms.items():
+            self._postings[term][chunk_id] = tf
+        length = sum(terms.values())
+        self._doc_len[chunk_id] = length
+        self._total_len += length
+        self._metadata[chunk_id] = metadata
+
+    def upsert(self, ids: List[str], docs: List[Document]) -> None:
+        """chunk들을 역색인에 추가(같은 ID는 교체)하고 SQLite에도 한 트랜잭션으로 기록합니다."""
+        rows = []
+        with self._lock:
+            for chunk_id, doc in zip(ids, docs):
+                terms = dict(Counter(tokenize(doc.page_content)))
+                self._put(chunk_id, terms, doc.metadata)
+                rows.append((chunk_id, json.dumps(terms, ensure_ascii=False), json.dumps(doc.metadata, ensure_ascii=False, default=str)))
+            with self._conn:
+                self._conn.executemany("INSERT OR REPLACE INTO bm25_docs (chunk_id, terms, metadata) VALUES (?, ?, ?)", rows)
+
+    def delete(self, ids: List[str]) -> None:
+        """chunk들을 역색인과 SQLite에서 삭제합니다."""
+        with self._lock:
+            for chunk_id in ids:
+                self._remove(chunk_id)
+            with self._conn:
+                self._conn.executemany("DELETE FROM bm25_docs WHERE chunk_id = ?", [(chunk_id,) for chunk_id in ids])
+
+    def search(self, query: str, k: int = 20, where: Optional[Dict[str, Any]] = None) -> List[Tuple[str, float]]:
+        """BM25 점수 상위 k개의 (chunk_id, score)를 반환합니다. where는 메타데이터 필터입니다."""
+        with self._lock:
+            n_docs = len(self._doc_len)
+            if not n_docs:
+                return []
+            avg_len = self._total_len / n_docs
+            scores: Dict[str, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (n_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+                for chunk_id, tf in postings.items():
+                    norm = tf + self.k1 * (1 - self.b + self.b * self._doc_len[chunk_id] / avg_len)
+                    scores[chunk_id] += idf * tf * (self.k1 + 1) / norm
+            if where:
+                scores = {cid: s for cid, s in scores.items() if matches_where(self._metadata.get(cid, {}), where)}
+        return sorted(scores.items(), key=lambda x: x[1], reverse=True)[:k]
+
+
+def reciprocal_rank_fusion(ranked_lists: List[List[str]], k: int = 60) -> List[Tuple[str, float]]:
+    """
+    여러 검색 결과 순위를 RRF(Reciprocal Rank Fusion)로 합칩니다: score = Σ 1 / (k + rank)
+    - 점수 척도가 다른 벡터/BM25 결과를 순위만으로 공정하게 결합합니다.
+    """
+    fused: Dict[str, float] = defaultdict(float)
+    for ranked in ranked_lists:
+        for rank, item_id in enumerate(ranked, start=1):
+            fused[item_id] += 1.0 / (k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
+
+
+def open_bm25_index(persist_dir: str, variant: str = "full") -> BM25Index:
+    filename = "bm25_index.sqlite3" if variant == "full" else f"bm25_index_{variant}.sqlite3"
+    return BM25Index(os.path.join(persist_dir, filename))
@@ -1,34 +1,85 @@
 import os
+import re
 import pandas as pd
-import psycopg2
-from typing import List
+from typing import List, Optional, Tuple
 from langchain_core.documents import Document
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from dotenv import load_dotenv
 from langchain_community.vectorstores import Chroma
 
+from app.db import db_connection
+
 load_dotenv()
 
+# 문서 메타데이터 구성이 바뀌면 올립니다. 벡터 인덱스가 이 값을 보고 기존 chunk의 메타데이터를 한 번 다시 반영합니다.
+DOCUMENT_METADATA_VERSION = "2"
+
+# 기사 문서 구성 방식 (환경변수 RAG_INDEX_VARIANT)
+# - full: 기사 본문 전체를 포함 (1000자 단위 chunk로 분할)
+# - compact: 분석 근거 + 키워드 + 리드 문단만 포함한 기사당 1개의 짧은 문서 (본문 전체는 필요할 때 get_article_full_text로 조회)
+INDEX_VARIANTS = ("full", "compact")
+LEAD_PARAGRAPH_CHARS = 400
+
+
+def get_index_variant() -> str:
+    variant = os.environ.get("RAG_INDEX_VARIANT", "full").lower()
+    if variant not in INDEX_VARIANTS:
+        raise ValueError(f"RAG_INDEX_VARIANT는 {INDEX_VARIANTS} 중 하나여야 합니다: {variant}")
+    return variant
+
+
+def lead_paragraph(content, max_chars: int = LEAD_PARAGRAPH_CHARS) -> str:
+    """기사 본문의 첫 문단(비어 있지 않은 첫 줄 묶음)을 max_chars 이내로 반환합니다."""
+    if not isinstance(content, str):
+        return ""
+    for paragraph in re.split(r"\n\s*\n", content.strip()):
+        paragraph = " ".join(paragraph.split())
+        if paragraph:
+            return paragraph if len(paragraph) <= max_chars else paragraph[:max_chars].rstrip() + "…"
+    return ""
+
+
+def build_filter_metadata(date_value, sentiment_score) -> dict:
+    """
+    검색 필터용 구조화 메타데이터를 만듭니다.
+    - date_int: yyyymmdd 정수 (Chroma where에서 범위 조건 $gte/$lte 사용 가능)
+    - sentiment_score: 감성 점수, impact: 50점(중립)에서 떨어진 정도 (sql_query_tool의 영향도와 동일한 정의)
+    Chroma 메타데이터는 None을 허용하지 않으므로, 값이 없는 항목은 넣지 않습니다.
+    """
+    metadata = {}
+    if pd.notna(date_value):
+        metadata["date_int"] = int(pd.Timestamp(date_value).strftime("%Y%m%d"))
+    if pd.notna(sentiment_score):
+        metadata["sentiment_score"] = float(sentiment_score)
+        metadata["impact"] = abs(float(sentiment_score) - 50)
+    return metadata
+
+
+def read_sql(query: str, params=None) -> pd.DataFrame:
+    """공용 커넥션 풀의 연결로 쿼리를 실행해 DataFrame으로 반환합니다."""
+    with db_connection() as conn:
+        return pd.read_sql(query, conn, params=params)
+
 
-def get_documents_from_postgres() -> List[Document]:
+def get_documents_from_postgres(news_ids: Optional[List[int]] = None,
+                                summary_dates: Optional[List[str]] = None,
+                                variant: Optional[str] = None, raise_errors: bool = False) -> List[Document]:
     """
     [데이터 로더]
     - 역할: PostgreSQL DB에 연결하여, RAG가 사용할 'Document' 객체 리스트로 가공함.
     - 핵심 전략:
         1. 개별 뉴스(raw_news)와 그에 대한 원자재별 분석(news_analysis_results)을 JOIN한 결과의 **각 row를 하나의 독립된 문서**로 만듦.
         2. 일일 요약(daily_market_summary) 데이터도 마찬가지로 각 row를 별개의 문서로 만듦.
+    - news_ids / summary_dates를 넘기면 해당 뉴스·날짜의 row만 가져옵니다. (인덱스 증분 갱신용, 빈 리스트면 해당 종류는 건너뜀)
+    - variant: 기사 문서 구성 방식 ("full" / "compact", 기본값은 환경변수 RAG_INDEX_VARIANT)
+    - raise_errors: True면 DB 오류를 그대로 올립니다. (빈 결과와 로딩 실패를 구분해야 하는 인덱스 갱신용)
     """
+    variant = variant or get_index_variant()
     print("--- [데이터 로딩] PostgreSQL에서 데이터를 가공합니다... ---")
     documents = []
 
     try:
-        conn = psycopg2.connect(
-            host=os.environ.get("DB_HOST"), dbname=os.environ.get("DB_NAME"),
-            user=os.environ.get("DB_USER"), password=os.environ.get("DB_PASSWORD"),
-            port=os.environ.get("DB_PORT")
-        )
-
         # --- 1. 개별 뉴스 분석 데이터 가공 ---
         print("  - 개별 뉴스 및 분석 데이터를 가공 중...")
         # ↓ 아래 쿼리의 결과 row 하나가 문서 하나가 됨.
@@ -40,24 +91,40 @@ def get_documents_from_postgres() -> List[Document]:
         FROM raw_news as r
         JOIN news_analysis_results nar ON r.id = nar.raw_news_id
         JOIN commodities c ON nar.commodity_id = c.id
-        WHERE r.analysis_status = TRUE;
+        WHERE r.analysis_status = TRUE
         """
-        df_articles = pd.read_sql(query_articles, conn)
+        if news_ids is None:
+            df_articles = read_sql(query_articles)
+        elif news_ids:
+            df_articles = read_sql(query_articles + " AND r.id = ANY(%s)", params=[list(news_ids)])
+        else:
+            df_articles = pd.DataFrame()
 
         for _, row in df_articles.iterrows():
             # [핵심 수정] 검색에 필요한 모든 텍스트 정보를 page_content에 포함시킴.
+            # compact: 본문 대신 리드 문단만 넣어, 이미 저장된 분석 근거/키워드 중심의 짧은 문서로 만듦.
+            if variant == "compact":
+                body_line = f"리드 문단: {lead_paragraph(row['content'])}"
+            else:
+                body_line = f"본문: {row['content']}"
             page_content = f"""
             품목: {row['commodity_name']}
             기사 제목: {row['title']}
             발행 시간: {row['published_time']}
-            본문: {row['content']}
+            {body_line}
             감성 점수: {row['sentiment_score']}
             감성 점수 근거: {row['reasoning']}
             주요 키워드: {row['keywords']}
             """
             # metadata에는 필터링이나 참조에 사용할 ID와 출처 등을 저장!
+            # commodity는 청크 ID(type+id+commodity+chunk 순번)의 구성 요소이므로 반드시 포함
+            # (하나의 뉴스가 여러 품목으로 분석될 수 있음)
+            # commodity/date_int/sentiment_score/impact는 검색 시 Chroma where 필터에도 사용됩니다.
             metadata = {
-                "type": "article_analysis", "news_id": row['id'], "source": row['source']
+                "type": "article_analysis", "news_id": int(row['id']), "source": row['source'],
+                "commodity": row['commodity_name'],
+                "date": row['published_time'].strftime("%Y-%m-%d") if pd.notna(row['published_time']) else "",
+                **build_filter_metadata(row['published_time'], row['sentiment_score'])
             }
             documents.append(Document(page_content=page_content.strip(), metadata=metadata))
 
@@ -69,9 +136,14 @@ def get_documents_from_postgres() -> List[Document]:
             dms.date, dms.daily_sentiment_score, dms.daily_reasoning,
             dms.daily_keywords, c.name as commodity_name, dms.analyzed_news_count
         FROM daily_market_summary dms
-        JOIN commodities c ON dms.commodity_id = c.id;
+        JOIN commodities c ON dms.commodity_id = c.id
         """
-        df_summary = pd.read_sql(query_summary, conn)
+        if summary_dates is None:
+            df_summary = read_sql(query_summary)
+        elif summary_dates:
+            df_summary = read_sql(query_summary + " WHERE dms.date = ANY(%s::date[])", params=[list(summary_dates)])
+        else:
+            df_summary = pd.DataFrame()
 
         for _, row in df_summary.iterrows():
             page_content = f"""
@@ -83,18 +155,60 @@ def get_documents_from_postgres() -> List[Document]:
             분석된 뉴스 수: {row['analyzed_news_count']}
             """
             metadata = {
-                "type": "daily_summary", "date": str(row['date']), "commodity": row['commodity_name']
+                "type": "daily_summary", "date": str(row['date']), "commodity": row['commodity_name'],
+                **build_filter_metadata(row['date'], row['daily_sentiment_score'])
             }
             documents.append(Document(page_content=page_content.strip(), metadata=metadata))
 
 
-        conn.close()
-
     except Exception as e:
         print(f"DB 연결 또는 쿼리 오류: {e}.")
+        if raise_errors:
+            raise
         # DB 연결 실패 시, 최소한의 작동을 위한 빈 리스트 반환
         return []
 
     print(f"--- [데이터 로딩 완료] 총 {len(documents)}개의 문서(기사 분석 + 일일 요약)를 생성했습니다. ---")
     return documents
 
+
+
+def get_document_keys_from_postgres() -> Tuple[List[Tuple[int, str, object]], List[Tuple[str, str]]]:
+    """
+    [문서 키 조회]
+    - 역할: 본문 없이 문서 식별 키만 가볍게 조회함. (벡터 인덱스에 아직 없는 row를 찾는 용도)
+    - 반환: (기사 키 [(news_id, commodity, published_time)], 요약 키 [(date 문자열, commodity)])
+    """
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT r.id, c.name, r.published_time
+            FROM raw_news r
+            JOIN news_analysis_results nar ON r.id = nar.raw_news_id
+            JOIN commodities c ON nar.commodity_id = c.id
+            WHERE r.analysis_status = TRUE
+        """)
+        article_keys = [(int(news_id), name, published) for news_id, name, published in cur.fetchall()]
+        cur.execute("""
+            SELECT dms.date, c.name
+            FROM daily_market_summary dms
+            JOIN commodities c ON dms.commodity_id = c.id
+        """)
+        summary_keys = [(str(d), name) for d, name in cur.fetchall()]
+    return article_keys, summary_keys
+
+
+def get_article_full_text(news_id: int) -> Optional[dict]:
+    """
+    [기사 원문 조회]
+    - 역할: compact 인덱스에서는 본문 전체를 임베딩하지 않으므로, 에이전트가 필요할 때 news_id로 원문을 가져옴.
+    - 반환: {"id", "title", "content", "published_time", "source"} (없으면 None)
+    """
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute(
+            "SELECT id, title, content, published_time, source FROM raw_news WHERE id = %s",
+            (int(news_id),),
+        )
+        row = cur.fetchone()
+    if row is None:
+        return None
+    return dict(zip(["id", "title", "content", "published_time", "source"], row))
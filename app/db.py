@@ -0,0 +1,182 @@
+import os
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Set
+
+import psycopg2
+from psycopg2.pool import ThreadedConnectionPool, PoolError
+
+
+class ConnectionPool:
+    """
+    [DB 커넥션 풀]
+    - 역할: 요청/도구 호출마다 새 연결(TCP + 인증)을 맺지 않도록, 스레드 안전한 psycopg2 커넥션 풀을 공유.
+    - 최대 maxconn개로 제한되며, 모두 사용 중이면 acquire_timeout초까지 기다린 뒤 PoolError를 발생시킵니다.
+    - 상태 점검: health_check_seconds 이상 쉬었던 연결은 꺼낼 때 SELECT 1로 확인하고, 끊겼으면 새 연결로 교체.
+    - 최대 수명: max_lifetime_seconds가 지난 연결은 반납 시 닫아 주기적으로 재연결합니다.
+    - connection() 컨텍스트를 벗어날 때 예외가 없으면 commit, 있으면 rollback 후 반납하므로 연결이 새지 않습니다.
+    """
+
+    def __init__(self, minconn: int = 1, maxconn: int = 10, max_lifetime_seconds: float = 1800,
+                 health_check_seconds: float = 30, acquire_timeout: float = 10, **connect_kwargs: Any):
+        self.maxconn = maxconn
+        self.max_lifetime_seconds = max_lifetime_seconds
+        self.health_check_seconds = health_check_seconds
+        self.acquire_timeout = acquire_timeout
+        self._pool = ThreadedConnectionPool(minconn, maxconn, **connect_kwargs)
+        # psycopg2 풀은 한도를 넘으면 즉시 오류를 내므로, 세마포어로 빈 연결이 생길 때까지 기다리게 합니다.
+        self._slots = threading.BoundedSemaphore(maxconn)
+        self._lock = threading.Lock()
+        self._born: Dict[int, float] = {}      # id(conn) -> 처음 사용한 시각
+        self._last_used: Dict[int, float] = {}  # id(conn) -> 마지막 반납 시각
+        self._prepared: Dict[int, Set[str]] = {}  # id(conn) -> 이 연결(세션)에 PREPARE된 문장 이름 (app/queries.py)
+        self._in_use = 0
+        self.metrics = {
+            "checkouts": 0, "connections_opened": 0, "recycled": 0, "broken": 0,
+            "timeouts": 0, "max_in_use": 0, "wait_seconds_total": 0.0,
+        }
+
+    def _forget(self, conn) -> None:
+        self._born.pop(id(conn), None)
+        self._last_used.pop(id(conn), None)
+        self._prepared.pop(id(conn), None)
+
+    def _is_healthy(self, conn) -> bool:
+        if conn.closed:
+            return False
+        last_used = self._last_used.get(id(conn))
+        if last_used is None or time.monotonic() - last_used < self.health_check_seconds:
+            return True  # 새 연결이거나 최근에 정상 반납된 연결
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _checkout(self):
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=self.acquire_timeout):
+            with self._lock:
+                self.metrics["timeouts"] += 1
+            raise PoolError(f"DB 커넥션 풀이 가득 찼습니다 ({self.maxconn}개 사용 중, {self.acquire_timeout}초 대기)")
+        try:
+            conn = self._pool.getconn()
+            while not self._is_healthy(conn):
+                with self._lock:
+                    self.metrics["broken"] += 1
+                    self._forget(conn)
+                self._pool.putconn(conn, close=True)
+                conn = self._pool.getconn()
+        except Exception:
+            self._slots.release()
+            raise
+        with self._lock:
+            if id(conn) not in self._born:
+                self._born[id(conn)] = time.monotonic()
+                self.metrics["connections_opened"] += 1
+            self._in_use += 1
+            self.metrics["checkouts"] += 1
+            self.metrics["max_in_use"] = max(self.metrics["max_in_use"], self._in_use)
+            self.metrics["wait_seconds_total"] += time.monotonic() - started
+        return conn
+
+    def _release(self, conn, broken: bool) -> None:
+        now = time.monotonic()
+        with self._lock:
+            expired = now - self._born.get(id(conn), now) > self.max_lifetime_seconds
+            close = broken or conn.closed or expired
+            if close:
+                self.metrics["broken" if broken or conn.closed else "recycled"] += 1
+                self._forget(conn)
+            else:
+                self._last_used[id(conn)] = now
+            self._in_use -= 1
+        try:
+            self._pool.putconn(conn, close=close)
+        finally:
+            self._slots.release()
+
+    @contextmanager
+    def connection(self) -> Iterator[Any]:
+        conn = self._checkout()
+        broken = False
+        try:
+            yield conn
+            conn.commit()
+        except Exception as e:
+            broken = isinstance(e, (psycopg2.OperationalError, psycopg2.InterfaceError))
+            with self._lock:
+                # 롤백 후에는 PREPARE 상태를 확신할 수 없으므로 다음 사용 때 서버에서 다시 확인
+                self._prepared.pop(id(conn), None)
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except psycopg2.Error:
+                    broken = True
+            raise
+        finally:
+            self._release(conn, broken)
+
+    def prepared_statements(self, conn) -> Set[str]:
+        """연결별로 PREPARE된 문장 이름 집합 (연결을 빌린 스레드만 수정하므로 반환된 집합을 그대로 갱신합니다)"""
+        with self._lock:
+            return self._prepared.setdefault(id(conn), set())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_connections": self.maxconn,
+                "in_use": self._in_use,
+                "open_connections": len(self._born),
+                **self.metrics,
+                "wait_seconds_total": round(self.metrics["wait_seconds_total"], 3),
+            }
+
+    def close(self) -> None:
+        self._pool.closeall()
+
+
+_pool: Optional[ConnectionPool] = None
+_pool_lock = threading.Lock()
+
+
+def get_pool() -> ConnectionPool:
+    """환경변수 DB_* 설정으로 프로세스 공용 커넥션 풀을 (처음 호출 시) 만들어 반환합니다."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ConnectionPool(
+                minconn=int(os.environ.get("DB_POOL_MIN", 1)),
+                maxconn=int(os.environ.get("DB_POOL_MAX", 10)),
+                max_lifetime_seconds=float(os.environ.get("DB_POOL_MAX_LIFETIME_SECONDS", 1800)),
+                health_check_seconds=float(os.environ.get("DB_POOL_HEALTH_CHECK_SECONDS", 30)),
+                acquire_timeout=float(os.environ.get("DB_POOL_ACQUIRE_TIMEOUT", 10)),
+                host=os.environ.get("DB_HOST", "localhost"),
+                dbname=os.environ.get("DB_NAME", "market_sentiment"),
+                user=os.environ.get("DB_USER", "postgres"),
+                password=os.environ.get("DB_PASSWORD", "password"),
+                port=os.environ.get("DB_PORT", "5432"),
+            )
+        return _pool
+
+
+@contextmanager
+def db_connection() -> Iterator[Any]:
+    """공용 풀에서 연결을 빌려 쓰고 반납합니다. 사용법: with db_connection() as conn: ..."""
+    with get_pool().connection() as conn:
+        yield conn
+
+
+def pool_stats() -> Dict[str, Any]:
+    return _pool.stats() if _pool is not None else {"status": "not_initialized"}
+
+
+def close_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.close()
+            _pool = None
@@ -0,0 +1,161 @@
+import os
+from datetime import date, timedelta
+from typing import Any, Dict, Iterator, List, Tuple
+
+import psycopg2
+
+# 자주 실행되는 조회(sql_query_tool, 대시보드, 일일 요약 생성, 뉴스 분석 작업 조회)를 위한 인덱스.
+# (이름, 테이블, CREATE INDEX 문) - 운영 중인 테이블을 잠그지 않도록 CONCURRENTLY로 생성합니다.
+INDEXES: List[Tuple[str, str, str]] = [
+    # 날짜 조건은 DATE(published_time) = d 대신 published_time >= d AND published_time < d + 1 범위로 조회
+    ("idx_raw_news_published_time", "raw_news",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_raw_news_published_time ON raw_news (published_time)"),
+    # 아직 분석하지 않은 뉴스 (analyze_news.fetch_news_to_analyze) - 분석이 끝난 대부분의 행은 인덱스에 들어가지 않음
+    ("idx_raw_news_unanalyzed", "raw_news",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_raw_news_unanalyzed ON raw_news (id) WHERE analysis_status = FALSE"),
+    ("idx_daily_market_summary_commodity_date", "daily_market_summary",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_daily_market_summary_commodity_date ON daily_market_summary (commodity_id, date)"),
+    ("idx_price_history_commodity_date", "price_history",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_price_history_commodity_date ON price_history (commodity_id, date)"),
+    ("idx_news_analysis_results_raw_news_id", "news_analysis_results",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_news_analysis_results_raw_news_id ON news_analysis_results (raw_news_id)"),
+    ("idx_news_analysis_results_commodity_id", "news_analysis_results",
+     "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_news_analysis_results_commodity_id ON news_analysis_results (commodity_id)"),
+]
+
+# 날짜 단위로 묶는 조회(일일 요약 작업 찾기)용 식 인덱스는 published_time 컬럼 형식에 따라 식이 달라집니다.
+
+
+def published_date_sql(timestamptz: bool, alias: str = "r") -> str:
+    """
+    뉴스 발행 날짜 식 (일일 요약 작업 찾기의 날짜 단위 묶음과 식 인덱스가 같은 식을 사용해야 인덱스가 쓰입니다)
+    - timestamptz -> date 변환은 세션 시간대에 따라 달라 IMMUTABLE이 아니므로 UTC 기준 날짜로 고정합니다.
+    """
+    column = f"{alias}.published_time" if alias else "published_time"
+    return f"({column} AT TIME ZONE 'UTC')::date" if timestamptz else f"{column}::date"
+
+
+def published_bound_sql(timestamptz: bool, param: str = "%s") -> str:
+    """published_time 범위 조건의 경계 파라미터 식 (날짜 파라미터 param을 published_date_sql과 같은 기준의 시각으로)"""
+    return f"({param}::timestamp AT TIME ZONE 'UTC')" if timestamptz else param
+
+
+def published_date_index(timestamptz: bool) -> Tuple[str, str, str]:
+    name = "idx_raw_news_published_date_utc" if timestamptz else "idx_raw_news_published_date"
+    return (
+        name, "raw_news",
+        f"CREATE INDEX CONCURRENTLY IF NOT EXISTS {name} ON raw_news (({published_date_sql(timestamptz, alias='')}))",
+    )
+
+
+# EXPLAIN 점검용 대표 조회: (설명, SQL, 파라미터, 사용되어야 하는 인덱스)
+_sample_day = date.today() - timedelta(days=1)
+EXPLAIN_CHECKS: List[Tuple[str, str, tuple, str]] = [
+    ("뉴스 날짜 범위 조회 (sql_query_tool, 일일 요약)",
+     "SELECT id FROM raw_news WHERE published_time >= %s AND published_time < %s",
+     (_sample_day, _sample_day + timedelta(days=1)), "idx_raw_news_published_time"),
+    ("미분석 뉴스 조회 (analyze_news)",
+     "SELECT id, title, content FROM raw_news WHERE analysis_status = FALSE ORDER BY id LIMIT 5",
+     (), "idx_raw_news_unanalyzed"),
+    ("품목+날짜 일일 요약 조회",
+     "SELECT * FROM daily_market_summary WHERE commodity_id = %s AND date = %s",
+     (1, _sample_day), "idx_daily_market_summary_commodity_date"),
+    ("품목+날짜 가격 조회",
+     "SELECT * FROM price_history WHERE commodity_id = %s AND date >= %s ORDER BY date DESC LIMIT 5",
+     (1, _sample_day - timedelta(days=7)), "idx_price_history_commodity_date"),
+    ("뉴스별 분석 결과 조회",
+     "SELECT * FROM news_analysis_results WHERE raw_news_id = %s",
+     (1,), "idx_news_analysis_results_raw_news_id"),
+    ("품목별 분석 결과 조회",
+     "SELECT raw_news_id FROM news_analysis_results WHERE commodity_id = %s",
+     (1,), "idx_news_analysis_results_commodity_id"),
+]
+
+
+def connect():
+    """마이그레이션 전용 연결 (CREATE INDEX CONCURRENTLY는 트랜잭션 밖에서 실행해야 하므로 풀을 쓰지 않고 autocommit)"""
+    conn = psycopg2.connect(
+        host=os.environ.get("DB_HOST", "localhost"),
+        dbname=os.environ.get("DB_NAME", "market_sentiment"),
+        user=os.environ.get("DB_USER", "postgres"),
+        password=os.environ.get("DB_PASSWORD", "password"),
+        port=os.environ.get("DB_PORT", "5432"),
+    )
+    conn.autocommit = True
+    return conn
+
+
+def published_time_is_timestamptz(cur) -> bool:
+    cur.execute("""
+        SELECT data_type FROM information_schema.columns
+        WHERE table_name = 'raw_news' AND column_name = 'published_time'
+    """)
+    row = cur.fetchone()
+    return bool(row) and row[0] == "timestamp with time zone"
+
+
+def _invalid_indexes(cur) -> List[str]:
+    """CONCURRENTLY 생성이 중간에 실패하면 INVALID 인덱스가 남으므로 찾아서 다시 만듭니다."""
+    cur.execute("""
+        SELECT c.relname FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE NOT i.indisvalid
+    """)
+    return [row[0] for row in cur.fetchall()]
+
+
+def planned_indexes(cur) -> List[Tuple[str, str, str]]:
+    return [*INDEXES, published_date_index(published_time_is_timestamptz(cur))]
+
+
+def apply_migrations(conn) -> List[str]:
+    """권장 인덱스를 (없으면) 생성하고 통계를 갱신합니다. 반환: 처리한 인덱스 이름 목록"""
+    applied = []
+    with conn.cursor() as cur:
+        invalid = set(_invalid_indexes(cur))
+        tables = set()
+        for name, table, ddl in planned_indexes(cur):
+            if name in invalid:
+                cur.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+            cur.execute(ddl)
+            applied.append(name)
+            tables.add(table)
+        for table in sorted(tables):
+            cur.execute(f"ANALYZE {table}")
+    return applied
+
+
+def _plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from _plan_nodes(child)
+
+
+def explain_check(conn) -> List[Dict[str, Any]]:
+    """
+    [EXPLAIN 점검]
+    - 대표 조회마다 EXPLAIN (FORMAT JSON) 계획에 기대한 인덱스가 쓰이는지 확인합니다.
+    - 테이블이 작으면 플래너가 순차 스캔을 고르므로, enable_seqscan을 끈 상태에서 "인덱스를 쓸 수 있는 조건인지"를 봅니다.
+    - 반환: [{"check", "index", "ok", "scans"}] (scans: 계획에 나온 스캔 종류와 인덱스 이름)
+    """
+    report = []
+    with conn.cursor() as cur:
+        timestamptz = published_time_is_timestamptz(cur)
+        date_check = (
+            "뉴스 발행 날짜별 조회 (일일 요약 작업 찾기)",
+            f"SELECT id FROM raw_news r WHERE {published_date_sql(timestamptz)} = %s",
+            (_sample_day,), published_date_index(timestamptz)[0],
+        )
+        cur.execute("SET enable_seqscan = off")
+        try:
+            for description, sql, params, index_name in [*EXPLAIN_CHECKS, date_check]:
+                cur.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cur.fetchone()[0][0]["Plan"]
+                scans = [
+                    f"{node['Node Type']}({node.get('Index Name') or node.get('Relation Name', '')})"
+                    for node in _plan_nodes(plan) if "Scan" in node["Node Type"]
+                ]
+                used = any(node.get("Index Name") == index_name for node in _plan_nodes(plan))
+                report.append({"check": description, "index": index_name, "ok": used, "scans": scans})
+        finally:
+            cur.execute("RESET enable_seqscan")
+    return report
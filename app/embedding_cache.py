@@ -0,0 +1,250 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+from langchain_core.embeddings import Embeddings
+
+
+def text_sha256(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    [임베딩 캐시]
+    - 역할: (임베딩 모델, chunk 텍스트의 sha256)을 키로 임베딩 벡터를 영구 저장하는 content-addressed 캐시.
+    - 저장 구조:
+        1. 벡터: 모델별 float32 행렬 파일(<model>.f32)에 한 행씩 append, 읽을 때는 numpy memmap으로 매핑
+        2. 키 인덱스: SQLite 테이블 (model, sha256) -> 행 번호
+    - chroma_db와 별도 디렉토리에 저장하므로, 벡터스토어를 지우거나 chunk 파라미터를 바꿔도
+      텍스트가 같은 chunk는 임베딩 API를 다시 호출하지 않습니다.
+    """
+
+    def __init__(self, cache_dir: str, model: str):
+        os.makedirs(cache_dir, exist_ok=True)
+        self.model = model
+        slug = re.sub(r"[^A-Za-z0-9_.-]", "_", model)
+        self._vec_path = os.path.join(cache_dir, f"{slug}.f32")
+        self._lock = threading.Lock()
+        # 재색인 스크립트와 백엔드(IndexRefresher)가 같은 캐시에 동시에 쓸 수 있으므로 잠금 대기 시간을 넉넉히 둠
+        self._conn = sqlite3.connect(os.path.join(cache_dir, "index.sqlite3"), check_same_thread=False, timeout=60)
+        with self._conn:
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS embedding_keys ("
+                "model TEXT NOT NULL, text_sha256 TEXT NOT NULL, row INTEGER NOT NULL, "
+                "PRIMARY KEY (model, text_sha256))"
+            )
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embedding_models (model TEXT PRIMARY KEY, dim INTEGER NOT NULL)")
+        self.dim: Optional[int] = self._stored_dim()
+        self._matrix: Optional[np.memmap] = None
+
+    def _stored_dim(self) -> Optional[int]:
+        # 캐시를 비어 있을 때 연 뒤 다른 프로세스가 먼저 기록했을 수 있으므로, 차원을 모르면 다시 조회합니다.
+        row = self._conn.execute("SELECT dim FROM embedding_models WHERE model = ?", (self.model,)).fetchone()
+        return row[0] if row else None
+
+    def _rows_on_disk(self) -> int:
+        if not self.dim or not os.path.exists(self._vec_path):
+            return 0
+        return os.path.getsize(self._vec_path) // (self.dim * 4)
+
+    def _mapped(self, min_rows: int) -> np.memmap:
+        # 다른 쓰기로 파일이 커졌으면 다시 매핑합니다.
+        if self._matrix is None or self._matrix.shape[0] < min_rows:
+            self._matrix = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(self._rows_on_disk(), self.dim))
+        return self._matrix
+
+    def get_many(self, texts: List[str]) -> List[Optional[List[float]]]:
+        """텍스트 순서대로 캐시된 벡터(없으면 None)를 반환합니다."""
+        keys = [text_sha256(t) for t in texts]
+        found: Dict[str, int] = {}
+        with self._lock:
+            if self.dim is None:
+                self.dim = self._stored_dim()
+                if self.dim is None:
+                    return [None] * len(texts)  # 아직 어떤 프로세스도 기록하지 않음
+            for start in range(0, len(keys), 500):
+                batch_keys = keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch_keys))
+                found.update(self._conn.execute(
+                    f"SELECT text_sha256, row FROM embedding_keys WHERE model = ? AND text_sha256 IN ({placeholders})",
+                    [self.model, *batch_keys],
+                ).fetchall())
+            if not found:
+                return [None] * len(texts)
+            matrix = self._mapped(max(found.values()) + 1)
+            return [matrix[found[k]].tolist() if k in found else None for k in keys]
+
+    def put_many(self, texts: List[str], vectors: List[List[float]]) -> None:
+        """새 벡터를 행렬 파일 끝에 추가하고 키 인덱스를 한 트랜잭션으로 기록합니다."""
+        if not texts:
+            return
+        array = np.asarray(vectors, dtype=np.float32)
+        with self._lock:
+            # 행 번호는 파일 크기 기준으로 매깁니다. (append 후 인덱스 기록 전에 중단되면 고아 행만 남고 무해함)
+            # 다른 프로세스의 append와 섞이지 않도록 차원 확인 ~ 크기 확인 ~ append ~ 키 기록을 SQLite 쓰기 잠금(BEGIN IMMEDIATE) 안에서 수행
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.dim = self._stored_dim()
+                if self.dim is None:
+                    self.dim = int(array.shape[1])
+                    self._conn.execute("INSERT INTO embedding_models (model, dim) VALUES (?, ?)", (self.model, self.dim))
+                elif array.shape[1] != self.dim:
+                    raise ValueError(f"임베딩 차원 불일치: 캐시={self.dim}, 입력={array.shape[1]} (model={self.model})")
+                first_row = self._rows_on_disk()
+                with open(self._vec_path, "ab") as f:
+                    # 중단된 이전 쓰기가 남긴 불완전한 행을 잘라내 새 행이 정확히 first_row 위치부터 쓰이도록 함
+                    f.truncate(first_row * self.dim * 4)
+                    f.write(array.tobytes())
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO embedding_keys (model, text_sha256, row) VALUES (?, ?, ?)",
+                    [(self.model, text_sha256(t), first_row + i) for i, t in enumerate(texts)],
+                )
+            except BaseException:
+                self._conn.rollback()
+                raise
+            self._conn.commit()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count = self._conn.execute("SELECT COUNT(*) FROM embedding_keys WHERE model = ?", (self.model,)).fetchone()[0]
+        return {"model": self.model, "dim": self.dim, "cached_vectors": count}
+
+
+def normalize_query(text: str) -> str:
+    """질의 캐시 키용 정규화: 유니코드 NFKC, 소문자, 연속 공백 하나로"""
+    return " ".join(unicodedata.normalize("NFKC", text).lower().split())
+
+
+class QueryEmbeddingCache:
+    """
+    [질의 임베딩 캐시]
+    - 역할: RAG 검색 때마다 발생하는 질의 임베딩 API 호출을 줄이기 위해, 정규화한 질의 텍스트를 키로 벡터를 캐시.
+    - 1차: 메모리 LRU (max_size개, ttl_seconds 경과 시 만료)
+    - 2차(선택): 영구 캐시(EmbeddingCache) - 서버 재시작 후에도 같은 질의는 API를 호출하지 않음
+    - hits/misses 통계를 제공하여 적중률을 확인할 수 있습니다.
+    """
+
+    def __init__(self, max_size: int = 1024, ttl_seconds: float = 86400, persistent: Optional[EmbeddingCache] = None):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.persistent = persistent
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.persistent_hits = 0
+        self.misses = 0
+
+    def get(self, text: str) -> Optional[List[float]]:
+        key = normalize_query(text)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                vector, stored_at = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self._entries[key]
+        if self.persistent is not None:
+            vector = self.persistent.get_many([key])[0]
+            if vector is not None:
+                with self._lock:
+                    self.persistent_hits += 1
+                self._remember(key, vector, now)
+                return vector
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, text: str, vector: List[float]) -> None:
+        key = normalize_query(text)
+        self._remember(key, vector, time.monotonic())
+        if self.persistent is not None:
+            self.persistent.put_many([key], [vector])
+
+    def _remember(self, key: str, vector: List[float], stored_at: float) -> None:
+        with self._lock:
+            self._entries[key] = (vector, stored_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.persistent_hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_size": self.max_size,
+                "ttl_seconds": self.ttl_seconds,
+                "persistent": self.persistent is not None,
+                "hits": self.hits,
+                "persistent_hits": self.persistent_hits,
+                "misses": self.misses,
+                "hit_rate": round((self.hits + self.persistent_hits) / total, 3) if total else None,
+            }
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    임베딩 객체를 감싸 embed_documents 호출 시 캐시를 먼저 확인하고, 없는 텍스트만 실제 API로 임베딩합니다.
+    - 같은 배치 안에서 중복된 텍스트도 한 번만 요청합니다.
+    - query_cache를 넘기면 embed_query(검색 질의)도 캐시를 먼저 확인합니다.
+    """
+
+    def __init__(self, embeddings: Embeddings, cache: EmbeddingCache, query_cache: Optional[QueryEmbeddingCache] = None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.query_cache = query_cache
+        self.hits = 0
+        self.misses = 0
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(texts)
+        missing = list(dict.fromkeys(t for t, v in zip(texts, vectors) if v is None))
+        self.hits += len(texts) - sum(v is None for v in vectors)
+        self.misses += len(missing)
+        if missing:
+            new_vectors = self.embeddings.embed_documents(missing)
+            self.cache.put_many(missing, new_vectors)
+            by_text = dict(zip(missing, new_vectors))
+            vectors = [v if v is not None else by_text[t] for t, v in zip(texts, vectors)]
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.query_cache is None:
+            return self.embeddings.embed_query(text)
+        vector = self.query_cache.get(text)
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.query_cache.put(text, vector)
+        return vector
+
+
+def get_embedding_cache(model: str) -> EmbeddingCache:
+    """환경변수 EMBEDDING_CACHE_DIR(기본 ./embedding_cache)에 있는 모델별 캐시를 엽니다."""
+    return EmbeddingCache(os.environ.get("EMBEDDING_CACHE_DIR", "./embedding_cache"), model)
+
+
+def get_query_embedding_cache(model: str) -> QueryEmbeddingCache:
+    """
+    환경변수로 설정한 질의 임베딩 캐시를 만듭니다.
+    - QUERY_EMBED_CACHE_SIZE(기본 1024), QUERY_EMBED_CACHE_TTL_SECONDS(기본 86400)
+    - QUERY_EMBED_CACHE_PERSIST=true 이면 EMBEDDING_CACHE_DIR에 영구 저장 (모델명 뒤에 '#query'를 붙여 문서 캐시와 분리)
+    """
+    persistent = None
+    if os.environ.get("QUERY_EMBED_CACHE_PERSIST", "false").lower() == "true":
+        persistent = get_embedding_cache(f"{model}#query")
+    return QueryEmbeddingCache(
+        max_size=int(os.environ.get("QUERY_EMBED_CACHE_SIZE", 1024)),
+        ttl_seconds=float(os.environ.get("QUERY_EMBED_CACHE_TTL_SECONDS", 86400)),
+        persistent=persistent,
+    )
@@ -0,0 +1,156 @@
+import time
+import queue
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import List, Optional
+
+import openai
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+
+from app.index_manifest import IndexManifest
+
+# 재시도할 가치가 있는 일시적 오류 (레이트 리밋, 네트워크, 서버 5xx)
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.APITimeoutError,
+    openai.InternalServerError,
+)
+
+
+class RateLimiter:
+    """분당 요청 수(requests_per_minute)를 넘지 않도록 요청 시작 간격을 조절하는 간단한 리미터"""
+
+    def __init__(self, requests_per_minute: Optional[int] = None):
+        self.interval = 60.0 / requests_per_minute if requests_per_minute else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> None:
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait_for = self._next_slot - now
+            self._next_slot = max(now, self._next_slot) + self.interval
+        if wait_for > 0:
+            time.sleep(wait_for)
+
+
+class EmbeddingIngestor:
+    """
+    [병렬 임베딩 파이프라인]
+    - 역할: 신규 chunk들을 배치로 나눠 여러 임베딩 요청을 동시에 보내고(bounded concurrency),
+            별도의 writer 스레드가 미리 계산된 벡터를 Chroma 컬렉션에 upsert 합니다.
+    - collection은 chromadb 컬렉션 객체입니다. (vector_index.chroma_collection 참고)
+    - 임베딩 요청은 최대 max_in_flight개까지만 동시에 진행되고, writer 큐도 같은 크기로 제한되어
+      Chroma 쓰기가 밀리면 임베딩 요청도 자연스럽게 기다립니다(backpressure).
+    - 레이트 리밋/네트워크 오류는 지수 백오프(+jitter)로 재시도합니다.
+    - 배치가 Chroma에 기록되면 매니페스트에도 같은 배치를 기록합니다.
+    """
+
+    def __init__(
+        self,
+        collection,
+        embeddings: Embeddings,
+        manifest: Optional[IndexManifest] = None,
+        batch_size: int = 100,
+        max_in_flight: int = 4,
+        max_retries: int = 6,
+        requests_per_minute: Optional[int] = None,
+    ):
+        self.collection = collection
+        self.embeddings = embeddings
+        self.manifest = manifest
+        self.batch_size = batch_size
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.rate_limiter = RateLimiter(requests_per_minute)
+
+    def _embed_with_retry(self, texts: List[str]) -> List[List[float]]:
+        for attempt in range(self.max_retries + 1):
+            self.rate_limiter.acquire()
+            try:
+                return self.embeddings.embed_documents(texts)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    raise
+                backoff = min(60.0, 2 ** attempt) + random.uniform(0, 1)
+                print(f"  - [임베딩 재시도] {type(e).__name__}: {backoff:.1f}초 후 재시도 ({attempt + 1}/{self.max_retries})")
+                time.sleep(backoff)
+
+    def _write(self, ids: List[str], docs: List[Document], vectors: List[List[float]], fingerprints: List[str]) -> None:
+        # 이미 계산된 벡터를 그대로 넣으므로 Chroma 쪽에서 임베딩 API를 다시 호출하지 않습니다.
+        self.collection.upsert(
+            ids=ids,
+            embeddings=vectors,
+            metadatas=[doc.metadata for doc in docs],
+            documents=[doc.page_content for doc in docs],
+        )
+        if self.manifest is not None:
+            self.manifest.record(ids, fingerprints)
+
+    def _writer_loop(self, write_queue: queue.Queue, errors: list, written: list) -> None:
+        while True:
+            item = write_queue.get()
+            if item is None:
+                return
+            if errors:
+                continue  # 앞선 실패 이후에는 큐만 비웁니다.
+            try:
+                self._write(*item)
+                written[0] += len(item[0])
+            except Exception as e:
+                errors.append(e)
+
+    def ingest(self, docs: List[Document], ids: List[str], fingerprints: List[str]) -> int:
+        """chunk들을 임베딩하여 저장하고, 저장된 chunk 수를 반환합니다."""
+        if not docs:
+            return 0
+
+        started = time.monotonic()
+        write_queue: queue.Queue = queue.Queue(maxsize=self.max_in_flight)
+        errors: list = []
+        written = [0]
+        writer = threading.Thread(target=self._writer_loop, args=(write_queue, errors, written), daemon=True)
+        writer.start()
+
+        batches = [
+            (ids[i:i + self.batch_size], docs[i:i + self.batch_size], fingerprints[i:i + self.batch_size])
+            for i in range(0, len(docs), self.batch_size)
+        ]
+        try:
+            with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="embed") as pool:
+                in_flight = {}
+                pending_batches = iter(batches)
+                while True:
+                    # 동시에 진행 중인 임베딩 요청이 max_in_flight개가 되도록 채워 넣음
+                    while len(in_flight) < self.max_in_flight and not errors:
+                        next_batch = next(pending_batches, None)
+                        if next_batch is None:
+                            break
+                        future = pool.submit(self._embed_with_retry, [doc.page_content for doc in next_batch[1]])
+                        in_flight[future] = next_batch
+                    if not in_flight:
+                        break
+                    done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        batch_ids, batch_docs, batch_fps = in_flight.pop(future)
+                        try:
+                            vectors = future.result()
+                        except Exception as e:
+                            errors.append(e)
+                            continue
+                        write_queue.put((batch_ids, batch_docs, vectors, batch_fps))
+        finally:
+            write_queue.put(None)
+            writer.join()
+
+        if errors:
+            raise errors[0]
+
+        elapsed = time.monotonic() - started
+        print(f"  - [임베딩 파이프라인] {written[0]}개 청크 저장 완료 ({elapsed:.1f}초, 동시 요청 {self.max_in_flight}개)")
+        return written[0]
@@ -0,0 +1,59 @@
+from typing import Any, List, Optional, Tuple
+
+from langchain.agents import Tool
+from langchain_core.messages import HumanMessage, SystemMessage
+from langchain_openai import ChatOpenAI
+
+from app.query_parser import parse_query_details
+from app.streaming import FINAL_ANSWER_TAG
+
+SCORE_KEYWORDS = ("감정점수", "감성점수", "심리점수", "점수", "sentiment", "score")
+COMMODITY_KEYWORDS = ("옥수수", "대두", "밀", "소맥", "팜", "corn", "soybean", "wheat", "palm")
+# 이유/영향/계산/비교 등은 여러 도구와 추론이 필요하므로 에이전트로 보냄
+AGENT_KEYWORDS = ("왜", "이유", "원인", "영향", "배경", "전망", "계산", "변환", "비교", "뉴스", "최근", "지난", "동안", "추이")
+
+SYNTHESIS_PROMPT = """당신은 농산물 시장 전문 애널리스트 'Agri-GPT'입니다.
+아래 [조회 결과]만 근거로 사용자 질문에 한국어로 답하세요.
+- 결론(수치)부터 간결하게 말하고, 핵심 수치와 용어는 **볼드체**로 강조합니다.
+- 답변의 기준 날짜를 명시하고, 조회 결과에 없는 내용은 추측하지 않습니다.
+- 요청한 날짜의 데이터가 없고 다른 날짜 데이터만 있으면 그 사실을 먼저 밝힙니다."""
+
+
+def match_structured_question(message: str) -> bool:
+    """
+    '날짜 + 품목 + 감정점수'처럼 SQL 조회 한 번으로 답할 수 있는 질문인지 판별합니다.
+    (예: "2025년 7월 10일 옥수수 감정점수 알려줘")
+    """
+    q_lower = message.lower()
+    if not any(keyword in q_lower for keyword in SCORE_KEYWORDS):
+        return False
+    if any(keyword in q_lower for keyword in AGENT_KEYWORDS):
+        return False
+    # 품목은 하나만 언급된 경우만 (여러 품목 비교는 에이전트가 처리)
+    if sum(keyword in q_lower for keyword in COMMODITY_KEYWORDS) != 1:
+        return False
+    parsed = parse_query_details(message)
+    # 날짜도 정확히 하나만 (기간 질문은 에이전트가 처리)
+    return len(parsed["dates"]) == 1 and parsed["commodity_name"] is not None
+
+
+async def synthesize_answer(llm: ChatOpenAI, question: str, observations: List[Tuple[str, str]],
+                            chat_history: Optional[list] = None, callbacks: Optional[list] = None) -> str:
+    """도구 결과 [(도구 이름, 결과)]를 근거로 LLM을 한 번만 호출해 최종 답변을 만듭니다."""
+    context = "\n\n".join(f"[{name}]\n{result}" for name, result in observations)
+    messages = [SystemMessage(content=SYNTHESIS_PROMPT), *(chat_history or [])]
+    messages.append(HumanMessage(content=f"[조회 결과]\n{context}\n\n[사용자 질문]\n{question}"))
+    response = await llm.ainvoke(messages, config={"callbacks": callbacks or [], "tags": [FINAL_ANSWER_TAG]})
+    return response.content
+
+
+async def answer_structured_question(message: str, sql_tool: Tool, llm: ChatOpenAI,
+                                     callbacks: Optional[list] = None) -> Optional[str]:
+    """
+    [빠른 경로] ReAct 루프 없이 Precise Data Query 한 번 + 답변 생성 LLM 호출 한 번으로 답합니다.
+    조회 결과에 감정점수가 없으면 None을 반환하며, 이 경우 호출자는 에이전트로 넘깁니다.
+    """
+    observation: Any = await sql_tool.arun(message, callbacks=callbacks)
+    if "감정점수:" not in str(observation):
+        return None
+    return await synthesize_answer(llm, message, [(sql_tool.name, str(observation))], callbacks=callbacks)
@@ -0,0 +1,158 @@
+import os
+import json
+import sqlite3
+import hashlib
+import threading
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+from langchain_core.documents import Document
+
+
+def text_fingerprint(text: str) -> str:
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+def document_fingerprint(doc: Document) -> str:
+    """
+    chunk의 지문(fingerprint): "<본문 해시>:<메타데이터 해시>"
+    본문과 메타데이터를 따로 해시하므로, 메타데이터만 바뀐 chunk는 다시 임베딩하지 않고 메타데이터만 갱신할 수 있습니다.
+    """
+    metadata = json.dumps(doc.metadata, sort_keys=True, ensure_ascii=False, default=str)
+    return f"{text_fingerprint(doc.page_content)}:{text_fingerprint(metadata)}"
+
+
+def make_chunk_id(metadata: Dict[str, Any], chunk_index: int) -> str | None:
+    """
+    문서 메타데이터와 청크 순번으로 결정적(deterministic) 청크 ID를 만듭니다.
+    - 기사 분석: type + news_id + commodity + chunk 순번
+    - 일일 요약: type + date + commodity + chunk 순번
+    같은 입력이면 항상 같은 ID가 나오므로 Chroma에 ids=로 넘기면 재실행 시에도 중복 없이 upsert 됩니다.
+    식별 정보가 부족한 문서는 None을 반환합니다.
+    """
+    doc_type = metadata.get("type")
+    if doc_type == "article_analysis" and metadata.get("news_id") is not None:
+        doc_key = f"article|{metadata['news_id']}|{metadata.get('commodity', '')}"
+    elif doc_type == "daily_summary" and metadata.get("date") and metadata.get("commodity"):
+        doc_key = f"summary|{metadata['date']}|{metadata['commodity']}"
+    else:
+        return None
+    return hashlib.sha1(f"{doc_key}|{chunk_index}".encode("utf-8")).hexdigest()
+
+
+class IndexManifest:
+    """
+    [벡터 인덱스 매니페스트]
+    - 역할: Chroma에 저장된 chunk ID와 지문을 별도 SQLite 파일에 기록하는 사이드카(sidecar) 목록.
+    - 시작 시 전체 컬렉션을 읽지 않고, 이번에 로딩한 chunk ID들만 조회해 신규/변경 여부를 판단합니다.
+    - 배치 단위로 Chroma 추가가 성공한 직후 한 트랜잭션으로 기록하므로,
+      중간에 실패하더라도 다음 실행 때 누락분만 다시 upsert 하면 됩니다.
+    """
+
+    LOOKUP_BATCH_SIZE = 500  # SQLite 변수 개수 제한(999)을 넘지 않도록 나눠서 조회
+
+    def __init__(self, path: str, collection: str = "default"):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.collection = collection
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        with self._conn:
+            self._conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS indexed_chunks (
+                    collection TEXT NOT NULL,
+                    chunk_id TEXT NOT NULL,
+                    fingerprint TEXT NOT NULL,
+                    indexed_at TEXT NOT NULL,
+                    PRIMARY KEY (collection, chunk_id)
+                )
+                """
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS manifest_meta (collection TEXT NOT NULL, key TEXT NOT NULL, value TEXT, "
+                "PRIMARY KEY (collection, key))"
+            )
+
+    def count(self) -> int:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT COUNT(*) FROM indexed_chunks WHERE collection = ?", (self.collection,)
+            ).fetchone()
+        return row[0]
+
+    def lookup(self, ids: List[str]) -> Dict[str, str]:
+        """주어진 chunk ID 중 매니페스트에 있는 것의 {chunk_id: fingerprint}를 반환합니다."""
+        found = {}
+        with self._lock:
+            for start in range(0, len(ids), self.LOOKUP_BATCH_SIZE):
+                batch_ids = ids[start:start + self.LOOKUP_BATCH_SIZE]
+                placeholders = ",".join("?" * len(batch_ids))
+                rows = self._conn.execute(
+                    f"SELECT chunk_id, fingerprint FROM indexed_chunks "
+                    f"WHERE collection = ? AND chunk_id IN ({placeholders})",
+                    [self.collection, *batch_ids],
+                ).fetchall()
+                found.update(rows)
+        return found
+
+    def changes(self, ids: List[str], fingerprints: List[str]) -> Tuple[List[int], List[int]]:
+        """
+        매니페스트와 지문을 비교해 변경된 항목의 인덱스 목록을 나눠 반환합니다.
+        - 반환: (신규이거나 본문이 바뀌어 임베딩이 필요한 항목, 메타데이터만 바뀐 항목)
+        """
+        known = self.lookup(ids)
+        embed, metadata_only = [], []
+        for i, (chunk_id, fp) in enumerate(zip(ids, fingerprints)):
+            old = known.get(chunk_id)
+            if old == fp:
+                continue
+            if old is not None and old.split(":")[0] == fp.split(":")[0]:
+                metadata_only.append(i)
+            else:
+                embed.append(i)
+        return embed, metadata_only
+
+    def record(self, ids: Iterable[str], fingerprints: Iterable[str]) -> None:
+        """벡터스토어 추가가 끝난 chunk들을 한 트랜잭션으로 기록합니다."""
+        now = datetime.now().isoformat(timespec="seconds")
+        rows = [(self.collection, chunk_id, fp, now) for chunk_id, fp in zip(ids, fingerprints)]
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO indexed_chunks (collection, chunk_id, fingerprint, indexed_at) "
+                "VALUES (?, ?, ?, ?)",
+                rows,
+            )
+
+    def delete(self, ids: Iterable[str]) -> None:
+        """벡터스토어에서 삭제한 chunk들을 매니페스트에서도 지웁니다."""
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "DELETE FROM indexed_chunks WHERE collection = ? AND chunk_id = ?",
+                [(self.collection, chunk_id) for chunk_id in ids],
+            )
+
+    def get_meta(self, key: str) -> str | None:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM manifest_meta WHERE collection = ? AND key = ?", (self.collection, key)
+            ).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO manifest_meta (collection, key, value) VALUES (?, ?, ?)",
+                (self.collection, key, value),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            count, last_indexed_at = self._conn.execute(
+                "SELECT COUNT(*), MAX(indexed_at) FROM indexed_chunks WHERE collection = ?", (self.collection,)
+            ).fetchone()
+        return {"collection": self.collection, "indexed_chunks": count, "last_indexed_at": last_indexed_at}
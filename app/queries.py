@@ -0,0 +1,153 @@
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from app.db import get_pool
+from app.db_migrations import published_bound_sql, published_date_sql, published_time_is_timestamptz
+
+# sql_query_tool의 질문 유형(intent)
+#  - dated : 특정 날짜 (parse_query_details의 dates)
+#  - recent: "최근/최신" (가장 최근 데이터 기준 7일)
+#  - latest: 날짜 조건 없음 (최신순 상위 N건)
+INTENTS = ("dated", "recent", "latest")
+
+CRUSH_COMMODITIES = ["Soybean", "Soybean Oil", "Soybean Meal"]
+
+# 모든 intent 문장이 같은 파라미터를 받습니다. (사용하지 않는 파라미터는 무시)
+#  $1 품목명 (NULL이면 요약은 전체 품목, 뉴스는 조회하지 않음)
+#  $2 기준 날짜 (dated)
+#  $3 가격을 조회할 품목명 목록, $4 품목별 가격 행 수
+PARAM_TYPES = "text, date, text[], int"
+
+_SUMMARY_FILTER = {
+    "dated": "dms.date = $2",
+    "recent": "dms.date BETWEEN (SELECT MAX(date) FROM daily_market_summary) - 6 AND (SELECT MAX(date) FROM daily_market_summary)",
+    "latest": "TRUE",
+}
+
+
+def _news_filter(intent: str, timestamptz: bool) -> str:
+    """
+    뉴스 날짜 조건은 published_time 범위로 작성해 인덱스를 사용할 수 있게 합니다. (DATE(published_time) = ... 대신)
+    - timestamptz 컬럼이면 날짜 경계를 UTC 기준 시각으로 바꿔 일일 요약(create_daily_summary)과 같은 날짜로 묶습니다.
+    """
+    if intent == "dated":
+        return (f"r.published_time >= {published_bound_sql(timestamptz, '$2')} "
+                f"AND r.published_time < {published_bound_sql(timestamptz, '($2 + 1)')}")
+    if intent == "recent":
+        # 해당 품목의 최신 분석 뉴스 날짜 기준 7일, 뉴스가 없으면 오늘 기준 7일
+        start = f"""COALESCE((
+            SELECT MAX({published_date_sql(timestamptz, alias="r2")})
+            FROM raw_news r2
+            JOIN news_analysis_results nar2 ON r2.id = nar2.raw_news_id
+            JOIN commodities c2 ON nar2.commodity_id = c2.id
+            WHERE c2.name = $1 AND r2.analysis_status = TRUE
+        ) - 6, CURRENT_DATE - 7)"""
+        return f"r.published_time >= {published_bound_sql(timestamptz, start)}"
+    return "TRUE"
+
+
+_PRICE_FILTER = {
+    "dated": "ph.date = $2",
+    "recent": "ph.date >= CURRENT_DATE - 7",
+    "latest": "TRUE",
+}
+
+_MARKET_CONTEXT_SQL = """
+WITH summaries AS (
+    SELECT dms.date, c.name AS commodity_name, dms.daily_sentiment_score,
+           dms.daily_reasoning, dms.daily_keywords, dms.analyzed_news_count
+    FROM daily_market_summary dms
+    JOIN commodities c ON dms.commodity_id = c.id
+    WHERE ($1::text IS NULL OR c.name = $1) AND {summary_filter}
+    ORDER BY dms.date DESC
+    LIMIT 10
+),
+news AS (
+    SELECT r.title, r.published_time, nar.sentiment_score, nar.reasoning, nar.keywords,
+           c.name AS commodity_name, ABS(nar.sentiment_score - 50) AS impact_score
+    FROM raw_news r
+    JOIN news_analysis_results nar ON r.id = nar.raw_news_id
+    JOIN commodities c ON nar.commodity_id = c.id
+    WHERE c.name = $1 AND {news_filter}
+    -- 영향도 높은 뉴스 우선 (감정점수가 50에서 멀수록 영향도 높음) + 최신순
+    ORDER BY impact_score DESC, r.published_time DESC
+    LIMIT 10
+),
+prices AS (
+    SELECT date, closing_price, commodity_name
+    FROM (
+        SELECT ph.date, ph.closing_price, c.name AS commodity_name,
+               ROW_NUMBER() OVER (PARTITION BY c.name ORDER BY ph.date DESC) AS rn
+        FROM price_history ph
+        JOIN commodities c ON ph.commodity_id = c.id
+        WHERE c.name = ANY($3) AND {price_filter}
+    ) ranked
+    WHERE rn <= $4
+)
+SELECT
+    (SELECT COALESCE(json_agg(s ORDER BY s.date DESC), '[]'::json) FROM summaries s) AS summaries,
+    (SELECT COALESCE(json_agg(n ORDER BY n.impact_score DESC, n.published_time DESC), '[]'::json) FROM news n) AS news,
+    (SELECT COALESCE(json_agg(p ORDER BY array_position($3, p.commodity_name), p.date DESC), '[]'::json) FROM prices p) AS prices
+"""
+
+
+def statement_name(intent: str, timestamptz: bool) -> str:
+    return f"market_context_{intent}_utc" if timestamptz else f"market_context_{intent}"
+
+
+# published_time 컬럼 형식(timestamp / timestamptz)별로 문장을 따로 둡니다.
+STATEMENTS = {
+    statement_name(intent, timestamptz): _MARKET_CONTEXT_SQL.format(
+        summary_filter=_SUMMARY_FILTER[intent],
+        news_filter=_news_filter(intent, timestamptz),
+        price_filter=_PRICE_FILTER[intent],
+    )
+    for intent in INTENTS
+    for timestamptz in (False, True)
+}
+
+# raw_news.published_time이 timestamptz인지 (처음 조회할 때 한 번 확인)
+_published_timestamptz: Optional[bool] = None
+
+
+def classify_intent(parsed: Dict[str, Any]) -> str:
+    """parse_query_details 결과로 질문 유형을 정합니다. (날짜가 있으면 '최근'보다 우선)"""
+    if parsed.get("dates"):
+        return "dated"
+    if parsed.get("date_range") == "recent":
+        return "recent"
+    return "latest"
+
+
+def _ensure_prepared(conn, cursor, name: str) -> None:
+    """
+    이 연결(세션)에 name 문장이 PREPARE되어 있지 않으면 PREPARE합니다.
+    상태는 풀이 연결별로 기억하며, 모르는 연결이면 pg_prepared_statements로 서버 상태를 먼저 확인합니다.
+    """
+    prepared = get_pool().prepared_statements(conn)
+    if name in prepared:
+        return
+    cursor.execute("SELECT name FROM pg_prepared_statements")
+    prepared.update(row[0] for row in cursor.fetchall())
+    if name not in prepared:
+        cursor.execute(f"PREPARE {name} ({PARAM_TYPES}) AS {STATEMENTS[name]}")
+        prepared.add(name)
+
+
+def fetch_market_context(conn, cursor, intent: str, commodity: Optional[str], target_date: Optional[str],
+                         price_commodities: List[str], price_limit: int) -> Dict[str, List[Dict[str, Any]]]:
+    """
+    한 번의 왕복으로 일일 요약, 영향도 상위 뉴스, 가격을 함께 조회합니다. (서버 측 prepared statement 사용)
+    - 반환: {"summaries": [...], "news": [...], "prices": [...]} (각 행은 컬럼명 -> 값 dict, 날짜/시각은 ISO 문자열)
+    """
+    global _published_timestamptz
+    if _published_timestamptz is None:
+        _published_timestamptz = published_time_is_timestamptz(cursor)
+    name = statement_name(intent, _published_timestamptz)
+    _ensure_prepared(conn, cursor, name)
+    cursor.execute(
+        f"EXECUTE {name} (%s, %s, %s, %s)",
+        (commodity, date.fromisoformat(target_date) if target_date else None, price_commodities, price_limit),
+    )
+    summaries, news, prices = cursor.fetchone()
+    return {"summaries": summaries, "news": news, "prices": prices}
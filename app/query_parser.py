@@ -0,0 +1,123 @@
+import re
+from datetime import datetime, timedelta
+from typing import Dict, Any, List
+
+# 품목명 (한글/영문 -> 영문 품목명)
+COMMODITY_MAPPING = {
+    "옥수수": "Corn", "corn": "Corn",
+    "대두": "Soybean", "soybean": "Soybean",
+    "대두박": "Soybean Meal", "soybean meal": "Soybean Meal",
+    "대두유": "Soybean Oil", "soybean oil": "Soybean Oil",
+    "소맥": "Wheat", "밀": "Wheat", "wheat": "Wheat",
+    "팜오일": "Palm Oil", "팜유": "Palm Oil", "palm oil": "Palm Oil"
+}
+# 긴 이름부터 확인 ("대두박"/"soybean meal"이 "대두"/"soybean"보다 먼저 매칭되도록)
+_COMMODITY_NAMES_LONGEST_FIRST = sorted(COMMODITY_MAPPING.items(), key=lambda kv: -len(kv[0]))
+
+
+def find_commodities(query: str) -> List[str]:
+    """질의에 언급된 품목(영문명)을 모두 찾습니다. ("대두박"이 "대두"로 한 번 더 세지지 않도록 찾은 이름은 지우고 계속)"""
+    q_lower = query.lower()
+    found = []
+    for name, english_name in _COMMODITY_NAMES_LONGEST_FIRST:
+        if name in q_lower:
+            q_lower = q_lower.replace(name, " ")
+            if english_name not in found:
+                found.append(english_name)
+    return found
+
+
+# [수정/신규] 날짜, 품목, 숫자(수량)를 한 번에 파싱하는 통합 유틸리티 함수
+def parse_query_details(query: str) -> Dict[str, Any]:
+    """
+    사용자 질의에서 날짜(범위 포함), 품목, 특정 숫자(수량) 정보를 한번에 추출합니다.
+    - parse_date_and_commodity와 CommodityCalculator.parse_dates 기능을 통합 및 개선했습니다.
+    """
+    q_lower = query.lower()
+    result = {
+        "dates": [],          # 추출된 날짜 (최대 2개)
+        "commodity_name": None, # 품목 영문명
+        "value": None,        # 추출된 숫자 (수량)
+        "unit": None          # 추출된 숫자의 단위
+    }
+
+    # 1. 품목명 추출 (한글 -> 영문 매핑, 긴 이름 우선)
+    for korean_name, english_name in _COMMODITY_NAMES_LONGEST_FIRST:
+        if korean_name.lower() in q_lower:
+            result["commodity_name"] = english_name
+            break
+
+    # 2. 날짜 추출 (상대 날짜, 절대 날짜, 기간 모두 처리)
+    today = datetime.now()
+    dates = []
+    
+    # 절대 날짜 (YYYY-MM-DD, YYYY.MM.DD 등)
+    # 정규식 수정: '월'과 '일' 사이 공백도 허용
+    abs_dates = re.findall(r'(\d{4})[년.\-\s]+(\d{1,2})[월.\-\s]+(\d{1,2})일?', query)
+    for d in abs_dates:
+        y, m, day = map(int, d)
+        try:
+            dates.append(datetime(y, m, day).strftime("%Y-%m-%d"))
+        except ValueError:
+            continue
+    
+    # 월/일만 있는 경우 (올해 년도 사용)
+    # 정규식 수정: '년'이 없는 경우만 매칭되도록 Negative lookbehind 사용
+    month_day_dates = re.findall(r'(?<!\d{4}년\s)(\d{1,2})[월.\-\s]+(\d{1,2})일?', query)
+    for d in month_day_dates:
+        m, day = map(int, d)
+        # 이미 위에서 YYYY-MM-DD 형태로 파싱된 경우는 제외
+        temp_date_str = f"{today.year}-{m:02d}-{day:02d}"
+        if temp_date_str not in dates:
+            try:
+                dates.append(datetime(today.year, m, day).strftime("%Y-%m-%d"))
+            except ValueError:
+                continue
+
+    # 상대적 날짜
+    if "오늘" in query or "today" in q_lower:
+        dates.append(today.strftime("%Y-%m-%d"))
+    if "어제" in query or "yesterday" in q_lower:
+        dates.append((today - timedelta(days=1)).strftime("%Y-%m-%d"))
+    if "내일" in query or "tomorrow" in q_lower:
+        dates.append((today + timedelta(days=1)).strftime("%Y-%m-%d"))
+    
+    # "n일 전/후"
+    match_days_ago = re.findall(r'(\d+)\s*일\s*(전|뒤|후)', query)
+    for n, direction in match_days_ago:
+        n_days = int(n)
+        if direction == "전":
+            dates.append((today - timedelta(days=n_days)).strftime("%Y-%m-%d"))
+        else: # 후, 뒤
+            dates.append((today + timedelta(days=n_days)).strftime("%Y-%m-%d"))
+
+    # 중복 제거 후 최대 2개까지 저장
+    result["dates"] = sorted(list(set(dates)))[:2]
+
+    # '최근' 키워드 처리
+    if "최근" in query or "최신" in query or "가장 최근" in query:
+        result["date_range"] = "recent"
+    
+    # 3. 숫자와 단위 추출 (수량 변환용) - 모든 규모 단위 지원
+    # 예: "150.5 부셸", "95.2 million acres", "14.9 billion bushel", "200 톤"
+    value_match = re.search(r"([\d\.\,]+)\s*(thousand|million|billion|trillion|천|만|억|조)?\s*(bushels? per acre|bu/acre|bushels?|부셸|bu|톤|ton|acres?|에이커|헥타르|hectare)", q_lower)
+    if value_match:
+        value_str = value_match.group(1).replace(",", "")
+        val = float(value_str)
+        
+        # 규모 단위 처리
+        if value_match.group(2):
+            scale_unit = value_match.group(2).lower()
+            scale_multipliers = {
+                "thousand": 1_000, "천": 1_000,
+                "million": 1_000_000, "백만": 1_000_000,
+                "billion": 1_000_000_000, "십억": 1_000_000_000,
+                "trillion": 1_000_000_000_000, "조": 1_000_000_000_000,
+                "만": 10_000, "억": 100_000_000
+            }
+            val *= scale_multipliers.get(scale_unit, 1)
+            
+        result["value"] = val
+        result["unit"] = value_match.group(3).strip()
+
+    return result
@@ -0,0 +1,192 @@
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain_core.retrievers import BaseRetriever
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+
+from app.query_parser import parse_query_details
+from app.index_manifest import make_chunk_id
+from app.bm25_index import reciprocal_rank_fusion
+from app.tokens import count_tokens, truncate_to_tokens
+
+# 질문에 이런 단어가 있으면 해당 문서 종류로 검색 범위를 좁힘 (둘 다 있으면 좁히지 않음)
+SUMMARY_HINTS = ["일일 요약", "요약", "시황", "동향", "summary"]
+ARTICLE_HINTS = ["뉴스", "기사", "news", "article"]
+RECENT_DAYS = 7  # '최근' 질의의 검색 기간 (sql_query_tool과 동일하게 7일)
+
+
+def to_date_int(date_str: str) -> int:
+    """'YYYY-MM-DD' → yyyymmdd 정수 (메타데이터 date_int와 같은 형식)"""
+    return int(date_str.replace("-", ""))
+
+
+def build_filter_conditions(query: str) -> Dict[str, Dict[str, Any]]:
+    """
+    질의에서 품목/문서 종류/날짜 조건을 추출합니다. (parse_query_details 결과 재사용)
+    - 반환: {"commodity": 조건, "type": 조건, "date": 조건} 중 해당하는 것만
+    - 날짜는 date_int(yyyymmdd) 범위 조건으로 만듭니다: 날짜 1개 → 해당일, 2개 → 기간, '최근' → 최근 7일
+    """
+    parsed = parse_query_details(query)
+    q_lower = query.lower()
+    conditions = {}
+
+    if parsed["commodity_name"]:
+        conditions["commodity"] = {"commodity": {"$eq": parsed["commodity_name"]}}
+
+    wants_summary = any(hint in q_lower for hint in SUMMARY_HINTS)
+    wants_article = any(hint in q_lower for hint in ARTICLE_HINTS)
+    if wants_summary != wants_article:
+        conditions["type"] = {"type": {"$eq": "daily_summary" if wants_summary else "article_analysis"}}
+
+    dates = parsed["dates"]
+    if len(dates) == 1:
+        conditions["date"] = {"date_int": {"$eq": to_date_int(dates[0])}}
+    elif len(dates) == 2:
+        conditions["date"] = {"$and": [
+            {"date_int": {"$gte": to_date_int(dates[0])}},
+            {"date_int": {"$lte": to_date_int(dates[1])}},
+        ]}
+    elif parsed.get("date_range") == "recent":
+        since = (datetime.now() - timedelta(days=RECENT_DAYS - 1)).strftime("%Y-%m-%d")
+        conditions["date"] = {"date_int": {"$gte": to_date_int(since)}}
+
+    return conditions
+
+
+def combine_conditions(conditions: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """조건 목록을 Chroma where 절로 합칩니다. (없으면 None, 1개면 그대로, 여러 개면 $and)"""
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def build_metadata_filter(query: str) -> Optional[Dict[str, Any]]:
+    """질의 전체 조건을 하나의 Chroma where 절로 반환합니다."""
+    return combine_conditions(list(build_filter_conditions(query).values()))
+
+
+class MetadataFilteredRetriever(BaseRetriever):
+    """
+    [메타데이터 필터 검색기]
+    - 역할: 질의에서 추출한 품목/종류/날짜 조건을 Chroma where 절로 내려보내(push-down),
+            관련 없는 벡터를 검색·재정렬 대상에서 미리 제외한 뒤 MMR 검색을 수행.
+    - 결과가 min_filtered_results개 미만이면 날짜 조건 → 전체 조건 순서로 완화해 다시 검색합니다.
+      (데이터가 최신이 아니거나 과도한 필터로 답변할 근거가 없어지는 것을 방지)
+    """
+
+    vectorstore: Any
+    k: int = 6
+    fetch_k: int = 20
+    min_filtered_results: int = 2
+
+    def filter_candidates(self, query: str) -> List[Optional[Dict[str, Any]]]:
+        """엄격한 조건부터 완화된 조건 순으로 where 절 후보를 반환합니다. (마지막은 항상 None = 전체 검색)"""
+        conditions = build_filter_conditions(query)
+        candidates = [combine_conditions(list(conditions.values()))]
+        if "date" in conditions:
+            candidates.append(combine_conditions([c for key, c in conditions.items() if key != "date"]))
+        candidates.append(None)
+        # 중복 제거 (순서 유지)
+        unique = []
+        for where in candidates:
+            if where not in unique:
+                unique.append(where)
+        return unique
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        docs = []
+        for where in self.filter_candidates(query):
+            kwargs = {"filter": where} if where is not None else {}
+            docs = self.vectorstore.max_marginal_relevance_search(query, k=self.k, fetch_k=self.fetch_k, **kwargs)
+            if len(docs) >= self.min_filtered_results:
+                return docs
+        return docs
+
+
+class HybridRetriever(MetadataFilteredRetriever):
+    """
+    [하이브리드 검색기: BM25 + 벡터, RRF 결합]
+    - 역할: 같은 where 조건으로 벡터(MMR) 검색과 BM25 키워드 검색을 각각 수행하고,
+            두 순위를 Reciprocal Rank Fusion으로 합쳐 상위 k개를 반환.
+    - mode: "hybrid"(기본) / "vector"(벡터만) / "keyword"(BM25만, 질의 임베딩 API 호출 없음)
+    - BM25 인덱스가 아직 로딩 전이면 벡터 검색만 사용합니다.
+    """
+
+    bm25: Any = None
+    mode: str = "hybrid"
+    rrf_k: int = 60
+
+    def _vector_ranked(self, query: str, where: Optional[Dict[str, Any]]) -> List[Document]:
+        kwargs = {"filter": where} if where is not None else {}
+        return self.vectorstore.max_marginal_relevance_search(query, k=self.fetch_k, fetch_k=self.fetch_k * 2, **kwargs)
+
+    def _fetch_by_ids(self, ids: List[str]) -> Dict[str, Document]:
+        if not ids:
+            return {}
+        result = self.vectorstore.get(ids=ids, include=["documents", "metadatas"])
+        return {
+            chunk_id: Document(page_content=text, metadata=meta or {})
+            for chunk_id, text, meta in zip(result["ids"], result["documents"], result["metadatas"])
+        }
+
+    def _search(self, query: str, where: Optional[Dict[str, Any]]) -> List[Tuple[str, Document, float]]:
+        use_bm25 = self.mode != "vector" and self.bm25 is not None and self.bm25.loaded
+        use_vector = self.mode != "keyword" or not use_bm25
+
+        ranked_lists, docs_by_id = [], {}
+        if use_vector:
+            vector_ids = []
+            for doc in self._vector_ranked(query, where):
+                chunk_id = make_chunk_id(doc.metadata, doc.metadata.get("chunk_index", 0))
+                if chunk_id and chunk_id not in docs_by_id:
+                    docs_by_id[chunk_id] = doc
+                    vector_ids.append(chunk_id)
+            ranked_lists.append(vector_ids)
+        if use_bm25:
+            ranked_lists.append([chunk_id for chunk_id, _ in self.bm25.search(query, k=self.fetch_k, where=where)])
+
+        top = reciprocal_rank_fusion(ranked_lists, k=self.rrf_k)[:self.k]
+        # BM25에서만 나온 chunk는 본문을 Chroma에서 ID로 가져옴
+        docs_by_id.update(self._fetch_by_ids([i for i, _ in top if i not in docs_by_id]))
+        return [(i, docs_by_id[i], score) for i, score in top if i in docs_by_id]
+
+    def search_with_scores(self, query: str) -> List[Tuple[str, Document, float]]:
+        """필터 완화 규칙을 적용해 (chunk_id, 문서, RRF 점수) 목록을 반환합니다."""
+        results = []
+        for where in self.filter_candidates(query):
+            results = self._search(query, where)
+            if len(results) >= self.min_filtered_results:
+                return results
+        return results
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [doc for _, doc, _ in self.search_with_scores(query)]
+
+
+def format_snippets(results: List[Tuple[str, Document, float]], token_budget: int = 1500) -> str:
+    """
+    검색 결과를 에이전트에게 바로 넘길 근거 목록 문자열로 만듭니다. (LLM 요약 단계 없이 사용)
+    - 각 항목: 번호, chunk ID(앞 12자리), 종류, 날짜, 품목, 점수 + 공백을 정리한 본문
+    - 전체 token_budget 토큰을 넘지 않도록 항목별 본문을 균등하게 자릅니다.
+    """
+    if not results:
+        return "관련 뉴스/요약 문서를 찾지 못했습니다."
+    per_snippet = max(token_budget // len(results), 80)
+    remaining = token_budget
+    lines = []
+    for rank, (chunk_id, doc, score) in enumerate(results, start=1):
+        meta = doc.metadata
+        header = (
+            f"[{rank}] id={chunk_id[:12]} | {meta.get('type', '')} | {meta.get('date', '')} | "
+            f"{meta.get('commodity', '')} | score={score:.4f}"
+        )
+        if meta.get("news_id") is not None:
+            header += f" | news_id={meta['news_id']}"
+        budget = min(per_snippet, remaining) - count_tokens(header)
+        if budget <= 0:
+            break
+        body = truncate_to_tokens(" ".join(doc.page_content.split()), budget)
+        lines.append(f"{header}\n{body}")
+        remaining -= count_tokens(header) + count_tokens(body)
+    return "\n\n".join(lines)
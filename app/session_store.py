@@ -0,0 +1,77 @@
+import time
+import uuid
+import asyncio
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from langchain.memory import ConversationBufferWindowMemory
+
+
+class ChatSession:
+    """세션 하나의 대화 기록과, 같은 세션의 요청을 순서대로 처리하기 위한 락"""
+
+    def __init__(self, session_id: str, memory_turns: int):
+        self.session_id = session_id
+        self.memory = ConversationBufferWindowMemory(k=memory_turns, memory_key="chat_history", return_messages=True)
+        self.lock = asyncio.Lock()
+        self.last_access = time.monotonic()
+
+    def history(self) -> list:
+        return self.memory.load_memory_variables({})["chat_history"]
+
+    def save_turn(self, question: str, answer: str) -> None:
+        self.memory.save_context({"input": question}, {"output": answer})
+
+
+class SessionStore:
+    """
+    [세션별 대화 기록 저장소]
+    - 역할: 전역 에이전트 하나에 붙어 있던 대화 기록을 세션 ID별로 분리.
+            에이전트(AgentExecutor)는 메모리 없이 공유하고, 요청마다 해당 세션의 chat_history를 넘겨줌.
+    - 최대 max_sessions개를 LRU 순서로 보관하며, ttl_seconds 동안 사용하지 않은 세션은 삭제합니다.
+    """
+
+    def __init__(self, max_sessions: int = 1000, ttl_seconds: float = 3600, memory_turns: int = 15):
+        self.max_sessions = max_sessions
+        self.ttl_seconds = ttl_seconds
+        self.memory_turns = memory_turns
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted = 0
+        self.expired = 0
+
+    def get(self, session_id: Optional[str] = None) -> ChatSession:
+        """세션을 반환합니다. ID가 없거나 만료·삭제된 세션이면 새로 만듭니다."""
+        now = time.monotonic()
+        with self._lock:
+            self._drop_expired(now)
+            session = self._sessions.get(session_id) if session_id else None
+            if session is None:
+                session = ChatSession(session_id or uuid.uuid4().hex, self.memory_turns)
+                self._sessions[session.session_id] = session
+                while len(self._sessions) > self.max_sessions:
+                    self._sessions.popitem(last=False)
+                    self.evicted += 1
+            self._sessions.move_to_end(session.session_id)
+            session.last_access = now
+            return session
+
+    def _drop_expired(self, now: float) -> None:
+        # LRU 순서이므로 앞에서부터 만료된 세션만 확인하면 됩니다.
+        while self._sessions:
+            oldest = next(iter(self._sessions.values()))
+            if now - oldest.last_access <= self.ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "sessions": len(self._sessions),
+                "max_sessions": self.max_sessions,
+                "ttl_seconds": self.ttl_seconds,
+                "evicted": self.evicted,
+                "expired": self.expired,
+            }
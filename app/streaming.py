@@ -0,0 +1,96 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+from uuid import UUID
+
+from langchain.callbacks.base import AsyncCallbackHandler
+
+FINAL_ANSWER_MARKER = "Final Answer:"
+# 이 태그가 붙은 LLM 호출(빠른 경로/요약 답변 생성)은 마커 없이 출력 전체가 최종 답변
+FINAL_ANSWER_TAG = "final_answer"
+
+
+class AgentStreamHandler(AsyncCallbackHandler):
+    """
+    [에이전트 스트리밍 콜백]
+    - 역할: ReAct 에이전트 실행 중 발생하는 이벤트를 큐에 담아 SSE로 바로 내보낼 수 있게 함.
+      · tool_start / tool_end: 어떤 도구가 실행 중인지, 끝났는지
+      · token: 최종 답변 단계의 LLM 토큰 ("Final Answer:" 이후 텍스트, 또는 final_answer 태그가 붙은 호출의 전체 출력)
+    - 토큰 이벤트를 받으려면 에이전트 LLM이 streaming=True로 생성되어 있어야 합니다.
+    - 사용법: ainvoke(..., config={"callbacks": [handler]})를 별도 태스크로 실행하고,
+              `async for event in handler.events()`로 소비한 뒤 실행이 끝나면 handler.close()를 호출합니다.
+    """
+
+    def __init__(self):
+        self.queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue()
+        self._buffers: Dict[UUID, str] = {}   # LLM 실행별로 지금까지 받은 텍스트
+        self._streaming: Dict[UUID, int] = {}  # 최종 답변 마커가 나온 실행 -> 이미 내보낸 위치
+        self._answering: Set[UUID] = set()     # 최종 답변 토큰을 하나 이상 내보낸 실행
+        self._tools: Dict[UUID, str] = {}
+
+    # --- LLM 토큰 ---
+    def _start_run(self, run_id: UUID, tags: Optional[List[str]]) -> None:
+        self._buffers[run_id] = ""
+        if tags and FINAL_ANSWER_TAG in tags:
+            self._streaming[run_id] = 0
+
+    async def on_chat_model_start(self, serialized: Dict[str, Any], messages: Any, *, run_id: UUID,
+                                  tags: Optional[List[str]] = None, **kwargs: Any) -> None:
+        self._start_run(run_id, tags)
+
+    async def on_llm_start(self, serialized: Dict[str, Any], prompts: Any, *, run_id: UUID,
+                           tags: Optional[List[str]] = None, **kwargs: Any) -> None:
+        self._start_run(run_id, tags)
+
+    async def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any) -> None:
+        buffer = self._buffers.get(run_id, "") + token
+        self._buffers[run_id] = buffer
+        if run_id not in self._streaming:
+            # 마커가 여러 토큰에 걸쳐 나올 수 있으므로 누적 텍스트에서 찾음
+            marker_at = buffer.find(FINAL_ANSWER_MARKER)
+            if marker_at < 0:
+                return
+            self._streaming[run_id] = marker_at + len(FINAL_ANSWER_MARKER)
+        sent = self._streaming[run_id]
+        text = buffer[sent:]
+        self._streaming[run_id] = len(buffer)
+        if run_id not in self._answering:
+            # 마커 바로 뒤의 공백/줄바꿈은 건너뜀
+            text = text.lstrip()
+            if not text:
+                return
+            self._answering.add(run_id)
+        if text:
+            await self.queue.put({"type": "token", "text": text})
+
+    async def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any) -> None:
+        self._buffers.pop(run_id, None)
+        self._streaming.pop(run_id, None)
+        self._answering.discard(run_id)
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        self._buffers.pop(run_id, None)
+        self._streaming.pop(run_id, None)
+        self._answering.discard(run_id)
+
+    # --- 도구 실행 ---
+    async def on_tool_start(self, serialized: Dict[str, Any], input_str: str, *, run_id: UUID, **kwargs: Any) -> None:
+        name = serialized.get("name", "tool")
+        self._tools[run_id] = name
+        await self.queue.put({"type": "tool_start", "tool": name, "input": input_str})
+
+    async def on_tool_end(self, output: str, *, run_id: UUID, **kwargs: Any) -> None:
+        await self.queue.put({"type": "tool_end", "tool": self._tools.pop(run_id, "tool")})
+
+    async def on_tool_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        await self.queue.put({"type": "tool_end", "tool": self._tools.pop(run_id, "tool"), "error": str(error)})
+
+    # --- 소비 ---
+    def close(self) -> None:
+        self.queue.put_nowait(None)
+
+    async def events(self) -> AsyncIterator[Dict[str, Any]]:
+        while True:
+            event = await self.queue.get()
+            if event is None:
+                return
+            yield event
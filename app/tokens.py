@@ -0,0 +1,37 @@
+import logging
+from functools import lru_cache
+
+import tiktoken
+
+# 인코딩 파일을 받을 수 없는 환경(오프라인 등)에서 쓰는 글자 수 기반 근사치 (한국어 기준 보수적으로 토큰당 2글자)
+_CHARS_PER_TOKEN = 2
+
+
+@lru_cache(maxsize=1)
+def _encoding():
+    # 프롬프트 예산 계산용 근사치 (gpt-4 계열 토크나이저). 불러올 수 없으면 None -> 글자 수로 추정
+    try:
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        logging.warning(f"tiktoken 인코딩을 불러오지 못해 글자 수로 토큰 수를 추정합니다: {e}")
+        return None
+
+
+def count_tokens(text: str) -> int:
+    encoding = _encoding()
+    if encoding is None:
+        return -(-len(text) // _CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def truncate_to_tokens(text: str, max_tokens: int) -> str:
+    """텍스트를 max_tokens 토큰 이내로 자릅니다. (잘린 경우 끝에 '…' 추가)"""
+    encoding = _encoding()
+    if encoding is None:
+        if count_tokens(text) <= max_tokens:
+            return text
+        return text[:max(max_tokens - 1, 0) * _CHARS_PER_TOKEN] + "…"
+    tokens = encoding.encode(text)
+    if len(tokens) <= max_tokens:
+        return text
+    return encoding.decode(tokens[:max(max_tokens - 1, 0)]) + "…"
@@ -0,0 +1,82 @@
+import os
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from typing import Any, Callable, Dict, List
+
+from langchain.agents import Tool
+
+
+class ToolExecutor:
+    """
+    [도구 실행 스레드 풀]
+    - 역할: 동기 도구(DB 조회, HTTP, 계산기 LLM 라우터 등)를 전용 스레드 풀에서 실행해
+            비동기 에이전트(ainvoke)의 이벤트 루프를 막지 않게 하고, 동시 채팅들이 병렬로 도구를 실행하도록 함.
+    - 스레드 수는 max_workers로 제한되며(DB 풀 크기와 맞추는 것을 권장), 도구 호출마다 timeout_seconds를 적용합니다.
+    - 시간 초과 시 예외 대신 안내 문구를 반환하여 에이전트가 다른 도구로 계속 진행할 수 있게 합니다.
+      (이미 실행 중인 스레드는 중단할 수 없으므로 끝날 때까지 풀의 자리를 차지합니다)
+    """
+
+    def __init__(self, max_workers: int = 8, timeout_seconds: float = 60):
+        self.max_workers = max_workers
+        self.timeout_seconds = timeout_seconds
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="agent-tool")
+        self._lock = threading.Lock()
+        self.metrics = {"calls": 0, "timeouts": 0, "errors": 0}
+
+    def _count(self, key: str) -> None:
+        with self._lock:
+            self.metrics[key] += 1
+
+    def _timeout_message(self, tool_name: str) -> str:
+        self._count("timeouts")
+        return f"'{tool_name}' 도구가 {self.timeout_seconds:.0f}초 안에 응답하지 않았습니다. 다른 도구를 사용하거나 질문을 좁혀주세요."
+
+    def wrap(self, tool: Tool) -> Tool:
+        """도구의 동기/비동기 실행 경로를 모두 풀과 타임아웃을 거치도록 감싼 새 Tool을 반환합니다."""
+        func: Callable[..., str] = tool.func
+
+        def run(*args: Any, **kwargs: Any) -> str:
+            self._count("calls")
+            future = self._pool.submit(func, *args, **kwargs)
+            try:
+                return future.result(timeout=self.timeout_seconds)
+            except FutureTimeoutError:
+                return self._timeout_message(tool.name)
+            except Exception:
+                self._count("errors")
+                raise
+
+        async def arun(*args: Any, **kwargs: Any) -> str:
+            self._count("calls")
+            loop = asyncio.get_running_loop()
+            try:
+                return await asyncio.wait_for(
+                    loop.run_in_executor(self._pool, lambda: func(*args, **kwargs)),
+                    timeout=self.timeout_seconds,
+                )
+            except asyncio.TimeoutError:
+                return self._timeout_message(tool.name)
+            except Exception:
+                self._count("errors")
+                raise
+
+        return Tool(name=tool.name, description=tool.description, func=run, coroutine=arun)
+
+    def wrap_all(self, tools: List[Tool]) -> List[Tool]:
+        return [self.wrap(tool) for tool in tools]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {"max_workers": self.max_workers, "timeout_seconds": self.timeout_seconds, **self.metrics}
+
+    def shutdown(self) -> None:
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+def create_tool_executor() -> ToolExecutor:
+    """환경변수 TOOL_MAX_WORKERS(기본 8), TOOL_TIMEOUT_SECONDS(기본 60)로 도구 실행 풀을 만듭니다."""
+    return ToolExecutor(
+        max_workers=int(os.environ.get("TOOL_MAX_WORKERS", 8)),
+        timeout_seconds=float(os.environ.get("TOOL_TIMEOUT_SECONDS", 60)),
+    )
@@ -1,122 +1,45 @@
 import os
 import re
-import psycopg2
-from datetime import datetime, timedelta
+from datetime import date, datetime
 from typing import List, Dict, Any, Tuple
 from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
-from langchain_openai import OpenAIEmbeddings
-from langchain_community.vectorstores import Chroma
 from langchain.chains import RetrievalQA
 from langchain.agents import Tool
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from dotenv import load_dotenv
 
+from app.query_parser import parse_query_details
+from app.vector_index import VectorIndex
+from app.db import db_connection
+from app.queries import CRUSH_COMMODITIES, classify_intent, fetch_market_context
+from app.retrieval import format_snippets
+from app.data_loader import get_article_full_text
+from app.tokens import truncate_to_tokens
+from app.tool_runner import ToolExecutor, create_tool_executor
+
 load_dotenv()
 
-# [수정/신규] 날짜, 품목, 숫자(수량)를 한 번에 파싱하는 통합 유틸리티 함수
-def parse_query_details(query: str) -> Dict[str, Any]:
-    """
-    사용자 질의에서 날짜(범위 포함), 품목, 특정 숫자(수량) 정보를 한번에 추출합니다.
-    - parse_date_and_commodity와 CommodityCalculator.parse_dates 기능을 통합 및 개선했습니다.
-    """
-    q_lower = query.lower()
-    result = {
-        "dates": [],          # 추출된 날짜 (최대 2개)
-        "commodity_name": None, # 품목 영문명
-        "value": None,        # 추출된 숫자 (수량)
-        "unit": None          # 추출된 숫자의 단위
-    }
-
-    # 1. 품목명 추출 (한글 -> 영문 매핑)
-    commodity_mapping = {
-        "옥수수": "Corn", "corn": "Corn",
-        "대두": "Soybean", "soybean": "Soybean",
-        "대두박": "Soybean Meal", "soybean meal": "Soybean Meal",
-        "대두유": "Soybean Oil", "soybean oil": "Soybean Oil",
-        "소맥": "Wheat", "밀": "Wheat", "wheat": "Wheat",
-        "팜오일": "Palm Oil", "팜유": "Palm Oil", "palm oil": "Palm Oil"
-    }
-    for korean_name, english_name in commodity_mapping.items():
-        if korean_name.lower() in q_lower:
-            result["commodity_name"] = english_name
-            break
-
-    # 2. 날짜 추출 (상대 날짜, 절대 날짜, 기간 모두 처리)
-    today = datetime.now()
-    dates = []
-    
-    # 절대 날짜 (YYYY-MM-DD, YYYY.MM.DD 등)
-    # 정규식 수정: '월'과 '일' 사이 공백도 허용
-    abs_dates = re.findall(r'(\d{4})[년.\-\s]+(\d{1,2})[월.\-\s]+(\d{1,2})일?', query)
-    for d in abs_dates:
-        y, m, day = map(int, d)
-        try:
-            dates.append(datetime(y, m, day).strftime("%Y-%m-%d"))
-        except ValueError:
-            continue
-    
-    # 월/일만 있는 경우 (올해 년도 사용)
-    # 정규식 수정: '년'이 없는 경우만 매칭되도록 Negative lookbehind 사용
-    month_day_dates = re.findall(r'(?<!\d{4}년\s)(\d{1,2})[월.\-\s]+(\d{1,2})일?', query)
-    for d in month_day_dates:
-        m, day = map(int, d)
-        # 이미 위에서 YYYY-MM-DD 형태로 파싱된 경우는 제외
-        temp_date_str = f"{today.year}-{m:02d}-{day:02d}"
-        if temp_date_str not in dates:
-            try:
-                dates.append(datetime(today.year, m, day).strftime("%Y-%m-%d"))
-            except ValueError:
-                continue
-
-    # 상대적 날짜
-    if "오늘" in query or "today" in q_lower:
-        dates.append(today.strftime("%Y-%m-%d"))
-    if "어제" in query or "yesterday" in q_lower:
-        dates.append((today - timedelta(days=1)).strftime("%Y-%m-%d"))
-    if "내일" in query or "tomorrow" in q_lower:
-        dates.append((today + timedelta(days=1)).strftime("%Y-%m-%d"))
-    
-    # "n일 전/후"
-    match_days_ago = re.findall(r'(\d+)\s*일\s*(전|뒤|후)', query)
-    for n, direction in match_days_ago:
-        n_days = int(n)
-        if direction == "전":
-            dates.append((today - timedelta(days=n_days)).strftime("%Y-%m-%d"))
-        else: # 후, 뒤
-            dates.append((today + timedelta(days=n_days)).strftime("%Y-%m-%d"))
-
-    # 중복 제거 후 최대 2개까지 저장
-    result["dates"] = sorted(list(set(dates)))[:2]
-
-    # '최근' 키워드 처리
-    if "최근" in query or "최신" in query or "가장 최근" in query:
-        result["date_range"] = "recent"
-    
-    # 3. 숫자와 단위 추출 (수량 변환용) - 모든 규모 단위 지원
-    # 예: "150.5 부셸", "95.2 million acres", "14.9 billion bushel", "200 톤"
-    value_match = re.search(r"([\d\.\,]+)\s*(thousand|million|billion|trillion|천|만|억|조)?\s*(bushels? per acre|bu/acre|bushels?|부셸|bu|톤|ton|acres?|에이커|헥타르|hectare)", q_lower)
-    if value_match:
-        value_str = value_match.group(1).replace(",", "")
-        val = float(value_str)
-        
-        # 규모 단위 처리
-        if value_match.group(2):
-            scale_unit = value_match.group(2).lower()
-            scale_multipliers = {
-                "thousand": 1_000, "천": 1_000,
-                "million": 1_000_000, "백만": 1_000_000,
-                "billion": 1_000_000_000, "십억": 1_000_000_000,
-                "trillion": 1_000_000_000_000, "조": 1_000_000_000_000,
-                "만": 10_000, "억": 100_000_000
-            }
-            val *= scale_multipliers.get(scale_unit, 1)
-            
-        result["value"] = val
-        result["unit"] = value_match.group(3).strip()
+# 계산 질문의 최종 답변 형식 예시 (Commodity Calculator 결과 뒤에 붙음)
+CALCULATION_ANSWER_GUIDE = """[답변 형식 예시] 위 계산 결과를 아래처럼 '사용된 데이터 → 계산 공식 → 단계별 계산 과정 → 최종 결과' 순서로 설명하세요.
+(예: "7월 27일 밀의 베이시스는 +10입니다. 플랫가격을 톤단위로 바꿔주세요"에 대한 답변)
+네, 7월 27일 밀의 플랫가격을 계산하고 톤 단위로 변환하는 과정을 상세히 알려드리겠습니다.
+
+**1. 사용된 데이터**
+* 밀 선물가격 (2025-07-27 기준): **523.75 USc/bu**
+* 베이시스: **+10 cents**
+* 단위 변환 계수 (밀): 1 톤 ≈ 36.7437 부셸
+
+**2. 계산 공식**
+* 플랫가격 (부셸 단위) = 선물가격 + 베이시스
+* 플랫가격 (톤 단위) = (플랫가격 (부셸 단위) / 100) * 톤당 부셸 변환계수
 
-    return result
+**3. 단계별 계산 과정**
+1. **플랫가격 계산 (부셸 단위)**: 523.75 USc/bu + 10 cents = **533.75 USc/bu**
+2. **달러 단위로 변환**: 533.75 USc/bu ÷ 100 = **$5.3375/bu**
+3. **톤 단위로 최종 변환**: $5.3375/bu * 36.7437 부셸/톤 = **$196.12/MT**
+
+따라서, 최종 플랫가격은 **$196.12/MT** 입니다."""
 
 
 def batch(iterable, batch_size=500):
@@ -135,248 +58,9 @@ def sql_query_tool(query: str) -> str:
         # 새로운 통합 파서로 쿼리 분석
         parsed = parse_query_details(query)
         
-        conn = psycopg2.connect(
-            host=os.environ.get("DB_HOST"),
-            dbname=os.environ.get("DB_NAME"),
-            user=os.environ.get("DB_USER"),
-            password=os.environ.get("DB_PASSWORD"),
-            port=os.environ.get("DB_PORT")
-        )
-        cursor = conn.cursor()
-        
-        results = []
-        
-        # 1. 일일 시장 요약 데이터 검색
-        summary_query = """
-        SELECT dms.date, c.name as commodity_name, dms.daily_sentiment_score, 
-               dms.daily_reasoning, dms.daily_keywords, dms.analyzed_news_count
-        FROM daily_market_summary dms
-        JOIN commodities c ON dms.commodity_id = c.id
-        WHERE 1=1
-        """
-        params = []
-        
-        # 파싱된 날짜가 있으면 첫 번째 날짜를 기준으로 검색
-        if parsed["dates"]:
-            summary_query += " AND dms.date = %s"
-            params.append(parsed["dates"][0])
-        elif parsed.get("date_range") == "recent":
-            # 최신 날짜를 조회
-            cursor.execute("SELECT MAX(date) FROM daily_market_summary")
-            latest_date = cursor.fetchone()[0]
-            
-            # 기본적으로 최근 7일간 데이터 조회 (Agent가 판단해서 사용)
-            summary_query += " AND dms.date >= %s - INTERVAL '6 days' AND dms.date <= %s"
-            params.extend([latest_date, latest_date])
-        
-        if parsed["commodity_name"]:
-            summary_query += " AND c.name = %s"
-            params.append(parsed["commodity_name"])
-        
-        summary_query += " ORDER BY dms.date DESC LIMIT 10"
-        
-        cursor.execute(summary_query, tuple(params))
-        summary_results = cursor.fetchall()
-        
-        if summary_results:
-            # 요약 데이터의 기간 정보 명시 + 데이터 상태 설명
-            if len(summary_results) > 1:
-                first_date = summary_results[-1][0]  # 가장 오래된 날짜
-                last_date = summary_results[0][0]    # 가장 최신 날짜
-                
-                # 최신 데이터와 현재 날짜 간격 계산
-                from datetime import datetime, date
-                today = date.today()
-                days_behind = (today - last_date).days
-                
-                if days_behind > 3:
-                    data_status = f" ※ 최신 분석 데이터가 {days_behind}일 전이므로, 가장 최근 가용 데이터를 기준으로 분석했습니다."
-                else:
-                    data_status = ""
-                    
-                results.append(f"=== 일일 시장 요약 (분석기간: {first_date} ~ {last_date}){data_status} ===")
-            else:
-                summary_date = summary_results[0][0]
-                
-                # 단일 날짜도 현재와의 간격 확인
-                from datetime import datetime, date
-                today = date.today()
-                days_behind = (today - summary_date).days
-                
-                if days_behind > 3:
-                    data_status = f" ※ 최신 분석 데이터가 {days_behind}일 전이므로, 가장 최근 가용 데이터를 기준으로 분석했습니다."
-                else:
-                    data_status = ""
-                    
-                results.append(f"=== 일일 시장 요약 (분석일자: {summary_date}){data_status} ===")
-            
-            for row in summary_results:
-                date, commodity, score, reasoning, keywords, news_count = row
-                results.append(f"날짜: {date}")
-                results.append(f"품목: {commodity}")
-                results.append(f"감정점수: {score}")
-                results.append(f"시장 동향: {reasoning}")
-                results.append(f"주요 키워드: {keywords}")
-                results.append(f"분석된 뉴스 수: {news_count}")
-                results.append("---")
-        
-        # 2. 개별 뉴스 분석 데이터 검색 (영향도 기준 개선)
-        if parsed["commodity_name"]:
-            news_query = """
-            SELECT r.title, r.published_time, nar.sentiment_score, 
-                   nar.reasoning, nar.keywords, c.name as commodity_name,
-                   ABS(nar.sentiment_score - 50) as impact_score
-            FROM raw_news r
-            JOIN news_analysis_results nar ON r.id = nar.raw_news_id
-            JOIN commodities c ON nar.commodity_id = c.id
-            WHERE c.name = %s
-            """
-            params = [parsed["commodity_name"]]
-            
-            # 뉴스 조회도 동일한 로직 적용
-            if parsed["dates"]:
-                news_query += " AND DATE(r.published_time) = %s"
-                params.append(parsed["dates"][0])
-            elif parsed.get("date_range") == "recent":
-                # 특정 품목의 최신 뉴스 날짜 기준으로 7일간 조회
-                cursor.execute("""
-                    SELECT MAX(DATE(r.published_time)) 
-                    FROM raw_news r 
-                    JOIN news_analysis_results nar ON r.id = nar.raw_news_id
-                    JOIN commodities c ON nar.commodity_id = c.id
-                    WHERE c.name = %s AND r.analysis_status = TRUE
-                """, [parsed["commodity_name"]])
-                latest_news_date = cursor.fetchone()[0]
-                if latest_news_date:
-                    news_query += " AND DATE(r.published_time) >= %s - INTERVAL '6 days' AND DATE(r.published_time) <= %s"
-                    params.extend([latest_news_date, latest_news_date])
-                else:
-                    # 해당 품목의 뉴스가 없으면 전체에서 최근 7일
-                    news_query += " AND r.published_time >= CURRENT_DATE - INTERVAL '7 days'"
-            
-            # 영향도 높은 뉴스 우선 (감정점수가 50에서 멀수록 영향도 높음) + 최신순
-            news_query += " ORDER BY impact_score DESC, r.published_time DESC LIMIT 10"
-            
-            cursor.execute(news_query, tuple(params))
-            news_results = cursor.fetchall()
-            
-            if news_results:
-                # 기간 정보 계산 및 명시 + 데이터 상태 설명
-                if len(news_results) > 1:
-                    first_date = news_results[-1][1].date()  # 가장 오래된 뉴스 날짜
-                    last_date = news_results[0][1].date()    # 가장 최신 뉴스 날짜
-                    
-                    # 최신 뉴스와 현재 날짜 간격 계산
-                    from datetime import date
-                    today = date.today()
-                    days_behind = (today - last_date).days
-                    
-                    if days_behind > 3:
-                        data_status = f" ※ 최신 뉴스가 {days_behind}일 전이므로, 가장 최근 가용 뉴스를 기준으로 분석했습니다."
-                    else:
-                        data_status = ""
-                        
-                    results.append(f"\n=== 관련 뉴스 분석 (분석기간: {first_date} ~ {last_date}){data_status} ===")
-                else:
-                    news_date = news_results[0][1].date()
-                    
-                    # 단일 뉴스 날짜도 현재와의 간격 확인
-                    from datetime import date
-                    today = date.today()
-                    days_behind = (today - news_date).days
-                    
-                    if days_behind > 3:
-                        data_status = f" ※ 최신 뉴스가 {days_behind}일 전이므로, 가장 최근 가용 뉴스를 기준으로 분석했습니다."
-                    else:
-                        data_status = ""
-                        
-                    results.append(f"\n=== 관련 뉴스 분석 (분석일자: {news_date}){data_status} ===")
-                
-                for row in news_results:
-                    title, pub_time, score, reasoning, keywords, commodity, impact = row
-                    results.append(f"제목: {title}")
-                    results.append(f"발행시간: {pub_time}")
-                    results.append(f"품목: {commodity}")
-                    results.append(f"감정점수: {score} (영향도: {impact:.1f})")
-                    results.append(f"분석 근거: {reasoning}")
-                    results.append(f"키워드: {keywords}")
-                    results.append("---")
-        
-        # 3. 가격 데이터 검색 
-        # 크러시 마진 또는 대두 복합 품목 관련 질문인지 확인하여, 필요한 가격 정보를 선제적으로 조회합니다.
-        q = query.lower()
-
-        # 크러시 마진 관련 키워드 확인
-        crush_keywords = ["크러시", "크러쉬", "크러싱", "착유", "crush", "보드", "board"]
-        margin_keywords = ["마진", "margin"]
-        has_crush_keyword = any(keyword in q for keyword in crush_keywords)
-        has_margin_keyword = any(keyword in q for keyword in margin_keywords)
-        is_board_crush_query = "board crush" in q
-        is_crush_query = (has_crush_keyword and has_margin_keyword) or is_board_crush_query
-
-        # 대두 관련 복수 품목 키워드 확인
-        is_soy_complex_query = ("대두" in q and ("대두박" in q or "대두유" in q)) or \
-                            ("soybean" in q and ("meal" in q or "oil" in q))
-
-        if is_crush_query or is_soy_complex_query:
-            crush_commodities = ["Soybean", "Soybean Oil", "Soybean Meal"]
-            crush_prices = []
-            
-            for commodity in crush_commodities:
-                price_query = """
-                SELECT ph.date, ph.closing_price, c.name as commodity_name
-                FROM price_history ph
-                JOIN commodities c ON ph.commodity_id = c.id
-                WHERE c.name = %s
-                """
-                params = [commodity]
-                
-                if parsed["dates"]:
-                    price_query += " AND ph.date = %s"
-                    params.append(parsed["dates"][0])
-                elif parsed.get("date_range") == "recent":
-                    price_query += " AND ph.date >= CURRENT_DATE - INTERVAL '7 days'"
-                
-                price_query += " ORDER BY ph.date DESC LIMIT 1"
-                
-                cursor.execute(price_query, tuple(params))
-                price_result = cursor.fetchone()
-                if price_result:
-                    crush_prices.append(price_result)
-            
-            if crush_prices:
-                results.append("\n=== 크러시 마진 계산용 가격 정보 ===")
-                for date, price, commodity in crush_prices:
-                    results.append(f"날짜: {date}, 품목: {commodity}, 종가: {price}")
-                    
-        elif parsed["commodity_name"]:
-            # 일반적인 단일 품목 가격 조회
-            price_query = """
-            SELECT ph.date, ph.closing_price, c.name as commodity_name
-            FROM price_history ph
-            JOIN commodities c ON ph.commodity_id = c.id
-            WHERE c.name = %s
-            """
-            params = [parsed["commodity_name"]]
-            
-            if parsed["dates"]:
-                price_query += " AND ph.date = %s"
-                params.append(parsed["dates"][0])
-            elif parsed.get("date_range") == "recent":
-                price_query += " AND ph.date >= CURRENT_DATE - INTERVAL '7 days'"
-            
-            price_query += " ORDER BY ph.date DESC LIMIT 5"
-            
-            cursor.execute(price_query, tuple(params))
-            price_results = cursor.fetchall()
-            
-            if price_results:
-                results.append("\n=== 가격 정보 ===")
-                for row in price_results:
-                    date, price, commodity = row
-                    results.append(f"날짜: {date}, 품목: {commodity}, 종가: {price}")
-        
-        conn.close()
+        # 풀에서 빌린 연결은 with 블록을 벗어나면 (예외가 나더라도) 반납됩니다.
+        with db_connection() as conn, conn.cursor() as cursor:
+            results = _run_sql_queries(query, parsed, conn, cursor)
         
         if results:
             return "\n".join(results)
@@ -386,17 +70,123 @@ def sql_query_tool(query: str) -> str:
     except Exception as e:
         return f"데이터베이스 검색 중 오류가 발생했습니다: {str(e)}"
 
+
+def _run_sql_queries(query: str, parsed: Dict[str, Any], conn, cursor) -> List[str]:
+    """sql_query_tool의 조회 본문: 요약/뉴스/가격 데이터를 한 번에 조회해 결과 줄 목록을 반환합니다. (app/queries.py)"""
+    results = []
+    
+    # 가격 데이터 범위 결정
+    # 크러시 마진 또는 대두 복합 품목 관련 질문인지 확인하여, 필요한 가격 정보를 선제적으로 조회합니다.
+    q = query.lower()
+
+    # 크러시 마진 관련 키워드 확인
+    crush_keywords = ["크러시", "크러쉬", "크러싱", "착유", "crush", "보드", "board"]
+    margin_keywords = ["마진", "margin"]
+    has_crush_keyword = any(keyword in q for keyword in crush_keywords)
+    has_margin_keyword = any(keyword in q for keyword in margin_keywords)
+    is_board_crush_query = "board crush" in q
+    is_crush_query = (has_crush_keyword and has_margin_keyword) or is_board_crush_query
+
+    # 대두 관련 복수 품목 키워드 확인
+    is_soy_complex_query = ("대두" in q and ("대두박" in q or "대두유" in q)) or \
+                        ("soybean" in q and ("meal" in q or "oil" in q))
+
+    if is_crush_query or is_soy_complex_query:
+        # 대두/대두유/대두박 각 1건 (크러시 마진 계산용)
+        price_commodities, price_limit = CRUSH_COMMODITIES, 1
+    elif parsed["commodity_name"]:
+        # 일반적인 단일 품목 가격 조회
+        price_commodities, price_limit = [parsed["commodity_name"]], 5
+    else:
+        price_commodities, price_limit = [], 0
+    
+    # 요약 + 영향도 상위 뉴스 + 가격을 질문 유형별 prepared statement 하나로 조회
+    context = fetch_market_context(
+        conn, cursor,
+        intent=classify_intent(parsed),
+        commodity=parsed["commodity_name"],
+        target_date=parsed["dates"][0] if parsed["dates"] else None,
+        price_commodities=price_commodities,
+        price_limit=price_limit,
+    )
+    
+    # 1. 일일 시장 요약 데이터
+    summary_results = context["summaries"]
+    
+    if summary_results:
+        # 요약 데이터의 기간 정보 명시 + 데이터 상태 설명
+        today = date.today()
+        last_date = date.fromisoformat(summary_results[0]["date"])    # 가장 최신 날짜
+        days_behind = (today - last_date).days
+        
+        if days_behind > 3:
+            data_status = f" ※ 최신 분석 데이터가 {days_behind}일 전이므로, 가장 최근 가용 데이터를 기준으로 분석했습니다."
+        else:
+            data_status = ""
+        
+        if len(summary_results) > 1:
+            first_date = date.fromisoformat(summary_results[-1]["date"])  # 가장 오래된 날짜
+            results.append(f"=== 일일 시장 요약 (분석기간: {first_date} ~ {last_date}){data_status} ===")
+        else:
+            results.append(f"=== 일일 시장 요약 (분석일자: {last_date}){data_status} ===")
+        
+        for row in summary_results:
+            results.append(f"날짜: {row['date']}")
+            results.append(f"품목: {row['commodity_name']}")
+            results.append(f"감정점수: {row['daily_sentiment_score']}")
+            results.append(f"시장 동향: {row['daily_reasoning']}")
+            results.append(f"주요 키워드: {row['daily_keywords']}")
+            results.append(f"분석된 뉴스 수: {row['analyzed_news_count']}")
+            results.append("---")
+    
+    # 2. 개별 뉴스 분석 데이터 (영향도 기준, 품목이 지정된 경우만 조회됨)
+    news_results = context["news"]
+    
+    if news_results:
+        # 기간 정보 계산 및 명시 + 데이터 상태 설명
+        today = date.today()
+        last_date = datetime.fromisoformat(news_results[0]["published_time"]).date()    # 영향도 최상위 뉴스 날짜
+        days_behind = (today - last_date).days
+        
+        if days_behind > 3:
+            data_status = f" ※ 최신 뉴스가 {days_behind}일 전이므로, 가장 최근 가용 뉴스를 기준으로 분석했습니다."
+        else:
+            data_status = ""
+        
+        if len(news_results) > 1:
+            first_date = datetime.fromisoformat(news_results[-1]["published_time"]).date()
+            results.append(f"\n=== 관련 뉴스 분석 (분석기간: {first_date} ~ {last_date}){data_status} ===")
+        else:
+            results.append(f"\n=== 관련 뉴스 분석 (분석일자: {last_date}){data_status} ===")
+        
+        for row in news_results:
+            results.append(f"제목: {row['title']}")
+            results.append(f"발행시간: {datetime.fromisoformat(row['published_time'])}")
+            results.append(f"품목: {row['commodity_name']}")
+            results.append(f"감정점수: {row['sentiment_score']} (영향도: {row['impact_score']:.1f})")
+            results.append(f"분석 근거: {row['reasoning']}")
+            results.append(f"키워드: {row['keywords']}")
+            results.append("---")
+    
+    # 3. 가격 데이터
+    price_results = context["prices"]
+    
+    if price_results:
+        if is_crush_query or is_soy_complex_query:
+            results.append("\n=== 크러시 마진 계산용 가격 정보 ===")
+        else:
+            results.append("\n=== 가격 정보 ===")
+        for row in price_results:
+            results.append(f"날짜: {row['date']}, 품목: {row['commodity_name']}, 종가: {row['closing_price']}")
+    
+    return results
+
+
 class CommodityCalculatorRouter:
     """LLM 기반 라우터를 사용한 유연한 계산기 시스템"""
     
     def __init__(self, llm: ChatOpenAI = None):
-        self.conn = psycopg2.connect(
-            host=os.environ.get("DB_HOST"),
-            dbname=os.environ.get("DB_NAME"),
-            user=os.environ.get("DB_USER"),
-            password=os.environ.get("DB_PASSWORD"),
-            port=os.environ.get("DB_PORT")
-        )
+        # 가격 조회 시 공용 커넥션 풀(app.db)에서 연결을 빌려 씁니다. (인스턴스가 연결을 계속 붙잡고 있지 않음)
         self.commodity_id_map = {
             "corn": 1, "옥수수": 1,
             "wheat": 2, "밀": 2, "소맥": 2,
@@ -466,7 +256,6 @@ class CommodityCalculatorRouter:
         return self.commodity_id_map.get(name.lower())
 
     def fetch_price(self, commodity_id: int, date: str = None) -> Tuple[float | None, str | None]:
-        cursor = self.conn.cursor()
         try:
             sql = """
                 SELECT closing_price, date FROM price_history
@@ -479,14 +268,13 @@ class CommodityCalculatorRouter:
             
             sql += " ORDER BY date DESC LIMIT 1"
             
-            cursor.execute(sql, tuple(params))
-            result = cursor.fetchone()
+            with db_connection() as conn, conn.cursor() as cursor:
+                cursor.execute(sql, tuple(params))
+                result = cursor.fetchone()
             return (float(result[0]), result[1].strftime('%Y-%m-%d')) if result else (None, None)
         except Exception as e:
             print(f"가격 조회 오류: {e}")
             return None, None
-        finally:
-            cursor.close()
 
     # [수정] 부셸↔톤 변환 로직: 가격이 아닌 수량을 기준으로 변환
     def bushel_to_ton(self, value: float, commodity_id: int) -> float | None:
@@ -782,77 +570,40 @@ class CommodityCalculatorRouter:
 CommodityCalculator = CommodityCalculatorRouter
 
 
-def create_agent_tools(documents: List[Document], llm: ChatOpenAI):
+def create_agent_tools(documents: List[Document], llm: ChatOpenAI, vector_index: VectorIndex | None = None,
+                       tool_executor: ToolExecutor | None = None):
     """
     [도구 상자 생성]
     - 역할: 뉴스 RAG용 검색 Tool 등 에이전트가 사용할 도구 리스트를 반환
+    - vector_index를 넘기면 임베딩(sync)은 호출 측이 따로 수행합니다. (예: 백엔드의 백그라운드 인덱싱)
+      넘기지 않으면 여기서 인덱스를 열고 documents를 바로 임베딩합니다.
+    - 모든 도구는 tool_executor(전용 스레드 풀 + 호출별 타임아웃)를 거쳐 실행됩니다. (없으면 새로 만듦)
     - 향후: 계산기, 날씨 등 추가 도구를 더 쉽게 확장 가능
     """
-    # 1. 벡터스토어 persist 디렉토리(임베딩 데이터 저장 위치) 지정
-    persist_dir = os.environ.get("CHROMA_PERSIST_DIR", "./chroma_db")
-    print(f"--- [Chroma] 벡터 DB 경로: {persist_dir} ---")
-
-    # 2. 벡터스토어 불러오기(또는 새로 생성)
-    if os.path.exists(persist_dir) and len(os.listdir(persist_dir)) > 0:
-        vectorstore = Chroma(persist_directory=persist_dir, embedding_function=OpenAIEmbeddings())
-        print(f"--- [Chroma] 기존 벡터스토어를 불러왔습니다.")
-        # 기존 임베딩된 문서 추적용 set 생성
-        existing_ids = set()
-        # .get() 메서드로 DB의 모든 메타데이터를 가져와 이미 저장된 문서의 ID를 확인합니다.
-        for doc in vectorstore.get()["metadatas"]:
-            key = None
-            if doc.get("type") == "article_analysis" and doc.get("news_id"):
-                # 뉴스 ID와 품목명을 조합하여 고유 키 생성 (하나의 뉴스에 여러 품목 분석이 있을 수 있으므로)
-                key = f"article_{doc['news_id']}_{doc.get('commodity_name', '')}"
-            elif doc.get("type") == "daily_summary" and doc.get("date") and doc.get("commodity"):
-                key = f"summary_{doc['date']}_{doc['commodity']}"
-            if key:
-                existing_ids.add(key)
-    else:
-        vectorstore = Chroma(persist_directory=persist_dir, embedding_function=OpenAIEmbeddings())
-        print(f"--- [Chroma] 새 벡터스토어를 생성했습니다.")
-        existing_ids = set()
-
-    # 3. 문서 chunk 분할 (너무 긴 문서는 쪼갬)
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
-    splits = text_splitter.split_documents(documents)
-
-    # 4. 기존에 임베딩된 문서는 제외, 신규 문서만 추출 (증분 업데이트)
-    new_splits = []
-    for doc in splits:
-        meta = doc.metadata
-        key = None
-        if meta.get("type") == "article_analysis" and meta.get("news_id"):
-            key = f"article_{meta['news_id']}_{meta.get('commodity_name', '')}"
-        elif meta.get("type") == "daily_summary" and meta.get("date") and meta.get("commodity"):
-            key = f"summary_{meta['date']}_{meta['commodity']}"
-        
-        if key and key not in existing_ids:
-            new_splits.append(doc)
-            existing_ids.add(key)
-
-    # 5. 신규 문서만 임베딩 추가 및 저장 (배치 단위로)
-    print(f"  - 전체 {len(splits)}개 청크 중 신규 {len(new_splits)}개만 임베딩 추가합니다.")
-    batch_size = 500  # OpenAI 임베딩 토큰 제한 고려 (안전하게 500 추천)
-    if new_splits:
-        for batch_docs in batch(new_splits, batch_size):
-            vectorstore.add_documents(batch_docs)
-        vectorstore.persist() # 변경사항을 디스크에 영구 저장
-        print(f"  - 신규 문서 임베딩 및 저장(persist) 완료.")
-
-    # 6. Retriever(검색기) 생성 - 다양한 관점 반영을 위해 mmr 사용
-    retriever = vectorstore.as_retriever(
-        search_type="mmr",      # 유사도 높은 결과 + 다양한 관점의 결과를 함께 가져오는 방식
-        search_kwargs={"k": 6}  # 최종적으로 LLM에 전달할 문서 개수
-    )
+    # 1~5. 벡터스토어 준비 (신규 문서 증분 임베딩 포함)
+    if vector_index is None:
+        vector_index = VectorIndex()
+        vector_index.sync(documents, full=True)
+
+    # 6~7. RetrievalQA 체인(뉴스 답변기) - 검색기는 인덱스 갱신 시 교체되므로 현재 검색기 기준으로 만들어 재사용
+    news_qa_state = {"retriever": None, "chain": None}
+
+    def get_news_qa_chain():
+        retriever = vector_index.retriever
+        if news_qa_state["retriever"] is not retriever:
+            news_qa_state["chain"] = RetrievalQA.from_chain_type(
+                llm=llm,
+                chain_type="stuff",       # 검색된 문서들을 모두 컨텍스트에 넣어 LLM에 전달하는 가장 표준적인 방식
+                retriever=retriever,
+                return_source_documents=True # 답변의 근거가 된 원본 문서를 함께 반환
+            )
+            news_qa_state["retriever"] = retriever
+        return news_qa_state["chain"]
 
-    # 7. RetrievalQA 체인 생성(뉴스 답변기)
-    news_qa_chain = RetrievalQA.from_chain_type(
-        llm=llm,
-        chain_type="stuff",       # 검색된 문서들을 모두 컨텍스트에 넣어 LLM에 전달하는 가장 표준적인 방식
-        retriever=retriever,
-        return_source_documents=True # 답변의 근거가 된 원본 문서를 함께 반환
-    )
+    # 뉴스 도구 모드: "qa"(기본) = RetrievalQA 체인으로 LLM이 요약한 답변을 전달
+    #                 "snippets" = 검색된 근거 문서를 토큰 예산 내로 잘라 에이전트에 바로 전달 (요약용 LLM 호출 없음)
+    rag_tool_mode = os.environ.get("RAG_TOOL_MODE", "qa").lower()
+    snippet_token_budget = int(os.environ.get("RAG_SNIPPET_TOKEN_BUDGET", 1500))
 
     # 8. Tool 객체 생성을 위한 래퍼(wrapper) 함수
     def news_tool_func(input_text: str) -> str:
@@ -860,16 +611,25 @@ def create_agent_tools(documents: List[Document], llm: ChatOpenAI):
         RetrievalQA 체인의 출력은 {'result': '답변', 'source_documents': [...] } 형태의 딕셔너리입니다.
         하지만 LangChain 에이전트의 도구는 반드시 문자열(string)을 반환해야 하므로,
         'result' 키의 값만 추출하여 반환하는 함수로 감싸줍니다.
+        snippets 모드에서는 체인 대신 검색기만 호출하고, 근거 문서 목록(ID/날짜/점수 포함)을 문자열로 반환합니다.
         """
-        output = news_qa_chain.invoke(input_text)
+        # 최초 인덱스 구축 중이라 검색할 벡터가 아직 없으면, 빈 검색 대신 안내 문구를 반환합니다.
+        if vector_index.status == "warming_up" and not vector_index.has_vectors():
+            return "뉴스 검색 인덱스를 구축하는 중입니다. 잠시 후 다시 시도하거나 Precise Data Query를 사용하세요."
+        if rag_tool_mode == "snippets":
+            return format_snippets(vector_index.retriever.search_with_scores(input_text), snippet_token_budget)
+        output = get_news_qa_chain().invoke(input_text)
         return output["result"]
 
     # 9. 뉴스 Tool 객체 생성
+    news_description = "최신 원자재 시장 뉴스, 일일 시장 동향, 감성 점수, 분석 요약 정보를 찾아줍니다. "
+    if rag_tool_mode == "snippets":
+        news_description += "검색된 근거 문서(ID, 날짜, 품목, 관련도 점수, 본문 발췌) 목록을 반환하므로 직접 종합하여 답하세요. "
     news_tool = Tool(
         name="Market News and Summary Search",
         func=news_tool_func,
         description=(
-            "최신 원자재 시장 뉴스, 일일 시장 동향, 감성 점수, 분석 요약 정보를 찾아줍니다. "
+            news_description +
             "예시: '오늘 옥수수 시장 어때?', '브라질 가뭄 뉴스 요약', '최근 대두 시장 상황이 어떤지 뉴스 근거와 함께 알려줘' 등."
         )
     )
@@ -888,9 +648,14 @@ def create_agent_tools(documents: List[Document], llm: ChatOpenAI):
 
     # 11. 계산기 도구 생성 (LLM 라우터 기반)
     calculator = CommodityCalculatorRouter(llm=llm)
+
+    def calculator_func(input_text: str) -> str:
+        # 계산 답변 형식 예시는 에이전트 프롬프트에 두지 않고, 계산기를 사용할 때만 결과와 함께 전달
+        return f"{calculator.calculate(input_text)}\n\n{CALCULATION_ANSWER_GUIDE}"
+
     calc_tool = Tool(
         name="Commodity Calculator",
-        func=calculator.calculate,
+        func=calculator_func,
         description=(
             "LLM 라우터 기반 농산물 계산기입니다. 자연어를 이해하여 적절한 계산 기능을 자동 선택합니다.\n"
             "지원 기능:\n"
@@ -904,8 +669,38 @@ def create_agent_tools(documents: List[Document], llm: ChatOpenAI):
         )
     )
 
-    # 12. 생성된 도구들을 리스트에 담아 반환 (향후 다른 도구 추가 용이)
+    # 12. 기사 원문 조회 도구 (compact 인덱스는 리드 문단만 담고 있으므로, 세부 내용이 필요할 때만 원문을 가져옴)
+    full_text_token_budget = int(os.environ.get("RAG_FULL_TEXT_TOKEN_BUDGET", 3000))
+
+    def article_full_text_func(input_text: str) -> str:
+        match = re.search(r"\d+", input_text)
+        if not match:
+            return "news_id(숫자)를 입력해주세요. 예: '12345'"
+        try:
+            article = get_article_full_text(int(match.group()))
+        except Exception as e:
+            return f"기사 원문 조회 중 오류: {e}"
+        if article is None:
+            return f"news_id {match.group()}에 해당하는 기사가 없습니다."
+        return truncate_to_tokens(
+            f"기사 제목: {article['title']}\n발행 시간: {article['published_time']}\n출처: {article['source']}\n"
+            f"본문: {article['content']}",
+            full_text_token_budget,
+        )
+
+    full_text_tool = Tool(
+        name="News Article Full Text",
+        func=article_full_text_func,
+        description=(
+            "뉴스 기사 한 건의 원문 전체를 가져옵니다. 입력은 Market News and Summary Search 결과에 표시된 news_id 숫자입니다. "
+            "검색 결과의 요약/발췌만으로 답하기 부족할 때만 사용하세요. 예시: '12345'"
+        )
+    )
+
+    # 13. 생성된 도구들을 리스트에 담아 반환 (향후 다른 도구 추가 용이)
+    # 동기 도구들이 이벤트 루프를 막지 않도록 전용 스레드 풀 + 타임아웃으로 감쌈
+    tool_executor = tool_executor or create_tool_executor()
     print("--- [도구 준비 완료] (RAG + SQL 하이브리드) ---")
-    return [news_tool, sql_tool, calc_tool]
+    return tool_executor.wrap_all([news_tool, sql_tool, calc_tool, full_text_tool])
 
 
@@ -0,0 +1,397 @@
+import os
+import time
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from langchain_core.documents import Document
+from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain_openai import OpenAIEmbeddings
+from langchain_community.vectorstores import Chroma
+
+from app.data_loader import (
+    get_documents_from_postgres, get_document_keys_from_postgres, get_index_variant, DOCUMENT_METADATA_VERSION,
+)
+from app.index_manifest import IndexManifest, document_fingerprint, make_chunk_id
+from app.embedding_pipeline import EmbeddingIngestor
+from app.embedding_cache import CachedEmbeddings, get_embedding_cache, get_query_embedding_cache
+from app.retrieval import HybridRetriever
+from app.bm25_index import open_bm25_index
+
+
+def split_documents_with_ids(documents: List[Document], text_splitter) -> Tuple[List[Document], List[str]]:
+    """
+    문서를 한 건씩 chunk로 분할하고, 각 chunk에 결정적 ID를 부여합니다.
+    - 문서 단위로 분할해야 chunk 순번(chunk_index)이 문서 안에서 안정적으로 매겨집니다.
+    - ID를 만들 수 없는 문서의 chunk는 제외합니다.
+    """
+    splits, ids = [], []
+    for doc in documents:
+        for chunk_index, chunk in enumerate(text_splitter.split_documents([doc])):
+            chunk_id = make_chunk_id(chunk.metadata, chunk_index)
+            if chunk_id is None:
+                continue
+            chunk.metadata["chunk_index"] = chunk_index
+            splits.append(chunk)
+            ids.append(chunk_id)
+    return splits, ids
+
+
+def find_stale_chunk_ids(manifest: IndexManifest, splits: List[Document]) -> List[str]:
+    """
+    다시 분할한 문서의 chunk 수가 줄었을 때 남아 있는 이전 chunk ID(더 큰 chunk 순번)를 찾습니다.
+    - chunk 순번은 0부터 연속이므로, 문서별로 새 chunk 수부터 순번을 늘려가며 매니페스트에 있는 ID를 모읍니다.
+    """
+    chunk_counts: Dict[str, Tuple[Dict[str, Any], int]] = {}  # 첫 chunk ID -> (문서 메타데이터, 새 chunk 수)
+    for chunk in splits:
+        doc_key = make_chunk_id(chunk.metadata, 0)
+        metadata, count = chunk_counts.get(doc_key, (chunk.metadata, 0))
+        chunk_counts[doc_key] = (metadata, count + 1)
+    candidates = list(chunk_counts.values())
+    stale = []
+    while candidates:
+        ids = [make_chunk_id(metadata, chunk_index) for metadata, chunk_index in candidates]
+        known = manifest.lookup(ids)
+        stale.extend(chunk_id for chunk_id in ids if chunk_id in known)
+        candidates = [(metadata, chunk_index + 1) for (metadata, chunk_index), chunk_id in zip(candidates, ids) if chunk_id in known]
+    return stale
+
+
+def chroma_collection(vectorstore: Chroma):
+    """
+    LangChain Chroma 래퍼가 감싼 chromadb 컬렉션을 반환합니다.
+    미리 계산한 벡터로 upsert 하거나 메타데이터만 갱신하는 공개 API가 래퍼에 없어 (add_texts/update_documents는
+    항상 다시 임베딩함) 컬렉션을 직접 사용하며, 래퍼의 비공개 속성 접근은 이 함수 한 곳으로 제한합니다.
+    """
+    return vectorstore._collection
+
+
+def find_existing_ids(vectorstore: Chroma, ids: List[str], batch_size: int = 500) -> set:
+    """벡터스토어에 이미 저장된 ID만 골라 반환합니다. (메타데이터 전체 조회 없이 ID 존재 여부만 확인)"""
+    existing = set()
+    for start in range(0, len(ids), batch_size):
+        existing.update(vectorstore.get(ids=ids[start:start + batch_size], include=[])["ids"])
+    return existing
+
+
+class VectorIndex:
+    """
+    [뉴스 벡터 인덱스]
+    - 역할: Chroma 벡터스토어를 열고, 문서를 증분 임베딩(sync)하며, 인덱스 준비 상태를 관리.
+    - 벡터스토어는 생성 즉시 (기존 데이터로) 검색에 사용할 수 있고,
+      sync()는 백그라운드 스레드에서 실행해도 되도록 상태(status)를 기록합니다.
+        - warming_up: 신규 문서 임베딩 중 (기존 인덱스로 검색 가능)
+        - ready: 최신 문서까지 임베딩 완료
+        - error: 마지막 sync 실패 (기존 인덱스로 검색 가능)
+    - variant(RAG_INDEX_VARIANT): "full"은 기본 컬렉션, "compact"는 별도 컬렉션/매니페스트/BM25 파일을 사용하므로
+      두 인덱스가 같은 디렉토리에 공존하며, 설정만 바꿔 전환할 수 있습니다.
+    """
+
+    COLLECTION_NAMES = {"full": Chroma._LANGCHAIN_DEFAULT_COLLECTION_NAME, "compact": "news_compact"}
+
+    def __init__(self, persist_dir: Optional[str] = None, variant: Optional[str] = None):
+        # 1. 벡터스토어 persist 디렉토리(임베딩 데이터 저장 위치) 지정
+        self.persist_dir = persist_dir or os.environ.get("CHROMA_PERSIST_DIR", "./chroma_db")
+        self.variant = variant or get_index_variant()
+        print(f"--- [Chroma] 벡터 DB 경로: {self.persist_dir} (인덱스 구성: {self.variant}) ---")
+
+        # 2. 벡터스토어 불러오기(또는 새로 생성)
+        self.is_existing_store = os.path.exists(self.persist_dir) and len(os.listdir(self.persist_dir)) > 0
+        # 임베딩 캐시를 거치므로, 텍스트가 같은 chunk는 벡터스토어를 새로 만들어도 API를 다시 호출하지 않습니다.
+        # 검색 질의 임베딩도 질의 캐시를 먼저 확인합니다.
+        base_embeddings = OpenAIEmbeddings()
+        self.embeddings = CachedEmbeddings(
+            base_embeddings,
+            get_embedding_cache(base_embeddings.model),
+            query_cache=get_query_embedding_cache(base_embeddings.model),
+        )
+        self.vectorstore = Chroma(
+            collection_name=self.COLLECTION_NAMES[self.variant],
+            persist_directory=self.persist_dir,
+            embedding_function=self.embeddings,
+        )
+        print(f"--- [Chroma] {'기존 벡터스토어를 불러왔습니다' if self.is_existing_store else '새 벡터스토어를 생성했습니다'}.")
+
+        self.manifest = IndexManifest(
+            os.path.join(self.persist_dir, "index_manifest.sqlite3"),
+            collection="default" if self.variant == "full" else self.variant,
+        )
+        # 같은 chunk를 키워드로도 찾기 위한 BM25 역색인 (메모리 로딩은 백그라운드 sync 시점에 수행)
+        self.bm25 = open_bm25_index(self.persist_dir, self.variant)
+        self.text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
+        self._sync_lock = threading.Lock()
+        self.status = "warming_up"
+        self.error: Optional[str] = None
+        self.last_sync_at: Optional[datetime] = None
+        self.last_sync_seconds: Optional[float] = None
+        self.last_sync_added = 0
+        self.syncing = False
+        # 검색기는 sync 후 새로 만들어 참조만 교체합니다. (요청 처리 중에도 안전한 원자적 교체)
+        self.retriever = self.build_retriever()
+
+    def has_vectors(self) -> bool:
+        return self.manifest.count() > 0
+
+    def ensure_bm25_loaded(self) -> None:
+        if not self.bm25.loaded:
+            self.bm25.load()
+            print(f"  - BM25 키워드 인덱스 로딩 완료 ({len(self.bm25)}개 청크)")
+
+    def needs_full_sync(self) -> bool:
+        """
+        전체 문서로 한 번 sync 해야 하는지 판단합니다.
+        - 인덱스의 메타데이터 버전이 현재 data_loader와 다를 때
+        - 벡터는 있는데 BM25 인덱스가 비어 있을 때 (BM25 도입 이전에 만든 인덱스)
+        """
+        self.ensure_bm25_loaded()
+        if len(self.bm25) == 0 and self.has_vectors():
+            return True
+        return self.manifest.get_meta("metadata_version") != DOCUMENT_METADATA_VERSION
+
+    def build_retriever(self):
+        # 질의의 품목/종류/날짜를 where 조건으로 내려보낸 뒤, 벡터(mmr) + BM25 결과를 RRF로 결합
+        return HybridRetriever(
+            vectorstore=self.vectorstore,
+            bm25=self.bm25,
+            mode=os.environ.get("RAG_RETRIEVAL_MODE", "hybrid"),
+            k=6  # 최종적으로 LLM에 전달할 문서 개수
+        )
+
+    def swap_retriever(self) -> None:
+        self.retriever = self.build_retriever()
+
+    def missing_keys(self, article_keys: List[tuple], summary_keys: List[tuple]) -> Tuple[List[tuple], List[tuple]]:
+        """DB의 문서 키 중 인덱스에 아직 없는 것(첫 chunk 기준)을 반환합니다."""
+        article_ids = [make_chunk_id({"type": "article_analysis", "news_id": k[0], "commodity": k[1]}, 0) for k in article_keys]
+        summary_ids = [make_chunk_id({"type": "daily_summary", "date": k[0], "commodity": k[1]}, 0) for k in summary_keys]
+        known = self.manifest.lookup(article_ids + summary_ids)
+        return (
+            [k for k, i in zip(article_keys, article_ids) if i not in known],
+            [k for k, i in zip(summary_keys, summary_ids) if i not in known],
+        )
+
+    def sync(self, documents: List[Document], full: bool = False) -> int:
+        """
+        문서 중 신규/변경 chunk만 임베딩해 저장하고, 추가된 chunk 수를 반환합니다.
+        - full=True: documents가 DB 전체 문서임을 뜻하며, 성공 시 메타데이터 버전을 기록합니다.
+        """
+        with self._sync_lock:
+            started = time.monotonic()
+            self.syncing = True
+            try:
+                added = self._sync(documents)
+            except Exception as e:
+                self.status = "error"
+                self.error = str(e)
+                raise
+            finally:
+                self.syncing = False
+            if full and documents:
+                self.manifest.set_meta("metadata_version", DOCUMENT_METADATA_VERSION)
+            self.status = "ready"
+            self.error = None
+            self.last_sync_at = datetime.now()
+            self.last_sync_seconds = round(time.monotonic() - started, 2)
+            self.last_sync_added = added
+            return added
+
+    def _sync(self, documents: List[Document]) -> int:
+        self.ensure_bm25_loaded()
+
+        # 3. 문서 chunk 분할 (너무 긴 문서는 쪼갬) + chunk별 결정적 ID 부여
+        splits, split_ids = split_documents_with_ids(documents, self.text_splitter)
+
+        # 4. 사이드카 매니페스트로 신규/변경 chunk만 추출 (증분 업데이트)
+        # 매니페스트(SQLite)에는 저장된 chunk ID와 지문만 있으므로, 컬렉션 전체를 읽지 않고 이번 chunk들만 조회합니다.
+        split_fps = [document_fingerprint(doc) for doc in splits]
+        if self.is_existing_store and self.manifest.count() == 0:
+            # 매니페스트 도입 이전에 만든 벡터스토어: 한 번만 ID 존재 여부를 확인해 매니페스트를 채웁니다.
+            existing_ids = find_existing_ids(self.vectorstore, split_ids)
+            self.manifest.record(
+                [i for i in split_ids if i in existing_ids],
+                [fp for i, fp in zip(split_ids, split_fps) if i in existing_ids],
+            )
+            print(f"  - 기존 벡터스토어에서 {len(existing_ids)}개 청크를 매니페스트에 등록했습니다.")
+        # 본문이 짧아져 chunk 수가 줄어든 문서의 이전 chunk는 검색되지 않도록 세 인덱스에서 모두 삭제
+        stale_ids = find_stale_chunk_ids(self.manifest, splits)
+        if stale_ids:
+            self.vectorstore.delete(ids=stale_ids)
+            self.manifest.delete(stale_ids)
+            self.bm25.delete(stale_ids)
+            print(f"  - 더 이상 생성되지 않는 이전 청크 {len(stale_ids)}개를 삭제했습니다.")
+        pending, metadata_only = self.manifest.changes(split_ids, split_fps)
+        if metadata_only:
+            self._update_metadata([split_ids[i] for i in metadata_only], [splits[i] for i in metadata_only],
+                                  [split_fps[i] for i in metadata_only])
+        new_splits = [splits[i] for i in pending]
+        new_ids = [split_ids[i] for i in pending]
+        new_fps = [split_fps[i] for i in pending]
+
+        # 벡터스토어에는 이미 있지만 BM25에는 없는 chunk는 바로 역색인에 추가 (임베딩 불필요)
+        pending_set = set(pending) | set(metadata_only)
+        bm25_only = [i for i, chunk_id in enumerate(split_ids) if i not in pending_set and chunk_id not in self.bm25]
+        if bm25_only:
+            self.bm25.upsert([split_ids[i] for i in bm25_only], [splits[i] for i in bm25_only])
+            print(f"  - BM25 인덱스에 기존 청크 {len(bm25_only)}개를 추가했습니다.")
+
+        # 5. 신규 문서만 병렬 임베딩 파이프라인으로 추가 및 저장
+        # 여러 임베딩 요청을 동시에 보내고, writer 스레드가 계산된 벡터를 Chroma에 기록합니다.
+        print(f"  - 전체 {len(splits)}개 청크 중 신규 {len(new_splits)}개만 임베딩 추가합니다.")
+        if not new_splits:
+            return 0
+        ingestor = EmbeddingIngestor(
+            chroma_collection(self.vectorstore),
+            self.embeddings,
+            manifest=self.manifest,
+            batch_size=int(os.environ.get("EMBED_BATCH_SIZE", 100)),
+            max_in_flight=int(os.environ.get("EMBED_MAX_IN_FLIGHT", 4)),
+            requests_per_minute=int(os.environ.get("EMBED_REQUESTS_PER_MINUTE", 0)) or None,
+        )
+        added = ingestor.ingest(new_splits, new_ids, new_fps)
+        self.vectorstore.persist() # 변경사항을 디스크에 영구 저장
+        # 벡터스토어에 반영된 chunk를 BM25 역색인에도 반영 (두 인덱스가 같은 chunk ID 집합을 유지)
+        self.bm25.upsert(new_ids, new_splits)
+        print(f"  - 신규 문서 임베딩 및 저장(persist) 완료. (임베딩 캐시 적중 {self.embeddings.hits}건, API 요청 {self.embeddings.misses}건)")
+        return added
+
+    def _update_metadata(self, ids: List[str], docs: List[Document], fingerprints: List[str], batch_size: int = 500) -> None:
+        """본문은 그대로이고 메타데이터만 바뀐 chunk는 임베딩 없이 Chroma/BM25의 메타데이터와 매니페스트만 갱신합니다."""
+        collection = chroma_collection(self.vectorstore)
+        for start in range(0, len(ids), batch_size):
+            batch_ids = ids[start:start + batch_size]
+            batch_docs = docs[start:start + batch_size]
+            collection.update(ids=batch_ids, metadatas=[doc.metadata for doc in batch_docs])
+            self.manifest.record(batch_ids, fingerprints[start:start + batch_size])
+        self.bm25.upsert(ids, docs)
+        print(f"  - 메타데이터만 바뀐 청크 {len(ids)}개는 임베딩 없이 메타데이터만 갱신했습니다.")
+
+    def status_dict(self) -> Dict[str, Any]:
+        return {
+            "status": self.status,
+            "variant": self.variant,
+            "syncing": self.syncing,
+            "error": self.error,
+            "last_sync_at": self.last_sync_at,
+            "last_sync_seconds": self.last_sync_seconds,
+            "last_sync_added": self.last_sync_added,
+            "bm25_chunks": len(self.bm25),
+            "query_embedding_cache": self.embeddings.query_cache.stats(),
+            **self.manifest.stats(),
+        }
+
+
+class IndexRefresher:
+    """
+    [인덱스 실시간 갱신기]
+    - 역할: 백엔드를 재시작하지 않고, 새로 분석된 뉴스/일일 요약을 주기적으로 벡터 인덱스에 반영.
+    - 동작: 문서 키만 가볍게 조회 → 인덱스에 없는 row만 본문까지 로딩 → 임베딩(sync) → 검색기 교체.
+    - interval_seconds마다 자동 실행되며, trigger()로 즉시 실행을 요청할 수도 있습니다. (0이면 수동 실행만)
+    """
+
+    def __init__(self, vector_index: VectorIndex, interval_seconds: int = 600, on_refresh=None):
+        self.vector_index = vector_index
+        self.interval_seconds = interval_seconds
+        self.on_refresh = on_refresh  # 신규 chunk가 반영된 뒤 호출할 콜백 (예: 캐시 무효화)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.refresh_count = 0
+        self.last_refresh_at: Optional[datetime] = None
+        self.last_lag: Dict[str, Any] = {}
+        self.last_error: Optional[str] = None
+
+    def start(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="index-refresher", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._wake.set()
+
+    def trigger(self) -> None:
+        """다음 주기를 기다리지 않고 갱신을 요청합니다."""
+        self._wake.set()
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self.refresh()
+                self.last_error = None
+            except Exception as e:
+                self.last_error = str(e)
+                print(f"[ERROR] Index refresh failed: {e}")
+            self._wake.wait(self.interval_seconds or None)
+            self._wake.clear()
+
+    def _lag_from_keys(self, article_keys: List[tuple], summary_keys: List[tuple]) -> Dict[str, Any]:
+        missing_articles, missing_summaries = self.vector_index.missing_keys(article_keys, summary_keys)
+        oldest = min((k[2] for k in missing_articles if k[2] is not None), default=None)
+        self.last_lag = {
+            "unindexed_articles": len(missing_articles),
+            "unindexed_summaries": len(missing_summaries),
+            "oldest_unindexed_published_time": oldest,
+            "checked_at": datetime.now(),
+        }
+        return self.last_lag
+
+    def lag(self) -> Dict[str, Any]:
+        """DB에는 있지만 아직 인덱스에 반영되지 않은 row 수와 가장 오래된 미반영 뉴스 시각을 반환합니다."""
+        return self._lag_from_keys(*get_document_keys_from_postgres())
+
+    def refresh(self) -> int:
+        """
+        인덱스에 없는 row만 로딩해 임베딩하고, 추가된 chunk 수를 반환합니다.
+        - DB 조회나 임베딩이 실패하면 인덱스 상태를 error로 바꾸고 예외를 다시 올립니다. (기존 인덱스로 검색은 계속 가능)
+        """
+        try:
+            article_keys, summary_keys = get_document_keys_from_postgres()
+            missing_articles, missing_summaries = self.vector_index.missing_keys(article_keys, summary_keys)
+            full = self.vector_index.needs_full_sync()
+            documents = []
+            if full:
+                # 메타데이터 구성이 바뀐 경우(또는 새 인덱스): 전체 문서를 로딩해 변경된 chunk를 다시 upsert (임베딩은 캐시 사용)
+                documents = get_documents_from_postgres(variant=self.vector_index.variant, raise_errors=True)
+            elif missing_articles or missing_summaries:
+                # 품목이 여러 개인 뉴스·날짜는 이미 반영된 품목까지 함께 로딩되지만, 매니페스트가 걸러내므로 중복 임베딩은 없습니다.
+                documents = get_documents_from_postgres(
+                    news_ids=sorted({k[0] for k in missing_articles}),
+                    summary_dates=sorted({k[0] for k in missing_summaries}),
+                    variant=self.vector_index.variant,
+                    raise_errors=True,
+                )
+            added = self.vector_index.sync(documents, full=full)
+        except Exception as e:
+            self.vector_index.status = "error"
+            self.vector_index.error = str(e)
+            raise
+        if added:
+            self.vector_index.swap_retriever()
+            if self.on_refresh:
+                self.on_refresh(added)
+        self.refresh_count += 1
+        self.last_refresh_at = datetime.now()
+        # 조회한 키 기준으로 다시 계산 (ID를 만들 수 없어 건너뛴 row 등은 계속 미반영으로 표시)
+        self._lag_from_keys(article_keys, summary_keys)
+        print(f"[INFO] Index refresh done: {added} new chunks (articles {len(missing_articles)}, summaries {len(missing_summaries)})")
+        return added
+
+    def status_dict(self) -> Dict[str, Any]:
+        return {
+            "interval_seconds": self.interval_seconds,
+            "refresh_count": self.refresh_count,
+            "last_refresh_at": self.last_refresh_at,
+            "last_error": self.last_error,
+            "lag": self.last_lag,
+        }
+
+
+def index_documents(documents: List[Document], persist_dir: Optional[str] = None,
+                    variant: Optional[str] = None) -> VectorIndex:
+    """
+    [벡터 인덱스 구축]
+    - 역할: 벡터 인덱스를 열고 문서를 증분 임베딩한 뒤 반환. (CLI 챗봇, 재색인 스크립트에서 사용)
+    - documents는 같은 variant로 로딩한 문서여야 합니다.
+    """
+    index = VectorIndex(persist_dir, variant=variant)
+    index.sync(documents, full=True)
+    return index
@@ -1,21 +1,30 @@
 #웹 API 서버로 실행되는 챗봇 (FastAPI 기반)
 
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, Header, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import StreamingResponse
 import asyncio
+import hashlib
+import hmac
 import json
 import os
-import psycopg2
-import pandas as pd
+import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Any, Optional
 from pydantic import BaseModel
 import sys
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
-from app.data_loader import get_documents_from_postgres
 from app.tools import create_agent_tools
+from app.vector_index import VectorIndex, IndexRefresher
+from app.answer_cache import SemanticAnswerCache
+from app.tool_runner import create_tool_executor
+from app.session_store import SessionStore
+from app.streaming import AgentStreamHandler
+from app.agent_budget import PathMetrics, budget_scope, create_request_budget, memoize_tools
+from app.fast_path import answer_structured_question, match_structured_question, synthesize_answer
+from app.db import db_connection, pool_stats, close_pool
+from app.async_db import create_async_database
 from app.agent_logic import create_analyst_agent
 from langchain_openai import ChatOpenAI
 
@@ -37,19 +46,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Database connection
-def get_db_connection():
-    return psycopg2.connect(
-        host=os.environ.get("DB_HOST", "localhost"),
-        dbname=os.environ.get("DB_NAME", "market_sentiment"),
-        user=os.environ.get("DB_USER", "postgres"),
-        password=os.environ.get("DB_PASSWORD", "password"),
-        port=os.environ.get("DB_PORT", "5432")
-    )
+# Database access:
+# - /api/dashboard/* routes use the asyncpg pool (await async_db.fetch(...)) so queries never block the event loop
+# - sync code paths (agent tools, answer cache, debug) use the psycopg2 pool in app/db.py (with db_connection() as conn: ...)
+async_db = create_async_database()
+
+def get_latest_summary_date() -> Optional[str]:
+    """Latest daily_market_summary date - the data version for the answer cache"""
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("SELECT MAX(date) FROM daily_market_summary")
+        latest = cur.fetchone()[0]
+    return str(latest) if latest else None
 
 # Pydantic models
 class ChatRequest(BaseModel):
     message: str
+    # Conversation id chosen by the client; omitted -> a new session is started (returned in the start event)
+    session_id: Optional[str] = None
 
 class SentimentCard(BaseModel):
     commodity_name: str
@@ -79,11 +92,37 @@ class TrendingKeyword(BaseModel):
 
 # Initialize agent once
 agent_executor = None
+# 빠른 경로/요약 답변 생성에 쓰는 LLM과 SQL 도구 (에이전트와 공유)
+agent_llm = None
+fast_path_tool = None
+# 채팅 요청 처리 경로(답변 캐시/빠른 경로/에이전트/예산 중단)별 횟수와 평균 사용량
+path_metrics = PathMetrics()
+AGENT_MODE = os.environ.get("AGENT_MODE", "react")
+
+# 인덱스가 ready가 아닐 때 답변 전에 보내는 상태 이벤트 메시지 (인덱스 상태별)
+INDEX_STATUS_MESSAGES = {
+    "warming_up": "뉴스 인덱스를 최신 데이터로 갱신 중입니다. 기존 인덱스로 답변합니다.",
+    "error": "뉴스 인덱스 갱신에 실패했습니다. 마지막으로 반영된 인덱스로 답변하며, 최신 뉴스가 빠져 있을 수 있습니다.",
+}
+
+# 뉴스 벡터 인덱스 (임베딩은 백그라운드에서 수행) 및 주기적 갱신기
+vector_index = None
+index_refresher = None
+# 같은 데이터 기준일의 유사 질문에 대한 답변 캐시
+answer_cache = None
+# 동기 도구(DB/HTTP/LLM 라우터)를 이벤트 루프 밖에서 실행하는 전용 스레드 풀
+tool_executor = create_tool_executor()
+# 세션별 대화 기록 (에이전트는 메모리 없이 공유하고, 요청마다 해당 세션의 chat_history를 넘김)
+session_store = SessionStore(
+    max_sessions=int(os.environ.get("CHAT_MAX_SESSIONS", 1000)),
+    ttl_seconds=float(os.environ.get("CHAT_SESSION_TTL_SECONDS", 3600)),
+    memory_turns=int(os.environ.get("CHAT_MEMORY_TURNS", 15)),
+)
 
 
 @app.on_event("startup")
 async def startup_event():
-    global agent_executor
+    global agent_executor, agent_llm, fast_path_tool, vector_index, index_refresher, answer_cache
     try:
         print("[INFO] Starting AI Agent initialization...")
         
@@ -97,17 +136,17 @@ async def startup_event():
         # Initialize LLM
         print("[INFO] Initializing ChatOpenAI model...")
         custom_client = httpx.Client(verify=False) #회사에서 API 사용위해 넣어야하는 코드줄
-        llm = ChatOpenAI(model="gpt-4.1", temperature=0.3, http_client=custom_client)
+        # streaming=True: 최종 답변 토큰을 SSE로 바로 전달하기 위함 (app/streaming.py)
+        llm = ChatOpenAI(model="gpt-4.1", temperature=0.3, http_client=custom_client, streaming=True)
         print("[INFO] ChatOpenAI model initialized")
         
-        # Load documents from PostgreSQL
-        print("[INFO] Loading documents from PostgreSQL...")
-        documents = get_documents_from_postgres()
-        print(f"[INFO] Loaded {len(documents)} documents from database")
+        # Open the existing vector index (no embedding here - that happens in the background)
+        vector_index = VectorIndex()
         
         # Create agent tools
         print("[INFO] Creating agent tools...")
-        tools = create_agent_tools(documents, llm)
+        # 같은 요청 안의 반복 도구 호출은 이전 결과를 재사용
+        tools = memoize_tools(create_agent_tools([], llm, vector_index=vector_index, tool_executor=tool_executor))
         if not tools:
             print("[ERROR] Failed to create agent tools - tools list is empty")
             return
@@ -115,12 +154,42 @@ async def startup_event():
         
         # Create analyst agent
         print("[INFO] Creating analyst agent...")
-        agent_executor = create_analyst_agent(tools, llm)
+        agent_executor = create_analyst_agent(
+            tools, llm, with_memory=False,
+            # 도구 호출 상한(AGENT_MAX_STEPS) + 최종 답변 단계
+            max_iterations=int(os.environ.get("AGENT_MAX_STEPS", 8)) + 1,
+            max_execution_time=float(os.environ.get("AGENT_MAX_SECONDS", 60)),
+            # react: 텍스트 ReAct 파싱 / tools: 네이티브 함수 호출(병렬 도구 호출) / plan: 계획 후 동시 실행
+            mode=AGENT_MODE,
+        )
+        agent_llm = llm
+        fast_path_tool = next((tool for tool in tools if tool.name == "Precise Data Query"), None)
         if agent_executor:
             print("[INFO] AI Agent initialized successfully!")
             print(f"[INFO] Agent tools available: {[tool.name for tool in tools]}")
         else:
             print("[ERROR] Failed to create agent executor")
+        
+        # Semantic answer cache in front of /api/chat (reuses the cached query embeddings)
+        if os.environ.get("ANSWER_CACHE_ENABLED", "true").lower() == "true":
+            answer_cache = SemanticAnswerCache(
+                vector_index.embeddings,
+                get_latest_summary_date,
+                threshold=float(os.environ.get("ANSWER_CACHE_THRESHOLD", 0.95)),
+                max_entries=int(os.environ.get("ANSWER_CACHE_MAX_ENTRIES", 500)),
+                ttl_seconds=float(os.environ.get("ANSWER_CACHE_TTL_SECONDS", 86400)),
+            )
+        
+        # Embed new documents in the background so the server is ready immediately.
+        # The first refresh builds the index; later ones pick up newly analyzed rows without a restart.
+        # Newly indexed data invalidates cached answers.
+        print("[INFO] Building vector index in the background...")
+        index_refresher = IndexRefresher(
+            vector_index,
+            interval_seconds=int(os.environ.get("INDEX_REFRESH_INTERVAL_SECONDS", 600)),
+            on_refresh=answer_cache.invalidate if answer_cache else None,
+        )
+        index_refresher.start()
             
     except Exception as e:
         print(f"[ERROR] Failed to initialize AI agent: {e}")
@@ -128,11 +197,18 @@ async def startup_event():
         print(f"[ERROR] Traceback: {traceback.format_exc()}")
         agent_executor = None
 
+@app.on_event("shutdown")
+async def shutdown_event():
+    if index_refresher:
+        index_refresher.stop()
+    tool_executor.shutdown()
+    close_pool()
+    await async_db.close()
+
 @app.get("/api/dashboard/sentiment-cards", response_model=List[SentimentCard])
 async def get_sentiment_cards():
     """Get current sentiment scores for all commodities"""
     try:
-        conn = get_db_connection()
         query = """
         SELECT DISTINCT ON (c.name) 
             c.name as commodity_name,
@@ -144,11 +220,10 @@ async def get_sentiment_cards():
         LEFT JOIN daily_market_summary dms ON c.id = dms.commodity_id
         ORDER BY c.name, dms.date DESC
         """
-        df = pd.read_sql(query, conn)
-        conn.close()
+        rows = await async_db.fetch(query)
         
         cards = []
-        for _, row in df.iterrows():
+        for row in rows:
             keywords = []
             if row['daily_keywords']:
                 try:
@@ -172,64 +247,63 @@ async def get_sentiment_cards():
 async def get_time_series_data(commodity_name: str):
     """Get time series data for sentiment scores and prices for a specific commodity"""
     try:
-        conn = get_db_connection()
-        
         # First, get sentiment data with date range
         sentiment_query = """
         SELECT dms.date, dms.daily_sentiment_score
         FROM daily_market_summary dms
         JOIN commodities c ON dms.commodity_id = c.id
-        WHERE c.name = %s
+        WHERE c.name = $1
         ORDER BY dms.date
         """
         
-        df_sentiment = pd.read_sql(sentiment_query, conn, params=[commodity_name])
+        sentiment_rows = await async_db.fetch(sentiment_query, commodity_name)
         
-        if df_sentiment.empty:
-            conn.close()
+        if not sentiment_rows:
             return []
         
-        # Get date range from sentiment data
-        min_date = df_sentiment['date'].min()
-        max_date = df_sentiment['date'].max()
+        # Get date range from sentiment data (rows are ordered by date)
+        min_date = sentiment_rows[0]['date']
+        max_date = sentiment_rows[-1]['date']
         
         # Get actual price data from price_history table ONLY
         price_query = """
         SELECT ph.date, ph.closing_price as price
         FROM price_history ph
         JOIN commodities c ON ph.commodity_id = c.id
-        WHERE c.name = %s 
-        AND ph.date >= %s 
-        AND ph.date <= %s
+        WHERE c.name = $1 
+        AND ph.date >= $2 
+        AND ph.date <= $3
         ORDER BY ph.date
         """
         
         try:
-            df_price = pd.read_sql(price_query, conn, params=[commodity_name, min_date, max_date])
-            print(f"[INFO] Found {len(df_price)} price records for {commodity_name}")
+            price_rows = await async_db.fetch(price_query, commodity_name, min_date, max_date)
+            print(f"[INFO] Found {len(price_rows)} price records for {commodity_name}")
         except Exception as price_error:
             print(f"[ERROR] Could not fetch from price_history table: {price_error}")
-            conn.close()
             raise HTTPException(
                 status_code=404, 
                 detail=f"Price data not available for {commodity_name}. price_history table may not exist or contain data for this commodity."
             )
         
-        if df_price.empty:
+        if not price_rows:
             print(f"[WARNING] No price data found for {commodity_name}, but continuing with sentiment data only")
-            # Create empty dataframe with same structure for consistent merging
-            df_price = pd.DataFrame(columns=['date', 'price'])
+        
+        # First price per date (same as picking the first matching row)
+        prices_by_date = {}
+        for row in price_rows:
+            prices_by_date.setdefault(row['date'], row['price'])
         
         # Merge sentiment and price data - INCLUDE ALL sentiment data, price can be null
         time_series = []
         
-        for _, row in df_sentiment.iterrows():
+        for row in sentiment_rows:
             date = row['date']
             sentiment_score = float(row['daily_sentiment_score']) if row['daily_sentiment_score'] else None
             
             # Get actual price for this date - allow null prices
-            price_row = df_price[df_price['date'] == date]
-            price = float(price_row.iloc[0]['price']) if not price_row.empty else None
+            price = prices_by_date.get(date)
+            price = float(price) if price is not None else None
             
             # Always include sentiment data, even if price is missing
             time_series.append(TimeSeriesData(
@@ -238,7 +312,6 @@ async def get_time_series_data(commodity_name: str):
                 price=price
             ))
         
-        conn.close()
         return time_series
         
     except Exception as e:
@@ -248,7 +321,6 @@ async def get_time_series_data(commodity_name: str):
 async def get_news_articles(commodity_name: str):
     """Get all news articles for a specific commodity"""
     try:
-        conn = get_db_connection()
         query = """
         SELECT 
             r.id, r.title, r.content, r.published_time, r.source,
@@ -256,15 +328,14 @@ async def get_news_articles(commodity_name: str):
         FROM raw_news r
         JOIN news_analysis_results nar ON r.id = nar.raw_news_id
         JOIN commodities c ON nar.commodity_id = c.id
-        WHERE c.name = %s AND r.analysis_status = TRUE
+        WHERE c.name = $1 AND r.analysis_status = TRUE
         ORDER BY r.published_time DESC
         """
         
-        df = pd.read_sql(query, conn, params=[commodity_name])
-        conn.close()
+        rows = await async_db.fetch(query, commodity_name)
         
         articles = []
-        for _, row in df.iterrows():
+        for row in rows:
             keywords = []
             if row['keywords']:
                 try:
@@ -288,36 +359,34 @@ async def get_news_articles(commodity_name: str):
         raise HTTPException(status_code=500, detail=f"Failed to fetch news articles: {str(e)}")
 
 @app.get("/api/debug/database-info")
-async def get_database_info():
-    """Debug endpoint to check database tables and schema"""
+def get_database_info():
+    """Debug endpoint to check database tables and schema (sync - FastAPI runs it in a worker thread)"""
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-        
-        # Check all tables
-        cursor.execute("""
-            SELECT table_name FROM information_schema.tables 
-            WHERE table_schema = 'public'
-            ORDER BY table_name;
-        """)
+        with db_connection() as conn:
+            cursor = conn.cursor()
         
-        tables = [row[0] for row in cursor.fetchall()]
-        
-        # Check if price_history exists and get its schema
-        price_history_schema = []
-        if 'price_history' in tables:
+            # Check all tables
             cursor.execute("""
-                SELECT column_name, data_type, is_nullable 
-                FROM information_schema.columns 
-                WHERE table_name = 'price_history' 
-                ORDER BY ordinal_position;
+                SELECT table_name FROM information_schema.tables 
+                WHERE table_schema = 'public'
+                ORDER BY table_name;
             """)
-            price_history_schema = [
-                {"column": row[0], "type": row[1], "nullable": row[2]} 
-                for row in cursor.fetchall()
-            ]
         
-        conn.close()
+            tables = [row[0] for row in cursor.fetchall()]
+        
+            # Check if price_history exists and get its schema
+            price_history_schema = []
+            if 'price_history' in tables:
+                cursor.execute("""
+                    SELECT column_name, data_type, is_nullable 
+                    FROM information_schema.columns 
+                    WHERE table_name = 'price_history' 
+                    ORDER BY ordinal_position;
+                """)
+                price_history_schema = [
+                    {"column": row[0], "type": row[1], "nullable": row[2]} 
+                    for row in cursor.fetchall()
+                ]
         
         return {
             "all_tables": tables,
@@ -328,27 +397,41 @@ async def get_database_info():
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to get database info: {str(e)}")
 
+def count_trending_keywords(rows: List[Dict[str, Any]], top_n: int = 10) -> List[TrendingKeyword]:
+    """Count keyword frequencies across analysis rows and return the top_n"""
+    keyword_counts = {}
+    for row in rows:
+        if row['keywords']:
+            try:
+                keywords = json.loads(row['keywords']) if isinstance(row['keywords'], str) else row['keywords']
+                if isinstance(keywords, list):
+                    for keyword in keywords:
+                        keyword = str(keyword).strip().lower()
+                        if keyword and len(keyword) > 2:  # Filter out very short keywords
+                            keyword_counts[keyword] = keyword_counts.get(keyword, 0) + 1
+            except:
+                continue
+    
+    # Sort by frequency and return top N
+    return [
+        TrendingKeyword(keyword=keyword, frequency=count)
+        for keyword, count in sorted(keyword_counts.items(), key=lambda x: x[1], reverse=True)[:top_n]
+    ]
+
 @app.get("/api/dashboard/trending-keywords", response_model=List[TrendingKeyword])
 async def get_trending_keywords():
     """Get trending keywords from recent articles"""
     try:
-        conn = get_db_connection()
-        
         # First, get the most recent news date in the database
-        cursor = conn.cursor()
-        cursor.execute("""
+        most_recent_date = await async_db.fetchval("""
             SELECT MAX(r.published_time) 
             FROM raw_news r 
             WHERE r.analysis_status = TRUE
         """)
-        max_date_result = cursor.fetchone()
-        cursor.close()
         
-        if not max_date_result[0]:
-            conn.close()
+        if not most_recent_date:
             return []  # No analyzed news found
         
-        most_recent_date = max_date_result[0]
         # Get keywords from 7 days before the most recent news date
         seven_days_before_recent = most_recent_date - timedelta(days=7)
         
@@ -357,33 +440,11 @@ async def get_trending_keywords():
         SELECT nar.keywords
         FROM news_analysis_results nar
         JOIN raw_news r ON nar.raw_news_id = r.id
-        WHERE r.published_time >= %s AND r.analysis_status = TRUE
+        WHERE r.published_time >= $1 AND r.analysis_status = TRUE
         """
         
-        df = pd.read_sql(query, conn, params=[seven_days_before_recent])
-        conn.close()
-        
-        # Process keywords and count frequencies
-        keyword_counts = {}
-        for _, row in df.iterrows():
-            if row['keywords']:
-                try:
-                    keywords = json.loads(row['keywords']) if isinstance(row['keywords'], str) else row['keywords']
-                    if isinstance(keywords, list):
-                        for keyword in keywords:
-                            keyword = str(keyword).strip().lower()
-                            if keyword and len(keyword) > 2:  # Filter out very short keywords
-                                keyword_counts[keyword] = keyword_counts.get(keyword, 0) + 1
-                except:
-                    continue
-        
-        # Sort by frequency and return top 10
-        trending = [
-            TrendingKeyword(keyword=keyword, frequency=count)
-            for keyword, count in sorted(keyword_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        ]
-        
-        return trending
+        rows = await async_db.fetch(query, seven_days_before_recent)
+        return count_trending_keywords(rows)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch trending keywords: {str(e)}")
 
@@ -391,23 +452,16 @@ async def get_trending_keywords():
 async def get_trending_keywords_by_commodity(commodity: str):
     """Get trending keywords for a specific commodity from recent articles"""
     try:
-        conn = get_db_connection()
-        
         # First, get the most recent news date in the database
-        cursor = conn.cursor()
-        cursor.execute("""
+        most_recent_date = await async_db.fetchval("""
             SELECT MAX(r.published_time) 
             FROM raw_news r 
             WHERE r.analysis_status = TRUE
         """)
-        max_date_result = cursor.fetchone()
-        cursor.close()
         
-        if not max_date_result[0]:
-            conn.close()
+        if not most_recent_date:
             return []  # No analyzed news found
         
-        most_recent_date = max_date_result[0]
         # Get keywords from 7 days before the most recent news date
         seven_days_before_recent = most_recent_date - timedelta(days=7)
         
@@ -417,38 +471,80 @@ async def get_trending_keywords_by_commodity(commodity: str):
         FROM news_analysis_results nar
         JOIN raw_news r ON nar.raw_news_id = r.id
         JOIN commodities c ON nar.commodity_id = c.id
-        WHERE r.published_time >= %s 
+        WHERE r.published_time >= $1 
         AND r.analysis_status = TRUE
-        AND c.name = %s
+        AND c.name = $2
         """
         
-        df = pd.read_sql(query, conn, params=[seven_days_before_recent, commodity])
-        conn.close()
-        
-        # Process keywords and count frequencies
-        keyword_counts = {}
-        for _, row in df.iterrows():
-            if row['keywords']:
-                try:
-                    keywords = json.loads(row['keywords']) if isinstance(row['keywords'], str) else row['keywords']
-                    if isinstance(keywords, list):
-                        for keyword in keywords:
-                            keyword = str(keyword).strip().lower()
-                            if keyword and len(keyword) > 2:  # Filter out very short keywords
-                                keyword_counts[keyword] = keyword_counts.get(keyword, 0) + 1
-                except:
-                    continue
-        
-        # Sort by frequency and return top 10
-        trending = [
-            TrendingKeyword(keyword=keyword, frequency=count)
-            for keyword, count in sorted(keyword_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        ]
-        
-        return trending
+        rows = await async_db.fetch(query, seven_days_before_recent, commodity)
+        return count_trending_keywords(rows)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Failed to fetch trending keywords for {commodity}: {str(e)}")
 
+async def run_agent_turn(message: str, history: list, callbacks: list):
+    """
+    Answer one question within a per-request step/token budget.
+    Returns (answer text, path, budget) where path is fast_path / agent:<mode> / budget_stop:<mode>.
+    """
+    budget = create_request_budget()
+    callbacks = [*callbacks, budget]
+    with budget_scope(budget):
+        # 빠른 경로: "날짜 + 품목 + 감정점수" 질문은 ReAct 루프 없이 SQL 조회 + 답변 생성 한 번
+        if fast_path_tool is not None and match_structured_question(message):
+            answer = await answer_structured_question(message, fast_path_tool, agent_llm, callbacks=callbacks)
+            if answer is not None:
+                return answer, "fast_path", budget
+
+        # 에이전트 호출 (세션의 대화 기록을 함께 전달)
+        result = await agent_executor.ainvoke(
+            {"input": message, "chat_history": history},
+            config={"callbacks": callbacks},
+        )
+        response_text = result.get('output', '죄송합니다. 요청을 처리할 수 없습니다.')
+        if not response_text.startswith("Agent stopped"):
+            return response_text, f"agent:{AGENT_MODE}", budget
+
+        # 예산/시간 한도로 중단된 경우, 지금까지의 도구 결과로 답변을 한 번에 생성
+        print(f"[WARNING] Agent stopped by budget ({budget.exhausted_reason() or 'iterations/time'})")
+        observations = [(action.tool, str(observation)) for action, observation in result.get('intermediate_steps', [])]
+        if observations:
+            response_text = await synthesize_answer(agent_llm, message, observations, history, callbacks=callbacks)
+        else:
+            response_text = '죄송합니다. 제한된 시간 안에 답변을 완성하지 못했습니다. 질문을 조금 더 구체적으로 해주세요.'
+        return response_text, f"budget_stop:{AGENT_MODE}", budget
+
+async def answer_in_session(session, message: str, callbacks: Optional[list] = None):
+    """
+    Answer one chat turn with the shared agent and the session's own history.
+    Returns (answer text, cache hit or None). The turn is saved to the session memory either way.
+    callbacks receive agent events (tool start/end, final answer tokens) while it runs.
+    """
+    history = session.history()
+    cached, cache_key = None, None
+    # 답변 캐시는 대화 맥락이 없는 첫 질문에만 사용 ("밀은?" 같은 후속 질문은 맥락에 따라 답이 달라짐)
+    if answer_cache is not None and not history:
+        try:
+            cached, cache_key = await asyncio.get_running_loop().run_in_executor(None, answer_cache.lookup, message)
+        except Exception as cache_error:
+            print(f"[WARNING] Answer cache lookup failed: {cache_error}")
+
+    started = time.perf_counter()
+    if cached:
+        print(f"[INFO] Answer cache hit (similarity={cached['similarity']})")
+        response_text = cached['answer']
+        path_metrics.record("answer_cache", seconds=time.perf_counter() - started)
+    else:
+        response_text, path, budget = await run_agent_turn(message, history, callbacks or [])
+        elapsed = time.perf_counter() - started
+        path_metrics.record(path, budget, seconds=elapsed)
+        print(f"[INFO] Chat answered via {path} in {elapsed:.1f}s: {budget.stats()}")
+        # 정상 답변만 캐시 (예산/시간 초과로 중단된 답변은 제외)
+        if cache_key is not None and not path.startswith("budget_stop"):
+            answer_cache.store(cache_key, response_text)
+
+    session.save_turn(message, response_text)
+    return response_text, cached
+
 @app.post("/api/chat")
 async def chat_stream(request: ChatRequest):
     """Stream chat responses using Server-Sent Events"""
@@ -458,25 +554,67 @@ async def chat_stream(request: ChatRequest):
         print("[ERROR] Agent executor not initialized")
         raise HTTPException(status_code=503, detail="AI agent not initialized.")
 
+    session = session_store.get(request.session_id)
+
     async def generate_response():
         try:
-            # Start 이벤트 전송
-            yield f"data: {json.dumps({'type': 'start', 'message': ''})}\n\n"
+            # Start 이벤트 전송 (클라이언트는 이 session_id를 다음 요청에 사용)
+            yield f"data: {json.dumps({'type': 'start', 'message': '', 'session_id': session.session_id})}\n\n"
 
-            # 에이전트 호출
-            result = await agent_executor.ainvoke({"input": request.message})
-            response_text = result.get('output', '죄송합니다. 요청을 처리할 수 없습니다.')
+            # 인덱스 구축 중이면 기존 인덱스로 답변한다는 상태 이벤트를 먼저 전송
+            if vector_index is not None and vector_index.status != "ready":
+                status_message = INDEX_STATUS_MESSAGES.get(vector_index.status, INDEX_STATUS_MESSAGES["warming_up"])
+                yield f"data: {json.dumps({'type': 'status', 'status': vector_index.status, 'message': status_message})}\n\n"
 
-            # 스트리밍: 줄 단위로 나누면서 \n 보존
-            current_text = ""
-            # splitlines(True) -> 줄 끝의 '\n' 도 함께 보존합니다
-            for line in response_text.splitlines(True):
-                current_text += line
-                yield f"data: {json.dumps({'type': 'chunk', 'message': current_text})}\n\n"
-                await asyncio.sleep(0.05)
+            # 에이전트는 별도 태스크로 실행하고, 콜백이 큐에 넣는 이벤트를 그대로 스트리밍
+            handler = AgentStreamHandler()
 
-            # End 이벤트 전송
-            yield f"data: {json.dumps({'type': 'end', 'message': current_text})}\n\n"
+            async def run_turn():
+                try:
+                    # 같은 세션의 요청은 순서대로 처리 (다른 세션과는 병렬)
+                    async with session.lock:
+                        return await answer_in_session(session, request.message, callbacks=[handler])
+                finally:
+                    handler.close()
+
+            turn = asyncio.create_task(run_turn())
+            # chunk 이벤트는 새로 생성된 부분(delta)만 보내고 seq로 순서를 표시 (클라이언트가 이어붙임)
+            current_text = ""
+            seq = 0
+            try:
+                async for event in handler.events():
+                    if event['type'] == 'token':
+                        current_text += event['text']
+                        seq += 1
+                        yield f"data: {json.dumps({'type': 'chunk', 'seq': seq, 'delta': event['text']})}\n\n"
+                    else:
+                        # 도구 진행 상황 (tool_start / tool_end)
+                        if event['type'] == 'tool_start':
+                            event['message'] = f"{event['tool']} 실행 중..."
+                        yield f"data: {json.dumps(event)}\n\n"
+                response_text, cached = await turn
+            finally:
+                # 클라이언트가 연결을 끊으면 에이전트 실행도 중단
+                if not turn.done():
+                    turn.cancel()
+
+            # 캐시 응답처럼 토큰이 없었으면 답변 전체를 chunk 하나로 전송
+            if seq == 0:
+                current_text = response_text
+                seq = 1
+                yield f"data: {json.dumps({'type': 'chunk', 'seq': seq, 'delta': response_text})}\n\n"
+
+            # End 이벤트: 마지막 seq와 최종 답변의 sha256으로 클라이언트가 이어붙인 결과를 검증.
+            # 스트리밍된 텍스트가 최종 답변과 다르면(파싱 오류 재시도 등) 최종 답변 전체를 message로 함께 보냄.
+            end_event = {
+                'type': 'end',
+                'seq': seq,
+                'checksum': hashlib.sha256(response_text.encode('utf-8')).hexdigest(),
+                'cached': bool(cached),
+            }
+            if current_text != response_text:
+                end_event['message'] = response_text
+            yield f"data: {json.dumps(end_event)}\n\n"
 
         except Exception as e:
             print(f"[ERROR] Chat processing error: {e}")
@@ -492,10 +630,54 @@ async def chat_stream(request: ChatRequest):
         }
     )
 
+def require_admin_token(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """Guard for /api/admin/* routes: requires the X-Admin-Token header to match ADMIN_TOKEN (routes are disabled when it is unset)"""
+    admin_token = os.environ.get("ADMIN_TOKEN")
+    if not admin_token:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set).")
+    if not x_admin_token:
+        raise HTTPException(status_code=401, detail="Missing X-Admin-Token header.")
+    if not hmac.compare_digest(x_admin_token, admin_token):
+        raise HTTPException(status_code=403, detail="Invalid admin token.")
+
+@app.post("/api/admin/index/refresh", dependencies=[Depends(require_admin_token)])
+async def trigger_index_refresh():
+    """Trigger an immediate vector index refresh (runs in the background refresher thread)"""
+    if not index_refresher:
+        raise HTTPException(status_code=503, detail="Vector index not initialized.")
+    index_refresher.trigger()
+    return {"triggered": True, "vector_index": vector_index.status_dict()}
+
+@app.get("/api/admin/index/status", dependencies=[Depends(require_admin_token)])
+async def get_index_status():
+    """Report vector index state and indexing lag (DB rows not yet embedded)"""
+    if not index_refresher:
+        raise HTTPException(status_code=503, detail="Vector index not initialized.")
+    try:
+        lag = await asyncio.get_running_loop().run_in_executor(None, index_refresher.lag)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to compute indexing lag: {str(e)}")
+    return {
+        "vector_index": vector_index.status_dict(),
+        "refresher": index_refresher.status_dict(),
+        "lag": lag,
+    }
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "timestamp": datetime.now()}
+    return {
+        "status": "healthy",
+        "timestamp": datetime.now(),
+        "agent_ready": agent_executor is not None,
+        "vector_index": vector_index.status_dict() if vector_index else {"status": "disabled"},
+        "answer_cache": answer_cache.stats() if answer_cache else {"status": "disabled"},
+        "db_pool": pool_stats(),
+        "async_db_pool": async_db.stats(),
+        "tool_executor": tool_executor.stats(),
+        "chat_sessions": session_store.stats(),
+        "chat_paths": path_metrics.stats(),
+    }
 
 
 #직접 실행 시 작동되는지 테스트용
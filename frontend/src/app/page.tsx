@@ -91,6 +91,14 @@ interface ChatMessage {
 
 
 // Utility Functions
+// Hex sha256 of a UTF-8 string (used to verify streamed chat answers against the server checksum)
+const sha256Hex = async (text: string): Promise<string> => {
+  const digest = await crypto.subtle.digest('SHA-256', new TextEncoder().encode(text));
+  return Array.from(new Uint8Array(digest))
+    .map(b => b.toString(16).padStart(2, '0'))
+    .join('');
+};
+
 const getSentimentLevel = (score: number): string => {
   if (score >= 60) return 'Positive';
   if (score <= 40) return 'Negative';
@@ -209,6 +217,8 @@ export default function AgriCommoditiesDashboard() {
   const [error, setError] = useState<string | null>(null);
   
   const chatEndRef = useRef<HTMLDivElement>(null);
+  // Server-issued chat session id (keeps conversation memory per browser tab)
+  const chatSessionIdRef = useRef<string | null>(null);
 
   // API Functions
   const fetchSentimentCards = async () => {
@@ -303,7 +313,7 @@ export default function AgriCommoditiesDashboard() {
         headers: {
           'Content-Type': 'application/json',
         },
-        body: JSON.stringify({ message: userMessage.message }),
+        body: JSON.stringify({ message: userMessage.message, session_id: chatSessionIdRef.current }),
         signal: controller.signal, // Add abort signal
       });
 
@@ -326,6 +336,22 @@ export default function AgriCommoditiesDashboard() {
 
       setChatMessages(prev => [...prev, botMessage]);
 
+      const updateBotMessage = (content: string) => {
+        setChatMessages(prev =>
+          prev.map(msg =>
+            msg.id === botMessage.id
+              ? { ...msg, message: content }
+              : msg
+          )
+        );
+      };
+
+      // Chunks carry only the new text (delta) with a sequence number; the end event
+      // carries the last seq and a sha256 of the full answer to verify what was appended.
+      const decoder = new TextDecoder();
+      let buffer = '';
+      let lastSeq = 0;
+
       try {
         while (true) {
           // Check if request was aborted
@@ -336,22 +362,39 @@ export default function AgriCommoditiesDashboard() {
           const { done, value } = await reader.read();
           if (done) break;
 
-          const chunk = new TextDecoder().decode(value);
-          const lines = chunk.split('\n');
+          // stream: true keeps multi-byte characters split across reads intact;
+          // the last (possibly partial) line stays in the buffer until the next read
+          buffer += decoder.decode(value, { stream: true });
+          const lines = buffer.split('\n');
+          buffer = lines.pop() ?? '';
 
           for (const line of lines) {
             if (line.startsWith('data: ')) {
               try {
                 const data = JSON.parse(line.slice(6));
-                if (data.type === 'chunk' || data.type === 'end') {
-                  botMessageContent = data.message;
-                  setChatMessages(prev =>
-                    prev.map(msg =>
-                      msg.id === botMessage.id
-                        ? { ...msg, message: botMessageContent }
-                        : msg
-                    )
-                  );
+                if (data.type === 'start' && data.session_id) {
+                  chatSessionIdRef.current = data.session_id;
+                }
+                if (data.type === 'tool_start' && !botMessageContent) {
+                  // Show which tool the agent is running until answer tokens arrive
+                  updateBotMessage(`🔧 ${data.message}`);
+                }
+                if (data.type === 'chunk') {
+                  if (data.seq !== lastSeq + 1) {
+                    console.warn(`Chat stream out of order: expected seq ${lastSeq + 1}, got ${data.seq}`);
+                  }
+                  lastSeq = data.seq;
+                  botMessageContent += data.delta;
+                  updateBotMessage(botMessageContent);
+                }
+                if (data.type === 'end') {
+                  if (typeof data.message === 'string') {
+                    // Server sent the full answer because the streamed text differed from it
+                    botMessageContent = data.message;
+                    updateBotMessage(botMessageContent);
+                  } else if (data.seq !== lastSeq || (await sha256Hex(botMessageContent)) !== data.checksum) {
+                    console.warn('Chat stream checksum mismatch; the displayed answer may be incomplete');
+                  }
                 }
               } catch (e) {
                 console.error('Error parsing SSE data:', e);
@@ -789,7 +789,8 @@ def fetch_news_to_analyze(cur, limit=5):
         list: (id, title, content) 튜플의 리스트
     """
     #DB 스키마대로! 
-    cur.execute("SELECT id, title, content FROM raw_news WHERE analysis_status = FALSE LIMIT %s;", (limit,))
+    # 미분석 뉴스 부분 인덱스(idx_raw_news_unanalyzed, app/db_migrations.py)를 id 순서로 읽음
+    cur.execute("SELECT id, title, content FROM raw_news WHERE analysis_status = FALSE ORDER BY id LIMIT %s;", (limit,))
     return cur.fetchall()
 
 def create_few_shot_prompt(commodity_name):
@@ -11,6 +11,10 @@ from langchain_core.output_parsers import JsonOutputParser
 import psycopg2
 from psycopg2 import pool
 
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.db_migrations import published_bound_sql, published_date_sql, published_time_is_timestamptz
+
 # --- 1. 초기 설정: 로깅, 환경 변수, LLM, DB 커넥션 풀 ---
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 load_dotenv()
@@ -39,8 +43,12 @@ except psycopg2.OperationalError as e:
     sys.exit(1)
 
 # --- 2. 일일 요약 생성 함수 ---
-def generate_summary_for_day(cur, conn, target_date, target_commodity_id, target_commodity_name):
-    """지정된 날짜와 품목에 대한 일일 종합 리포트를 생성하고 DB에 저장합니다."""
+def generate_summary_for_day(cur, conn, target_date, target_commodity_id, target_commodity_name, timestamptz=False):
+    """
+    지정된 날짜와 품목에 대한 일일 종합 리포트를 생성하고 DB에 저장합니다.
+    timestamptz: raw_news.published_time이 timestamptz이면 날짜를 UTC 기준으로 해석합니다. (작업 찾기 쿼리와 같은 기준)
+    """
+    published_range = f"r.published_time >= {published_bound_sql(timestamptz)} AND r.published_time < {published_bound_sql(timestamptz)}"
     
     logging.info(f"--- {target_commodity_name} ({target_date}) 일일 요약 생성 시작 ---")
     
@@ -53,22 +61,23 @@ def generate_summary_for_day(cur, conn, target_date, target_commodity_id, target
         start_date = target_date - timedelta(days=2)
         end_date = target_date
         logging.info(f"월요일이므로 {start_date}부터 {end_date}까지 3일치 뉴스를 집계합니다.")
-        fetch_query = """
+        fetch_query = f"""
         SELECT nar.sentiment_score, nar.reasoning, nar.keywords
         FROM news_analysis_results AS nar
         JOIN raw_news AS r ON nar.raw_news_id = r.id
-        WHERE nar.commodity_id = %s AND r.published_time::date BETWEEN %s AND %s;
+        WHERE nar.commodity_id = %s AND {published_range};
         """
-        params = (target_commodity_id, start_date, end_date)
+        # published_time에 인덱스를 쓸 수 있도록 범위 조건으로 조회 (end_date 다음 날 0시 미만)
+        params = (target_commodity_id, start_date, end_date + timedelta(days=1))
     else:
         # 월요일이 아닐 경우, 해당 날짜의 데이터만 조회
-        fetch_query = """
+        fetch_query = f"""
         SELECT nar.sentiment_score, nar.reasoning, nar.keywords
         FROM news_analysis_results AS nar
         JOIN raw_news AS r ON nar.raw_news_id = r.id
-        WHERE nar.commodity_id = %s AND r.published_time::date = %s;
+        WHERE nar.commodity_id = %s AND {published_range};
         """
-        params = (target_commodity_id, target_date)
+        params = (target_commodity_id, target_date, target_date + timedelta(days=1))
 
     cur.execute(fetch_query, params)
     results = cur.fetchall()
@@ -154,15 +163,23 @@ def main():
 
         # 요약할 작업을 찾을 때 토요일(6)과 일요일(7)을 제외하도록 수정
         # PostgreSQL의 EXTRACT(ISODOW FROM date)는 월요일=1, ..., 일요일=7을 반환합니다.
-        find_jobs_query = """
-        SELECT DISTINCT r.published_time::date AS date, nar.commodity_id, c.name AS commodity_name
-        FROM news_analysis_results nar
-        JOIN raw_news r ON nar.raw_news_id = r.id
-        JOIN commodities c ON nar.commodity_id = c.id
-        LEFT JOIN daily_market_summary dms ON r.published_time::date = dms.date AND nar.commodity_id = dms.commodity_id
-        WHERE r.analysis_status = TRUE 
-          AND dms.id IS NULL
-          AND EXTRACT(ISODOW FROM r.published_time::date) NOT IN (6, 7);
+        # 날짜 묶음은 식 인덱스(app/db_migrations.py)와 같은 식을 사용합니다. (timestamptz면 UTC 기준 날짜)
+        timestamptz = published_time_is_timestamptz(cur)
+        # 이미 요약이 있는지는 NOT EXISTS로 확인해 daily_market_summary (commodity_id, date) 인덱스를 사용합니다.
+        find_jobs_query = f"""
+        SELECT jobs.date, jobs.commodity_id, c.name AS commodity_name
+        FROM (
+            SELECT DISTINCT {published_date_sql(timestamptz)} AS date, nar.commodity_id
+            FROM news_analysis_results nar
+            JOIN raw_news r ON nar.raw_news_id = r.id
+            WHERE r.analysis_status = TRUE
+        ) jobs
+        JOIN commodities c ON jobs.commodity_id = c.id
+        WHERE EXTRACT(ISODOW FROM jobs.date) NOT IN (6, 7)
+          AND NOT EXISTS (
+              SELECT 1 FROM daily_market_summary dms
+              WHERE dms.commodity_id = jobs.commodity_id AND dms.date = jobs.date
+          );
         """
         cur.execute(find_jobs_query)
         jobs_to_do = cur.fetchall()
@@ -177,7 +194,7 @@ def main():
         for job in jobs_to_do:
             target_date, target_commodity_id, target_commodity_name = job
             if target_date and target_commodity_id:
-                generate_summary_for_day(cur, conn, target_date, target_commodity_id, target_commodity_name)
+                generate_summary_for_day(cur, conn, target_date, target_commodity_id, target_commodity_name, timestamptz)
 
     except (Exception, psycopg2.Error) as error:
         logging.error(f"일일 요약 생성 중 에러 발생: {error}", exc_info=True)
@@ -0,0 +1,49 @@
+# DB 인덱스 마이그레이션 스크립트
+# - 자주 실행되는 조회용 권장 인덱스를 (없으면) CONCURRENTLY로 생성하고 통계를 갱신합니다. (app/db_migrations.py)
+# - --check: 인덱스를 만들지 않고 대표 조회의 EXPLAIN 계획에 인덱스가 쓰이는지만 확인합니다.
+# 사용법: python scripts/migrate_db.py [--check]
+import os
+import sys
+import argparse
+import logging
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from app.db_migrations import apply_migrations, connect, explain_check, published_date_sql, published_time_is_timestamptz
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="DB 인덱스 마이그레이션")
+    parser.add_argument("--check", action="store_true", help="인덱스를 만들지 않고 EXPLAIN 점검만 실행")
+    args = parser.parse_args()
+
+    conn = connect()
+    try:
+        with conn.cursor() as cur:
+            timestamptz = published_time_is_timestamptz(cur)
+        logging.info(f"raw_news.published_time 날짜 식: {published_date_sql(timestamptz)}"
+                     f"{' (timestamptz이므로 UTC 기준 날짜)' if timestamptz else ''}")
+        if not args.check:
+            for name in apply_migrations(conn):
+                logging.info(f"인덱스 확인/생성 완료: {name}")
+
+        report = explain_check(conn)
+        for item in report:
+            status = "OK" if item["ok"] else "MISSING"
+            logging.info(f"[{status}] {item['check']} -> {item['index']} | 계획: {', '.join(item['scans'])}")
+    finally:
+        conn.close()
+
+    if not all(item["ok"] for item in report):
+        logging.error("일부 조회가 기대한 인덱스를 사용하지 않습니다. (python scripts/migrate_db.py 로 인덱스를 먼저 생성하세요)")
+        sys.exit(1)
+    logging.info("모든 대표 조회가 인덱스를 사용합니다.")
+
+
+if __name__ == '__main__':
+    main()
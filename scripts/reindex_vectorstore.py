@@ -0,0 +1,49 @@
+# Chroma 벡터스토어 재색인 스크립트
+# - PostgreSQL에서 문서를 다시 읽어 벡터스토어를 (선택적으로 비운 뒤) 다시 구축합니다.
+# - 임베딩 캐시(EMBEDDING_CACHE_DIR)를 먼저 확인하므로, 텍스트가 바뀌지 않은 chunk는 API를 호출하지 않습니다.
+# 사용법: python scripts/reindex_vectorstore.py [--wipe] [--variant full|compact]
+import os
+import sys
+import shutil
+import argparse
+import logging
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dotenv import load_dotenv
+
+from app.data_loader import get_documents_from_postgres, get_index_variant, INDEX_VARIANTS
+from app.vector_index import index_documents
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+load_dotenv()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Chroma 벡터스토어 재색인")
+    parser.add_argument("--wipe", action="store_true", help="기존 벡터스토어를 삭제하고 처음부터 다시 구축")
+    parser.add_argument("--variant", choices=INDEX_VARIANTS, default=None,
+                        help="기사 문서 구성 방식 (기본값: 환경변수 RAG_INDEX_VARIANT)")
+    args = parser.parse_args()
+    variant = args.variant or get_index_variant()
+
+    if not os.environ.get("OPENAI_API_KEY"):
+        logging.error("OPENAI_API_KEY 환경변수가 설정되지 않았습니다.")
+        sys.exit(1)
+
+    persist_dir = os.environ.get("CHROMA_PERSIST_DIR", "./chroma_db")
+    if args.wipe and os.path.exists(persist_dir):
+        logging.info(f"기존 벡터스토어({persist_dir})를 삭제합니다.")
+        shutil.rmtree(persist_dir)
+
+    documents = get_documents_from_postgres(variant=variant)
+    if not documents:
+        logging.error("DB에서 문서를 불러오지 못했습니다. 재색인을 중단합니다.")
+        sys.exit(1)
+
+    index_documents(documents, persist_dir, variant=variant)
+    logging.info("재색인이 완료되었습니다.")
+
+
+if __name__ == '__main__':
+    main()
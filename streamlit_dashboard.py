@@ -12,6 +12,7 @@ import plotly.express as px
 from datetime import datetime
 import time
 import json
+import hashlib
 from typing import List, Dict, Any, Optional
 import asyncio
 
@@ -31,6 +32,8 @@ if 'selected_commodity' not in st.session_state:
     st.session_state.selected_commodity = None
 if 'chat_messages' not in st.session_state:
     st.session_state.chat_messages = []
+if 'chat_session_id' not in st.session_state:
+    st.session_state.chat_session_id = None
 if 'auto_refresh' not in st.session_state:
     st.session_state.auto_refresh = False
 
@@ -217,10 +220,12 @@ def send_chat_message(message: str):
     try:
         response = requests.post(
             f"{API_BASE_URL}/api/chat",
-            json={"message": message},
+            json={"message": message, "session_id": st.session_state.chat_session_id},
             stream=True
         )
         response.raise_for_status()
+        # SSE 응답에는 charset이 없어 requests가 latin-1로 디코딩하므로 UTF-8로 지정
+        response.encoding = 'utf-8'
         return response
     except Exception as e:
         st.error(f"채팅 오류: {str(e)}")
@@ -567,7 +572,10 @@ def render_chatbot():
             response = send_chat_message(user_input)
             if response:
                 # 스트리밍 응답 처리
+                # chunk 이벤트는 새 텍스트(delta)만 담고 있으므로 seq 순서대로 이어붙이고,
+                # end 이벤트의 checksum(sha256)으로 최종 결과를 검증
                 full_response = ""
+                last_seq = 0
                 response_placeholder = st.empty()
                 
                 try:
@@ -575,8 +583,23 @@ def render_chatbot():
                         if line.startswith('data: '):
                             try:
                                 data = json.loads(line[6:])
+                                if data.get('type') == 'start' and data.get('session_id'):
+                                    # 서버가 발급한 세션 ID를 저장해 후속 질문에 대화 맥락 유지
+                                    st.session_state.chat_session_id = data['session_id']
+                                if data.get('type') == 'tool_start' and not full_response:
+                                    # 답변 토큰이 오기 전까지 실행 중인 도구 표시
+                                    response_placeholder.caption(f"🔧 {data.get('message', '')}")
+                                if data.get('type') == 'chunk':
+                                    last_seq = data.get('seq', last_seq + 1)
+                                    full_response += data.get('delta', '')
+                                elif data.get('type') == 'end':
+                                    if 'message' in data:
+                                        # 스트리밍된 텍스트가 최종 답변과 달라 서버가 전체 답변을 보낸 경우
+                                        full_response = data['message']
+                                    elif (data.get('seq') != last_seq or
+                                          hashlib.sha256(full_response.encode('utf-8')).hexdigest() != data.get('checksum')):
+                                        st.warning("응답 일부가 누락되었을 수 있습니다.")
                                 if data.get('type') in ['chunk', 'end']:
-                                    full_response = data.get('message', '')
                                     with response_placeholder.container():
                                         with st.chat_message("assistant"):
                                             st.write(full_response)
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# 프로젝트 루트의 app 패키지를 import 할 수 있도록 경로 추가 (scripts/와 동일한 방식)
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,27 @@
+import asyncio
+import threading
+
+from langchain.agents import Tool
+
+from app.agent_budget import REPEATED_CALL_NOTICE, RequestBudget, budget_scope, memoize_tools
+
+
+def test_async_call_of_sync_tool_runs_off_the_event_loop():
+    calls = []
+
+    def func(tool_input: str) -> str:
+        calls.append(threading.get_ident())
+        return f"result:{tool_input}"
+
+    tool = memoize_tools([Tool(name="sync", description="sync only", func=func)])[0]
+
+    async def main():
+        with budget_scope(RequestBudget()):
+            first = await tool.coroutine("corn")
+            second = await tool.coroutine("corn")
+        return threading.get_ident(), first, second
+
+    loop_thread, first, second = asyncio.run(main())
+    assert first == "result:corn"
+    assert second == f"{REPEATED_CALL_NOTICE}\nresult:corn"
+    assert len(calls) == 1 and calls[0] != loop_thread
@@ -0,0 +1,79 @@
+from datetime import date, timedelta
+from typing import List
+
+from langchain_core.embeddings import Embeddings
+
+from app.answer_cache import SemanticAnswerCache
+
+
+class TableEmbeddings(Embeddings):
+    """질의별로 정해 둔 벡터를 돌려주는 테스트용 임베딩 (없는 질의는 모두 같은 벡터)"""
+
+    def __init__(self, table=None):
+        self.table = table or {}
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return [self.embed_query(t) for t in texts]
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.table.get(text, [1.0, 0.0, 0.0])
+
+
+def _cache(embeddings=None, version=None):
+    version = version if version is not None else ["2025-07-10"]
+    return SemanticAnswerCache(embeddings or TableEmbeddings(), lambda: version[0], version_ttl_seconds=0), version
+
+
+def _ask(cache, query, answer=None):
+    hit, key = cache.lookup(query)
+    if hit is None and answer is not None:
+        cache.store(key, answer)
+    return hit
+
+
+def test_hit_for_same_entities_and_version():
+    cache, _ = _cache()
+    _ask(cache, "2025년 7월 10일 옥수수 감정점수", "옥수수 72점")
+    hit = _ask(cache, "2025년 7월 10일 옥수수 감정점수는?")
+    assert hit["answer"] == "옥수수 72점" and hit["similarity"] == 1.0
+
+
+def test_different_date_or_commodity_never_matches_even_when_identical_embedding():
+    cache, _ = _cache()
+    _ask(cache, "2025년 7월 10일 옥수수 감정점수", "옥수수 7/10")
+    assert _ask(cache, "2025년 7월 11일 옥수수 감정점수") is None
+    assert _ask(cache, "2025년 7월 10일 대두 감정점수") is None
+    assert _ask(cache, "2025년 7월 10일 대두박 감정점수") is None
+    assert cache.stats()["hits"] == 0
+
+
+def test_data_version_change_misses_and_invalidate_clears():
+    cache, version = _cache()
+    _ask(cache, "옥수수 시장 어때?", "답변")
+    version[0] = "2025-07-11"
+    assert _ask(cache, "옥수수 시장 어때?") is None
+    version[0] = "2025-07-10"
+    assert _ask(cache, "옥수수 시장 어때?") is not None
+    cache.invalidate()
+    assert cache.stats()["entries"] == 0
+
+
+def test_threshold_rejects_dissimilar_questions():
+    embeddings = TableEmbeddings({"옥수수 시장 어때?": [1.0, 0.0, 0.0], "옥수수 재고는?": [0.6, 0.8, 0.0]})
+    cache, _ = _cache(embeddings)
+    _ask(cache, "옥수수 시장 어때?", "답변")
+    assert _ask(cache, "옥수수 재고는?") is None
+
+
+def test_relative_period_is_not_reused_after_midnight(monkeypatch):
+    cache, _ = _cache()
+    _ask(cache, "최근 옥수수 동향", "최근 답변")
+    assert _ask(cache, "최근 옥수수 동향") is not None
+
+    class Tomorrow(date):
+        @classmethod
+        def today(cls):
+            return date.today() + timedelta(days=1)
+
+    monkeypatch.setattr("app.answer_cache.date", Tomorrow)
+    assert _ask(cache, "최근 옥수수 동향") is None
@@ -0,0 +1,65 @@
+from langchain_core.documents import Document
+
+from app.bm25_index import BM25Index, matches_where, reciprocal_rank_fusion, tokenize
+
+
+def _index(tmp_path):
+    index = BM25Index(str(tmp_path / "bm25.sqlite3"))
+    index.upsert(
+        ["corn", "wheat", "soy"],
+        [
+            Document(page_content="WASDE 옥수수 재고 전망", metadata={"commodity": "Corn", "date_int": 20250710}),
+            Document(page_content="러시아 밀 수출 전망", metadata={"commodity": "Wheat", "date_int": 20250711}),
+            Document(page_content="SMN25 대두박 선물", metadata={"commodity": "Soybean Meal", "date_int": 20250712}),
+        ],
+    )
+    return index
+
+
+def test_tokenize_lowercases_and_adds_korean_bigrams():
+    assert tokenize("SMN25 WASDE") == ["smn25", "wasde"]
+    assert tokenize("옥수수의") == ["옥수수의", "옥수", "수수", "수의"]
+
+
+def test_search_ranks_keyword_matches_and_applies_where(tmp_path):
+    index = _index(tmp_path)
+    assert index.search("smn25")[0][0] == "soy"
+    assert [cid for cid, _ in index.search("전망")] and index.search("wasde")[0][0] == "corn"
+    assert [cid for cid, _ in index.search("전망", where={"commodity": {"$eq": "Wheat"}})] == ["wheat"]
+    assert index.search("없는단어") == []
+
+
+def test_delete_and_reload_from_sqlite(tmp_path):
+    index = _index(tmp_path)
+    index.delete(["corn"])
+    assert "corn" not in index and len(index) == 2
+    assert index.search("wasde") == []
+
+    reloaded = BM25Index(str(tmp_path / "bm25.sqlite3"))
+    reloaded.load()
+    assert len(reloaded) == 2 and "corn" not in reloaded
+    assert reloaded.search("smn25")[0][0] == "soy"
+
+
+def test_upsert_replaces_existing_chunk(tmp_path):
+    index = _index(tmp_path)
+    index.upsert(["corn"], [Document(page_content="브라질 옥수수 작황", metadata={"commodity": "Corn"})])
+    assert len(index) == 3
+    assert index.search("wasde") == []
+    assert index.search("작황")[0][0] == "corn"
+
+
+def test_matches_where_operators():
+    meta = {"commodity": "Corn", "date_int": 20250710}
+    assert matches_where(meta, None)
+    assert matches_where(meta, {"$and": [{"date_int": {"$gte": 20250701}}, {"date_int": {"$lte": 20250731}}]})
+    assert not matches_where(meta, {"commodity": {"$in": ["Wheat", "Soybean"]}})
+    assert matches_where(meta, {"$or": [{"commodity": "Wheat"}, {"commodity": "Corn"}]})
+    assert not matches_where(meta, {"impact": {"$gte": 10}})
+
+
+def test_reciprocal_rank_fusion_rewards_items_in_both_lists():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d"]], k=60)
+    assert fused[0][0] == "b"
+    assert {item for item, _ in fused} == {"a", "b", "c", "d"}
+    assert abs(dict(fused)["a"] - 1 / 61) < 1e-12
@@ -0,0 +1,93 @@
+import multiprocessing
+
+import pytest
+
+from app.embedding_cache import EmbeddingCache, QueryEmbeddingCache, normalize_query
+
+WRITERS = 8
+BATCHES = 200
+DIM = 512
+
+
+def test_put_get_round_trip(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "test-model")
+    cache.put_many(["a", "b"], [[1.0, 2.0], [3.0, 4.0]])
+    assert cache.get_many(["b", "missing", "a"]) == [[3.0, 4.0], None, [1.0, 2.0]]
+
+    reopened = EmbeddingCache(str(tmp_path), "test-model")
+    assert reopened.dim == 2
+    assert reopened.get_many(["a"]) == [[1.0, 2.0]]
+    assert reopened.stats()["cached_vectors"] == 2
+
+
+def test_models_are_separate_and_dimension_is_checked(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "model-a")
+    cache.put_many(["a"], [[1.0, 2.0]])
+    assert EmbeddingCache(str(tmp_path), "model-b").get_many(["a"]) == [None]
+    with pytest.raises(ValueError):
+        cache.put_many(["b"], [[1.0, 2.0, 3.0]])
+
+
+def test_reader_opened_before_first_write_sees_other_writers(tmp_path):
+    reader = EmbeddingCache(str(tmp_path), "test-model")
+    assert reader.dim is None and reader.get_many(["a"]) == [None]
+    EmbeddingCache(str(tmp_path), "test-model").put_many(["a"], [[1.0, 2.0]])
+    assert reader.get_many(["a", "b"]) == [[1.0, 2.0], None]
+    reader.put_many(["b"], [[3.0, 4.0]])
+    assert reader.get_many(["b"]) == [[3.0, 4.0]]
+
+
+def test_partial_row_left_by_crash_is_overwritten(tmp_path):
+    cache = EmbeddingCache(str(tmp_path), "test-model")
+    cache.put_many(["a"], [[1.0, 2.0]])
+    with open(cache._vec_path, "ab") as f:
+        f.write(b"\x00" * 5)  # append 도중 중단되어 남은 불완전한 행
+    cache.put_many(["b", "c"], [[3.0, 4.0], [5.0, 6.0]])
+    reopened = EmbeddingCache(str(tmp_path), "test-model")
+    assert reopened.get_many(["a", "b", "c"]) == [[1.0, 2.0], [3.0, 4.0], [5.0, 6.0]]
+
+
+def _write_batches(cache_dir: str, writer: int) -> None:
+    cache = EmbeddingCache(cache_dir, "test-model")
+    for batch in range(BATCHES):
+        texts = [f"{writer}-{batch}-{i}" for i in range(3)]
+        cache.put_many(texts, [_vector(writer, batch, i) for i in range(3)])
+
+
+def _vector(writer: int, batch: int, i: int) -> list:
+    return [float(writer), float(batch), float(i)] + [0.0] * (DIM - 3)
+
+
+@pytest.mark.skipif("fork" not in multiprocessing.get_all_start_methods(), reason="fork 필요")
+def test_concurrent_writers_keep_rows_and_keys_aligned(tmp_path):
+    # 재색인 스크립트와 백엔드가 같은 캐시 파일에 동시에 append 하는 상황
+    EmbeddingCache(str(tmp_path), "test-model").put_many(["seed"], [[0.0] * DIM])
+    context = multiprocessing.get_context("fork")
+    workers = [context.Process(target=_write_batches, args=(str(tmp_path), w)) for w in range(WRITERS)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+        assert worker.exitcode == 0
+
+    cache = EmbeddingCache(str(tmp_path), "test-model")
+    texts = [f"{w}-{b}-{i}" for w in range(WRITERS) for b in range(BATCHES) for i in range(3)]
+    expected = [_vector(w, b, i) for w in range(WRITERS) for b in range(BATCHES) for i in range(3)]
+    assert cache.get_many(texts) == expected
+
+
+def test_query_cache_normalizes_and_expires(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.embedding_cache.time.monotonic", lambda: clock[0])
+    cache = QueryEmbeddingCache(max_size=2, ttl_seconds=10)
+    assert normalize_query("  옥수수   가격?  ") == "옥수수 가격?"
+    cache.put("Corn  Price", [1.0])
+    assert cache.get("corn price") == [1.0]
+
+    cache.put("b", [2.0])
+    cache.put("c", [3.0])
+    assert cache.get("corn price") is None  # LRU로 밀려남
+
+    clock[0] += 11
+    assert cache.get("c") is None  # TTL 만료
+    assert cache.stats()["hits"] == 1
@@ -0,0 +1,64 @@
+from langchain_core.documents import Document
+
+from app.index_manifest import IndexManifest, document_fingerprint, make_chunk_id
+
+
+def test_make_chunk_id_is_deterministic_per_document_and_chunk():
+    article = {"type": "article_analysis", "news_id": 7, "commodity": "Corn"}
+    assert make_chunk_id(article, 0) == make_chunk_id(dict(article), 0)
+    assert make_chunk_id(article, 0) != make_chunk_id(article, 1)
+    assert make_chunk_id(article, 0) != make_chunk_id({**article, "commodity": "Wheat"}, 0)
+    summary = {"type": "daily_summary", "date": "2025-07-10", "commodity": "Corn"}
+    assert make_chunk_id(summary, 0) != make_chunk_id(article, 0)
+
+
+def test_make_chunk_id_requires_identifying_metadata():
+    assert make_chunk_id({"type": "article_analysis"}, 0) is None
+    assert make_chunk_id({"type": "daily_summary", "date": "2025-07-10"}, 0) is None
+    assert make_chunk_id({"source": "x"}, 0) is None
+
+
+def test_manifest_record_lookup_delete_and_meta(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.sqlite3"), collection="test")
+    manifest.record(["a", "b", "c"], ["fa", "fb", "fc"])
+    assert manifest.count() == 3
+    assert manifest.lookup(["a", "x"]) == {"a": "fa"}
+    manifest.record(["a"], ["fa2"])
+    assert manifest.lookup(["a"]) == {"a": "fa2"} and manifest.count() == 3
+
+    manifest.delete(["a", "b"])
+    assert manifest.count() == 1
+    manifest.set_meta("metadata_version", "3")
+    assert manifest.get_meta("metadata_version") == "3"
+    assert manifest.get_meta("missing") is None
+
+
+def test_manifest_lookup_batches_large_id_lists(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.sqlite3"))
+    ids = [f"id{i}" for i in range(IndexManifest.LOOKUP_BATCH_SIZE * 2 + 1)]
+    manifest.record(ids, ids)
+    assert len(manifest.lookup(ids)) == len(ids)
+
+
+def test_manifest_collections_are_isolated(tmp_path):
+    path = str(tmp_path / "manifest.sqlite3")
+    full, compact = IndexManifest(path, "default"), IndexManifest(path, "compact")
+    full.record(["a"], ["t:m"])
+    assert compact.count() == 0 and compact.lookup(["a"]) == {}
+
+
+def test_fingerprint_separates_text_and_metadata():
+    doc = Document(page_content="본문", metadata={"type": "daily_summary", "v": 1})
+    fp = document_fingerprint(doc)
+    meta_changed = document_fingerprint(Document(page_content="본문", metadata={"type": "daily_summary", "v": 2}))
+    text_changed = document_fingerprint(Document(page_content="다른 본문", metadata={"type": "daily_summary", "v": 1}))
+    assert fp.split(":")[0] == meta_changed.split(":")[0] and fp != meta_changed
+    assert fp.split(":")[0] != text_changed.split(":")[0]
+
+
+def test_manifest_changes_split_embedding_from_metadata_updates(tmp_path):
+    manifest = IndexManifest(str(tmp_path / "manifest.sqlite3"))
+    manifest.record(["a", "b", "c"], ["t1:m1", "t2:m2", "t3:m3"])
+    embed, metadata_only = manifest.changes(["a", "b", "c", "d"], ["t1:m1", "t2:mX", "tX:m3", "t4:m4"])
+    assert embed == [2, 3]         # 본문 변경(c), 신규(d)
+    assert metadata_only == [1]    # 메타데이터만 변경(b)
@@ -0,0 +1,24 @@
+from app.queries import INTENTS, STATEMENTS, classify_intent, statement_name
+
+
+def test_classify_intent():
+    assert classify_intent({"dates": ["2025-07-10"], "date_range": "recent"}) == "dated"
+    assert classify_intent({"dates": [], "date_range": "recent"}) == "recent"
+    assert classify_intent({"dates": []}) == "latest"
+
+
+def test_one_statement_per_intent_with_sargable_news_dates():
+    assert set(STATEMENTS) == {statement_name(intent, tz) for intent in INTENTS for tz in (False, True)}
+    for sql in STATEMENTS.values():
+        assert "DATE(r.published_time)" not in sql
+        assert "r.published_time::date =" not in sql
+    assert "r.published_time >= $2 AND r.published_time < ($2 + 1)" in STATEMENTS["market_context_dated"]
+
+
+def test_timestamptz_statements_use_utc_day_bounds():
+    dated = STATEMENTS[statement_name("dated", True)]
+    assert ("r.published_time >= ($2::timestamp AT TIME ZONE 'UTC') "
+            "AND r.published_time < (($2 + 1)::timestamp AT TIME ZONE 'UTC')") in dated
+    recent = STATEMENTS[statement_name("recent", True)]
+    assert "MAX((r2.published_time AT TIME ZONE 'UTC')::date)" in recent
+    assert "CURRENT_DATE - 7)::timestamp AT TIME ZONE 'UTC')" in recent
@@ -0,0 +1,26 @@
+from datetime import datetime, timedelta
+
+from app.query_parser import find_commodities, parse_query_details
+
+
+def test_longer_commodity_names_win_over_prefixes():
+    assert parse_query_details("대두박 가격 알려줘")["commodity_name"] == "Soybean Meal"
+    assert parse_query_details("대두유 감정점수")["commodity_name"] == "Soybean Oil"
+    assert parse_query_details("soybean meal news")["commodity_name"] == "Soybean Meal"
+    assert parse_query_details("Soybean Oil price")["commodity_name"] == "Soybean Oil"
+    assert parse_query_details("대두 감정점수")["commodity_name"] == "Soybean"
+    assert parse_query_details("팜유 시황")["commodity_name"] == "Palm Oil"
+
+
+def test_dates_are_resolved_to_absolute_values():
+    today = datetime.now()
+    assert parse_query_details("2025년 7월 10일 옥수수")["dates"] == ["2025-07-10"]
+    assert parse_query_details("어제 밀 가격")["dates"] == [(today - timedelta(days=1)).strftime("%Y-%m-%d")]
+    assert parse_query_details("최근 옥수수 뉴스").get("date_range") == "recent"
+
+
+def test_find_commodities_does_not_double_count_prefixes():
+    assert find_commodities("대두박과 대두유 비교") == ["Soybean Meal", "Soybean Oil"]
+    assert find_commodities("soybean meal vs soybean") == ["Soybean Meal", "Soybean"]
+    assert find_commodities("옥수수와 corn") == ["Corn"]
+    assert find_commodities("오늘 시장 어때?") == []
@@ -0,0 +1,34 @@
+from langchain_core.documents import Document
+
+from app.retrieval import build_filter_conditions, format_snippets
+
+
+def test_commodity_filter_uses_full_commodity_name():
+    assert build_filter_conditions("대두박 뉴스")["commodity"] == {"commodity": {"$eq": "Soybean Meal"}}
+    assert build_filter_conditions("대두유 시황")["commodity"] == {"commodity": {"$eq": "Soybean Oil"}}
+    assert "commodity" not in build_filter_conditions("시장 뉴스 알려줘")
+
+
+def test_type_filter_only_when_one_kind_is_hinted():
+    assert build_filter_conditions("옥수수 뉴스")["type"] == {"type": {"$eq": "article_analysis"}}
+    assert build_filter_conditions("옥수수 일일 요약")["type"] == {"type": {"$eq": "daily_summary"}}
+    assert "type" not in build_filter_conditions("옥수수 뉴스 요약")
+
+
+def test_date_filters():
+    assert build_filter_conditions("2025년 7월 10일 옥수수")["date"] == {"date_int": {"$eq": 20250710}}
+    ranged = build_filter_conditions("2025년 7월 1일부터 2025년 7월 10일까지 밀")["date"]
+    assert ranged == {"$and": [{"date_int": {"$gte": 20250701}}, {"date_int": {"$lte": 20250710}}]}
+    assert "$gte" in build_filter_conditions("최근 옥수수 뉴스")["date"]["date_int"]
+
+
+def test_format_snippets_headers_and_budget():
+    assert format_snippets([]) == "관련 뉴스/요약 문서를 찾지 못했습니다."
+    doc = Document(
+        page_content="옥수수   가격이\n상승했습니다. " * 200,
+        metadata={"type": "article_analysis", "date": "2025-07-10", "commodity": "Corn", "news_id": 42},
+    )
+    text = format_snippets([("abcdef1234567890", doc, 0.5), ("0987654321fedcba", doc, 0.25)], token_budget=300)
+    assert text.startswith("[1] id=abcdef123456 | article_analysis | 2025-07-10 | Corn | score=0.5000 | news_id=42")
+    assert "[2] id=0987654321fe" in text
+    assert "   " not in text and text.count("…") == 2
@@ -0,0 +1,37 @@
+from app.session_store import SessionStore
+
+
+def test_same_id_returns_same_session_and_unknown_id_is_kept():
+    store = SessionStore(max_sessions=10)
+    session = store.get()
+    assert store.get(session.session_id) is session
+    assert store.get("client-id").session_id == "client-id"
+
+
+def test_lru_eviction_keeps_recently_used_sessions():
+    store = SessionStore(max_sessions=2)
+    a, b = store.get("a"), store.get("b")
+    store.get("a")       # a를 최근 사용으로
+    store.get("c")       # b가 밀려남
+    assert store.get("a") is a
+    assert store.get("b") is not b
+    assert store.stats()["evicted"] == 2
+
+
+def test_ttl_expiry(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("app.session_store.time.monotonic", lambda: clock[0])
+    store = SessionStore(ttl_seconds=60)
+    a = store.get("a")
+    clock[0] += 30
+    assert store.get("a") is a
+    clock[0] += 61
+    assert store.get("a") is not a
+    assert store.stats()["expired"] == 1
+
+
+def test_history_is_per_session():
+    store = SessionStore()
+    store.get("a").save_turn("질문", "답변")
+    assert len(store.get("a").history()) == 2
+    assert store.get("b").history() == []